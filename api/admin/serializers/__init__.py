@@ -20,6 +20,7 @@ from .analytics_serializers import (
 # From common_serializers.py
 from .common_serializers import (
     ActivateLateFeeConfigurationSerializer,
+    BulkDeviceOperationSerializer,
     CreateLateFeeConfigurationSerializer,
     LateFeeCalculationTestSerializer,
     LateFeeConfigurationSerializer,
@@ -185,6 +186,7 @@ __all__ = [
     "AdminUserListSerializer",
     "BroadcastMessageSerializer",
     "BulkCreateCouponSerializer",
+    "BulkDeviceOperationSerializer",
     "CouponListSerializer",
     "CreateAchievementSerializer",
     "CreateCouponSerializer",
@@ -41,6 +41,34 @@ class RemoteCommandSerializer(serializers.Serializer):
 
 
 
+class BulkDeviceOperationSerializer(serializers.Serializer):
+    """Serializer for bulk device checks/commands"""
+    device_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False,
+        default=list,
+        max_length=1000,
+        help_text="Device serial numbers; all online stations if empty (status checks only)"
+    )
+    command = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        default='',
+        help_text="Raw command to send; performs a status check if empty. Requires device_names"
+    )
+    run_async = serializers.BooleanField(
+        default=False,
+        help_text="Queue as a Celery task and return its id (forced for more than BULK_MAX_WORKERS devices)"
+    )
+
+    def validate(self, attrs):
+        if attrs.get('command') and not attrs.get('device_names'):
+            raise serializers.ValidationError({
+                'device_names': "Required when sending a command; commands are never sent to every station"
+            })
+        return attrs
+
+
 class SystemHealthSerializer(serializers.Serializer):
     """Serializer for system health (response only)"""
     database_status = serializers.CharField()
@@ -55,6 +83,8 @@ class SystemHealthSerializer(serializers.Serializer):
     disk_usage = serializers.FloatField()
     pending_tasks = serializers.IntegerField()
     failed_tasks = serializers.IntegerField()
+    device_api_token = serializers.DictField(help_text="Device API token cache hits, refreshes and expiry")
+    rental_reminders = serializers.DictField(help_text="Reminder batches, reminders sent per batch and scheduling lag")
     last_updated = serializers.DateTimeField()
 
 
@@ -155,6 +155,73 @@ class AdminStationService(CRUDService):
         except Exception as e:
             self.handle_service_error(e, "Failed to send remote command")
     
+    def run_bulk_device_operation(self, device_names: List[str], command: str,
+                                  run_async: bool, admin_user) -> Dict[str, Any]:
+        """
+        Check or send a raw command to many devices through the Device API
+
+        A command is only sent to the devices named explicitly; an empty list
+        means "all online stations" for status checks only. Runs with more
+        devices than one round of BULK_MAX_WORKERS are queued on Celery even
+        when run_async is off, so a request never outlives the worker timeout.
+        """
+        try:
+            from api.stations.services.device_api_service import get_device_api_service
+            from api.stations.tasks import bulk_check_devices
+            
+            if command and not device_names:
+                raise ServiceException(
+                    detail="device_names is required when sending a command",
+                    code="device_names_required"
+                )
+            if not device_names:
+                device_names = list(
+                    Station.objects.filter(is_deleted=False, status='ONLINE')
+                    .values_list('serial_number', flat=True)
+                )
+            if not device_names:
+                raise ServiceException(
+                    detail="No online stations to check",
+                    code="no_devices"
+                )
+            
+            # More than one round of concurrent requests could outlive the HTTP worker
+            service = get_device_api_service()
+            run_async = run_async or len(device_names) > service.bulk_max_workers
+            
+            if command:
+                AdminActionLog.objects.create(
+                    admin_user=admin_user,
+                    action_type='REMOTE_COMMAND',
+                    target_model='Station',
+                    target_id='bulk',
+                    changes={
+                        'command': command,
+                        'device_count': len(device_names),
+                        'async': run_async
+                    },
+                    description=f"Sent bulk remote command to {len(device_names)} devices",
+                    ip_address="127.0.0.1",
+                    user_agent="Admin Panel"
+                )
+            
+            if run_async:
+                task = bulk_check_devices.delay(device_names=device_names, command=command or None)
+                return {
+                    'task_id': task.id,
+                    'total': len(device_names),
+                    'queued': True
+                }
+            
+            if command:
+                return service.send_commands(device_names, command)
+            return service.check_devices(device_names)
+            
+        except ServiceException:
+            raise
+        except Exception as e:
+            self.handle_service_error(e, "Failed to run bulk device operation")
+    
     def _send_mqtt_command(self, imei: str, command_payload: Dict[str, Any]) -> bool:
         """Send MQTT command to station (mock implementation)"""
         try:
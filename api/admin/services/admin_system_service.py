@@ -14,6 +14,9 @@ from django.db.models import Q
 from api.common.services.base import BaseService
 from api.common.utils.helpers import paginate_queryset
 from api.admin.models import SystemLog
+from api.stations.services.utils.device_token_store import device_token_store
+from api.payments.services.utils.intent_expiry_metrics import intent_expiry_metrics
+from api.rentals.services.utils.reminder_metrics import reminder_dispatch_metrics
 
 class AdminSystemService(BaseService):
     """Service for admin system management"""
@@ -34,6 +37,9 @@ class AdminSystemService(BaseService):
                 'disk_usage': 34.5,
                 'pending_tasks': 12,
                 'failed_tasks': 2,
+                'device_api_token': device_token_store.get_metrics(),
+                'rental_reminders': reminder_dispatch_metrics.get_metrics(),
+                'payment_intent_expiry': intent_expiry_metrics.get_metrics(),
                 'last_updated': timezone.now()
             }
         except Exception as e:
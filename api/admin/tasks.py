@@ -6,6 +6,7 @@ from django.db.models import Count, Sum, Avg
 from typing import Dict, Any
 
 from api.common.tasks.base import BaseTask, AnalyticsTask
+from api.common.tasks.retention import run_retention
 from api.admin.models import AdminActionLog, SystemLog
 
 
@@ -37,12 +38,12 @@ def cleanup_old_admin_logs(self):
     try:
         cutoff_date = timezone.now() - timezone.timedelta(days=365)
 
-        deleted_count = AdminActionLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()[0]
+        result = run_retention(
+            "admin_action_logs", AdminActionLog.objects.filter(created_at__lt=cutoff_date)
+        )
 
-        self.logger.info(f"Cleaned up {deleted_count} old admin action logs")
-        return {"deleted_count": deleted_count}
+        self.logger.info(f"Cleaned up {result['deleted_count']} old admin action logs")
+        return result
 
     except Exception as e:
         self.logger.error(f"Failed to cleanup admin logs: {str(e)}")
@@ -59,14 +60,16 @@ def cleanup_old_system_logs(self):
         error_cutoff = timezone.now() - timezone.timedelta(days=180)
 
         # Delete old non-critical logs
-        deleted_normal = SystemLog.objects.filter(
-            created_at__lt=cutoff_date, level__in=["DEBUG", "INFO", "WARNING"]
-        ).delete()[0]
+        deleted_normal = run_retention(
+            "system_logs_normal",
+            SystemLog.objects.filter(created_at__lt=cutoff_date, level__in=["DEBUG", "INFO", "WARNING"]),
+        )["deleted_count"]
 
         # Delete old critical logs
-        deleted_critical = SystemLog.objects.filter(
-            created_at__lt=error_cutoff, level__in=["ERROR", "CRITICAL"]
-        ).delete()[0]
+        deleted_critical = run_retention(
+            "system_logs_critical",
+            SystemLog.objects.filter(created_at__lt=error_cutoff, level__in=["ERROR", "CRITICAL"]),
+        )["deleted_count"]
 
         total_deleted = deleted_normal + deleted_critical
 
@@ -233,6 +233,40 @@ class ToggleMaintenanceView(GenericAPIView, BaseAPIView):
             "Failed to toggle maintenance mode"
         )
 
+@station_router.register(r"admin/devices/bulk", name="admin-devices-bulk")
+@extend_schema(
+    tags=["Admin - Stations"],
+    summary="Bulk Device Check / Command",
+    description="Check or send a raw command to many devices concurrently through the Device API (Staff only)",
+    request=serializers.BulkDeviceOperationSerializer,
+    responses={200: BaseResponseSerializer}
+)
+class BulkDeviceOperationView(GenericAPIView, BaseAPIView):
+    """Fleet-wide device checks and commands"""
+    serializer_class = serializers.BulkDeviceOperationSerializer
+    permission_classes = [IsStaffPermission]
+
+    @log_api_call()
+    def post(self, request: Request) -> Response:
+        """Run bulk device operation"""
+        def operation():
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            
+            service = AdminStationService()
+            return service.run_bulk_device_operation(
+                serializer.validated_data['device_names'],
+                serializer.validated_data['command'],
+                serializer.validated_data['run_async'],
+                request.user
+            )
+        
+        return self.handle_service_operation(
+            operation,
+            "Bulk device operation completed",
+            "Failed to run bulk device operation"
+        )
+
 @station_router.register(r"admin/stations/<str:station_sn>/command", name="admin-station-command")
 @extend_schema(
     tags=["Admin - Stations"],
@@ -216,7 +216,33 @@ class PaginationMixin:
         if serializer_class:
             serializer = serializer_class(result['results'], many=True, context={'request': request})
             result['results'] = serializer.data
-        
+
+        return result
+
+    def paginate_response_by_cursor(self, queryset, request: Request, serializer_class=None):
+        """Keyset-paginate queryset newest first and return response data
+
+        Clients pass the previous page's next_cursor as ?cursor=, and
+        ?include_count=true to also get total_count. A ?page= without a
+        cursor keeps the offset pagination for older app versions.
+        """
+        from api.common.utils.helpers import paginate_queryset_by_cursor
+
+        cursor = request.query_params.get('cursor')
+        if not cursor and 'page' in request.query_params:
+            return self.paginate_response(queryset.order_by('-created_at', '-id'), request, serializer_class)
+
+        result = paginate_queryset_by_cursor(
+            queryset,
+            cursor=cursor,
+            page_size=self.get_pagination_params(request)['page_size'],
+            include_count=request.query_params.get('include_count', '').lower() in ('1', 'true', 'yes')
+        )
+
+        if serializer_class:
+            serializer = serializer_class(result['results'], many=True, context={'request': request})
+            result['results'] = serializer.data
+
         return result
 
 
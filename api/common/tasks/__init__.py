@@ -1 +1,8 @@
-from __future__ import annotations
\ No newline at end of file
+from __future__ import annotations
+
+from .retention import ChunkedRetention, run_retention
+
+__all__ = [
+    'ChunkedRetention',
+    'run_retention',
+]
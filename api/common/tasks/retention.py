@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedRetention:
+    """
+    Deletes the rows of a queryset in bounded primary-key batches
+
+    A plain queryset.delete() collects every matching row (and its cascades)
+    in memory and deletes them in one long transaction. This walks the
+    matching primary keys in order instead, deleting at most batch_size rows
+    (plus their cascades) per transaction and pausing between batches so
+    replicas and other writers keep up.
+
+    The last deleted primary key is checkpointed in the cache. A run stopped
+    by max_seconds (or a crash) resumes after it on the next run; a run that
+    reaches the end clears it.
+    """
+
+    CHECKPOINT_PREFIX = "retention:checkpoint"
+    CHECKPOINT_TIMEOUT = 7 * 24 * 3600  # Give up on resuming after a week
+
+    def __init__(
+        self,
+        name: str,
+        queryset: QuerySet,
+        batch_size: int = 1000,
+        pause: float = 0.1,
+        max_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.queryset = queryset
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_seconds = max_seconds
+
+    @property
+    def checkpoint_key(self) -> str:
+        return f"{self.CHECKPOINT_PREFIX}:{self.name}"
+
+    def _get_checkpoint(self) -> Optional[str]:
+        try:
+            return cache.get(self.checkpoint_key)
+        except Exception:
+            return None
+
+    def _set_checkpoint(self, pk: Optional[Any]) -> None:
+        try:
+            if pk is None:
+                cache.delete(self.checkpoint_key)
+            else:
+                cache.set(self.checkpoint_key, str(pk), timeout=self.CHECKPOINT_TIMEOUT)
+        except Exception as e:
+            # Losing the checkpoint only means rescanning from the start
+            logger.warning(f"Retention checkpoint for {self.name} not saved: {e}")
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Delete matching rows batch by batch
+
+        Returns:
+            dict: deleted_count (including cascades), batches, elapsed_seconds,
+            rows_per_second and whether the run reached the end (completed)
+        """
+        started = time.monotonic()
+        cursor = self._get_checkpoint()
+        deleted_count = 0
+        batches = 0
+        completed = False
+
+        if cursor is not None:
+            logger.info(f"Retention {self.name} resuming after {cursor}")
+
+        while True:
+            pending = self.queryset.order_by('pk')
+            if cursor is not None:
+                pending = pending.filter(pk__gt=cursor)
+            pks = list(pending.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                completed = True
+                break
+
+            # Delete the key range rather than the listed keys so the
+            # retention filter is re-checked at delete time
+            batch = self.queryset.filter(pk__lte=pks[-1])
+            if cursor is not None:
+                batch = batch.filter(pk__gt=cursor)
+            with transaction.atomic():
+                deleted, _ = batch.delete()
+            deleted_count += deleted
+            batches += 1
+            cursor = pks[-1]
+            self._set_checkpoint(cursor)
+
+            if len(pks) < self.batch_size:
+                completed = True
+                break
+            if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        if completed:
+            self._set_checkpoint(None)
+
+        elapsed = time.monotonic() - started
+        result = {
+            'deleted_count': deleted_count,
+            'batches': batches,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(deleted_count / elapsed, 1) if elapsed > 0 else 0,
+            'completed': completed,
+        }
+        logger.info(
+            f"Retention {self.name}: deleted {deleted_count} rows in {batches} batches "
+            f"({result['rows_per_second']} rows/s){'' if completed else ', will resume'}"
+        )
+        return result
+
+
+def run_retention(name: str, queryset: QuerySet, **kwargs) -> Dict[str, Any]:
+    """Shortcut for ChunkedRetention(name, queryset, **kwargs).run()"""
+    return ChunkedRetention(name, queryset, **kwargs).run()
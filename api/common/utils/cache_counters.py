@@ -0,0 +1,82 @@
+"""
+Counters and gauges shared through the default cache
+Every web and worker process adds to the same keys, so the admin health
+endpoint sees totals across the deployment
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from django.core.cache import cache
+
+
+class CacheCounters:
+    """
+    Named counters (incremented) and gauges (overwritten) under one key prefix
+
+    Subclass with KEY_PREFIX, COUNTER_NAMES and GAUGE_NAMES, or pass them to
+    the constructor. Cache errors are swallowed: metrics never break the
+    code that records them.
+    """
+
+    KEY_PREFIX = ""
+    COUNTER_NAMES: Tuple[str, ...] = ()
+    GAUGE_NAMES: Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        key_prefix: Optional[str] = None,
+        counter_names: Optional[Tuple[str, ...]] = None,
+        gauge_names: Optional[Tuple[str, ...]] = None
+    ):
+        self.key_prefix = key_prefix or self.KEY_PREFIX
+        self.counter_names = tuple(counter_names or self.COUNTER_NAMES)
+        self.gauge_names = tuple(gauge_names or self.GAUGE_NAMES)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return self.counter_names + self.gauge_names
+
+    def _key(self, name: str) -> str:
+        return f"{self.key_prefix}:{name}"
+
+    def incr(self, name: str, delta: int = 1) -> None:
+        """Add delta to a counter"""
+        if not delta:
+            return
+        key = self._key(name)
+        try:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, delta)
+        except Exception:
+            pass
+
+    def get(self, name: str, default: Any = 0) -> Any:
+        """Current value of one counter or gauge"""
+        try:
+            value = cache.get(self._key(name))
+        except Exception:
+            value = None
+        return default if value is None else value
+
+    def set_gauges(self, values: Dict[str, Any]) -> None:
+        """Overwrite gauges by name"""
+        try:
+            cache.set_many({self._key(name): value for name, value in values.items()}, timeout=None)
+        except Exception:
+            pass
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Every counter and gauge, 0 if never recorded"""
+        try:
+            values = cache.get_many([self._key(name) for name in self.names])
+        except Exception:
+            values = {}
+        return {name: values.get(self._key(name), 0) for name in self.names}
+
+    def reset(self) -> None:
+        """Clear every counter and gauge (tests)"""
+        try:
+            cache.delete_many([self._key(name) for name in self.names])
+        except Exception:
+            pass
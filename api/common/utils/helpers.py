@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import base64
+import json
+import math
 import random
 import string
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from decimal import Decimal
 from django.utils import timezone
 from django.core.paginator import Paginator
 from rest_framework.response import Response
 from rest_framework import status
 
+# Mean earth radius in kilometers
+EARTH_RADIUS_KM = 6371
+
 
 def generate_random_code(length: int = 6, include_letters: bool = True, include_numbers: bool = True) -> str:
     """Generate random alphanumeric code"""
@@ -126,8 +132,6 @@ def format_currency(amount: Decimal, currency: str = "NPR") -> str:
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates in kilometers using Haversine formula"""
-    import math
-    
     # Convert latitude and longitude from degrees to radians
     lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
     
@@ -137,10 +141,54 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
     c = 2 * math.asin(math.sqrt(a))
     
-    # Radius of earth in kilometers
-    r = 6371
+    return c * EARTH_RADIUS_KM
+
+
+def calculate_bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Get the lat/lng box enclosing a circle of radius_km around a point
+
+    Returns:
+        Tuple: (min_lat, max_lat, min_lon, max_lon); longitudes may fall outside
+        [-180, 180] when the box crosses the antimeridian
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(lat - lat_delta, -90.0)
+    max_lat = min(lat + lat_delta, 90.0)
+    
+    # Use the latitude closest to a pole so the box covers the whole circle
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
     
-    return c * r
+    lon_delta = min(lat_delta / cos_lat, 180.0)
+    return min_lat, max_lat, lon - lon_delta, lon + lon_delta
+
+
+def calculate_distances(lat: float, lon: float, coordinates: Iterable[Tuple[Any, Any]]) -> List[float]:
+    """Calculate distances in kilometers from one origin to many coordinates
+
+    Same haversine as calculate_distance, in a plain Python loop with the
+    origin's radians and cosine computed once instead of per point.
+
+    Args:
+        lat: Origin latitude
+        lon: Origin longitude
+        coordinates: Iterable of (latitude, longitude) pairs (float or Decimal)
+
+    Returns:
+        List[float]: Distances in the same order as coordinates
+    """
+    origin_lat = math.radians(lat)
+    origin_lon = math.radians(lon)
+    cos_origin = math.cos(origin_lat)
+
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    distances = []
+    for point_lat, point_lon in coordinates:
+        lat_rad = radians(float(point_lat))
+        a = sin((lat_rad - origin_lat) / 2) ** 2 + cos_origin * cos(lat_rad) * sin((radians(float(point_lon)) - origin_lon) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0))))
+    return distances
 
 
 def mask_sensitive_data(data: str, mask_char: str = "*", visible_chars: int = 4) -> str:
@@ -171,38 +219,21 @@ def get_late_fee_configuration():
         return None
 
 
-def calculate_late_fee_amount(normal_rate_per_minute: Decimal, overdue_minutes: int,
-                             package_type: str = None) -> Decimal:
+def calculate_late_fee_amount(normal_rate_per_minute: Decimal, overdue_minutes: int) -> Decimal:
     """Calculate late fee amount using active configuration
 
     Args:
         normal_rate_per_minute: The normal package rate per minute
         overdue_minutes: Total minutes the rental was overdue
-        package_type: Package type (optional, for future package-specific rules)
 
     Returns:
         Decimal: The calculated late fee amount
     """
-    from decimal import Decimal
-    from django.core.cache import cache
-
-    # Try cache first for better performance
-    cache_key = f"late_fee_config_{package_type or 'default'}"
-    config = cache.get(cache_key)
-
-    if config is None:
-        # Get active configuration from database
-        config = get_late_fee_configuration()
-
-        if config is None:
-            # Fallback to default 2x multiplier if no configuration exists
-            return normal_rate_per_minute * Decimal('2') * Decimal(str(overdue_minutes))
-
-        # Cache configuration for 1 hour
-        cache.set(cache_key, config, timeout=3600)
+    # Active configuration is held in process memory by the rate table
+    # (falls back to a 2x multiplier when no configuration exists)
+    from api.rentals.services.utils.late_fee_table import late_fee_rate_table
 
-    # Calculate using the configuration
-    return config.calculate_late_fee(normal_rate_per_minute, overdue_minutes)
+    return late_fee_rate_table.calculate(normal_rate_per_minute, overdue_minutes)
 
 
 def calculate_overdue_minutes(rental) -> int:
@@ -263,4 +294,76 @@ def paginate_queryset(queryset, page: int = 1, page_size: int = 20) -> Dict[str,
             'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
             'previous_page': page_obj.previous_page_number() if page_obj.has_previous() else None,
         }
-    }
\ No newline at end of file
+    }
+
+def encode_cursor(created_at, pk) -> str:
+    """Encode a (created_at, id) position as an opaque URL-safe cursor"""
+    raw = json.dumps([created_at.isoformat(), str(pk)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode a cursor from encode_cursor()
+
+    Raises:
+        ValidationError: If the cursor was not produced by encode_cursor()
+    """
+    from django.utils.dateparse import parse_datetime
+    from rest_framework.exceptions import ValidationError
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(pk, str):
+            raise TypeError('cursor values must be strings')
+        created_at = parse_datetime(created_at)
+        uuid.UUID(pk)
+    except (ValueError, TypeError):
+        created_at = None
+    # encode_cursor() always writes an aware timestamp
+    if created_at is None or created_at.tzinfo is None:
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    return created_at, pk
+
+
+def paginate_queryset_by_cursor(queryset, cursor: Optional[str] = None, page_size: int = 20,
+                                include_count: bool = False) -> Dict[str, Any]:
+    """Keyset-paginate a queryset newest first on (created_at, id)
+
+    Each page is a range read from the cursor position, so page 50 costs the
+    same as page 1 given an index ending in (created_at, id). Any existing
+    ordering is replaced.
+
+    Args:
+        queryset: Queryset of a model with created_at and a UUID id
+        cursor: next_cursor of the previous page (None for the first page)
+        page_size: Items per page
+        include_count: Also run COUNT(*) for total_count (skipped by default)
+
+    Returns:
+        Dict: results and pagination (page_size, has_next, next_cursor and
+        total_count, None unless requested)
+    """
+    from django.db.models import Q
+
+    total_count = queryset.order_by().count() if include_count else None
+
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # One extra row tells whether there is a next page without counting
+    rows = list(queryset[:page_size + 1])
+    has_next = len(rows) > page_size
+    results = rows[:page_size]
+
+    return {
+        'results': results,
+        'pagination': {
+            'page_size': page_size,
+            'has_next': has_next,
+            'next_cursor': encode_cursor(results[-1].created_at, results[-1].pk) if has_next else None,
+            'total_count': total_count,
+        }
+    }
@@ -0,0 +1,56 @@
+"""
+Redis access for buffers and schedulers shared by every web and worker process
+They keep their data in Redis when the default cache is django-redis, and in
+process-local structures otherwise (development, tests, Redis outage)
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Returned by redis_call() when the operation did not run on Redis
+REDIS_UNAVAILABLE = object()
+
+
+def get_shared_redis():
+    """Raw client behind the default cache, or None if it is not django-redis"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def redis_call(operation: Callable[[Any], Any], warning: Optional[str] = None) -> Any:
+    """
+    Run operation(client) against the shared Redis
+
+    Usage:
+        if redis_call(lambda redis: redis.rpush(KEY, *entries), "Buffer write failed") is REDIS_UNAVAILABLE:
+            local.extend(entries)
+
+    Args:
+        operation: Called with the Redis client
+        warning: Logged with the error if the call fails (None to stay quiet)
+
+    Returns:
+        The operation's result, or REDIS_UNAVAILABLE if there is no shared
+        Redis or the call raised; the caller then uses its local fallback
+    """
+    redis = get_shared_redis()
+    if redis is None:
+        return REDIS_UNAVAILABLE
+    try:
+        return operation(redis)
+    except Exception as e:
+        if warning:
+            logger.warning(f"{warning}: {e}")
+        return REDIS_UNAVAILABLE
+
+
+def decode_redis_value(value: Any) -> Any:
+    """str for bytes replies (clients without decode_responses), other values unchanged"""
+    return value.decode() if isinstance(value, bytes) else value
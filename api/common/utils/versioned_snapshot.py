@@ -0,0 +1,107 @@
+"""
+Process-local snapshots of rarely changing tables
+A snapshot is loaded with one query and served from memory. Writers bump a
+version key in the shared cache; every process compares it at most every
+VERSION_CHECK_INTERVAL seconds and reloads on a mismatch, or after MAX_AGE
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedSnapshot:
+    """
+    Base for in-process snapshots invalidated through a shared version key
+
+    Subclasses set VERSION_KEY and LABEL and implement _build(); lookups read
+    the built value through _data().
+    """
+
+    VERSION_KEY = ""
+    LABEL = "Snapshot"
+    # How often the shared version key is checked (bounds cross-worker staleness)
+    VERSION_CHECK_INTERVAL = 2.0
+    # Reload regardless of version, covers queryset.update() and a dummy cache
+    MAX_AGE = 300.0
+
+    def __init__(self):
+        self._value: Optional[Any] = None
+        self._version: Optional[str] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _build(self) -> Any:
+        """Load the snapshot contents from the database"""
+        raise NotImplementedError
+
+    # ==========================================
+    # INVALIDATION
+    # ==========================================
+
+    def _read_version(self) -> Optional[str]:
+        try:
+            return cache.get(self.VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"{self.LABEL} version read failed: {e}")
+            return None
+
+    def bump_version(self) -> None:
+        """Invalidate the snapshot in this process and in every other worker"""
+        self.invalidate()
+        try:
+            cache.set(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        except Exception as e:
+            logger.warning(f"{self.LABEL} version bump failed: {e}")
+
+    def invalidate(self) -> None:
+        """Drop the local snapshot; the next read reloads it"""
+        with self._lock:
+            self._value = None
+
+    def invalidate_on_commit(self) -> None:
+        """Invalidate here now, and in other workers once the write commits"""
+        self.invalidate()
+        transaction.on_commit(self.bump_version)
+
+    # ==========================================
+    # LOADING
+    # ==========================================
+
+    def _is_stale(self, now: float) -> bool:
+        if self._value is None or now - self._loaded_at > self.MAX_AGE:
+            return True
+        if now - self._checked_at < self.VERSION_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        return self._read_version() != self._version
+
+    def _load(self, now: float) -> Any:
+        # Read the version first so a concurrent bump forces another reload
+        version = self._read_version()
+        value = self._build()
+        self._value = value
+        self._version = version
+        self._loaded_at = now
+        self._checked_at = now
+        return value
+
+    def _data(self) -> Any:
+        now = time.monotonic()
+        value = self._value
+        if value is not None and not self._is_stale(now):
+            return value
+        with self._lock:
+            if self._value is not None and not self._is_stale(now):
+                return self._value
+            return self._load(now)
@@ -168,6 +168,21 @@ IOT_SYSTEM_ALLOWED_IPS = [
 # IoT system timeout settings
 IOT_SYSTEM_SIGNATURE_TIMEOUT = int(getenv('IOT_SYSTEM_SIGNATURE_TIMEOUT', 300))  # 5 minutes
 
+# Queued ingestion: acknowledge device uploads after signature validation and
+# apply them on Celery queues iot_ingest_0..N-1 (one single-concurrency worker per queue)
+IOT_INGEST_ASYNC = getenv('IOT_INGEST_ASYNC', 'false').lower() == 'true'
+IOT_INGEST_PARTITIONS = int(getenv('IOT_INGEST_PARTITIONS', '4'))
+
+# Status pings are buffered and written to Station in bulk at most this often
+IOT_HEARTBEAT_FLUSH_SECONDS = int(getenv('IOT_HEARTBEAT_FLUSH_SECONDS', '5'))
+
+# Rental GPS points are buffered and bulk inserted at most this often
+RENTAL_LOCATION_FLUSH_SECONDS = int(getenv('RENTAL_LOCATION_FLUSH_SECONDS', '10'))
+
+# Notify owners of expired payment intents (payment_status 'expired'); the
+# payment rule may send SMS and push, so this is off by default
+PAYMENT_INTENT_EXPIRY_NOTIFY = getenv('PAYMENT_INTENT_EXPIRY_NOTIFY', 'false').lower() == 'true'
+
 # ============================================================
 # Device API Configuration (Java Spring API Integration)
 # ============================================================
@@ -176,6 +191,17 @@ DEVICE_API = {
     'CONNECT_TIMEOUT': int(getenv('DEVICE_API_CONNECT_TIMEOUT', '10')),
     'READ_TIMEOUT': int(getenv('DEVICE_API_READ_TIMEOUT', '30')),
     'MAX_RETRIES': int(getenv('DEVICE_API_MAX_RETRIES', '2')),
+    # Exponential backoff with jitter between retries (seconds)
+    'RETRY_BACKOFF_BASE': float(getenv('DEVICE_API_RETRY_BACKOFF_BASE', '0.2')),
+    'RETRY_BACKOFF_MAX': float(getenv('DEVICE_API_RETRY_BACKOFF_MAX', '2.0')),
+    
+    # Keep-alive connection pool shared by all DeviceAPIService instances in a process
+    'POOL_CONNECTIONS': int(getenv('DEVICE_API_POOL_CONNECTIONS', '4')),
+    'POOL_MAXSIZE': int(getenv('DEVICE_API_POOL_MAXSIZE', '20')),
+    
+    # Bulk check/command fan-out (check_devices/send_commands)
+    'BULK_MAX_WORKERS': int(getenv('DEVICE_API_BULK_MAX_WORKERS', '16')),
+    'BULK_DEVICE_TIMEOUT': float(getenv('DEVICE_API_BULK_DEVICE_TIMEOUT', '10')),
     
     # Authentication for inter-system communication
     'AUTH_ENABLED': getenv('DEVICE_API_AUTH_ENABLED', 'True').lower() == 'true',
@@ -22,7 +22,7 @@ Example Usage:
 """
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from django.template import Template, Context
 from django.db import transaction
 from django.contrib.auth import get_user_model
@@ -156,6 +156,75 @@ class NotifyService(BaseService):
         except Exception as e:
             self.handle_service_error(e, "Failed to send bulk notifications")
     
+    def send_many(self, template_slug: str, recipients: List[Tuple[Any, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Send one template to many users, each with their own context
+        
+        The template is looked up and compiled once, the channel rule is read
+        once, and all in-app notifications are inserted with one bulk_create.
+        
+        Args:
+            template_slug: Template slug
+            recipients: (user, context) pairs
+        
+        Returns:
+            Dict with success/failure counts
+        
+        Example:
+            notify_service.send_many('rental_reminder', [
+                (user1, {'rental_code': 'AB12', 'due_time': '14:30'}),
+                (user2, {'rental_code': 'CD34', 'due_time': '14:31'}),
+            ])
+        """
+        try:
+            if not recipients:
+                return {'success_count': 0, 'failure_count': 0, 'total': 0}
+            
+            template = self._get_template(template_slug)
+            title_template = Template(template.title_template)
+            message_template = Template(template.message_template)
+            rule = NotificationRule.objects.filter(notification_type=template.notification_type).first()
+            
+            notifications = []
+            rendered = []
+            for user, context in recipients:
+                title = title_template.render(Context(context)).strip()
+                message = message_template.render(Context(context)).strip()
+                notifications.append(Notification(
+                    user=user,
+                    template=template,
+                    title=title,
+                    message=message,
+                    notification_type=template.notification_type,
+                    data=context,
+                    channel='in_app'
+                ))
+                rendered.append((user, title, message, context))
+            Notification.objects.bulk_create(notifications)
+            
+            # A recipient counts as failed if any enabled channel failed;
+            # the channel helpers log the error themselves
+            failure_count = 0
+            if rule:
+                for user, title, message, context in rendered:
+                    sent = [
+                        self._send_push(user, title, message, context) if rule.send_push else True,
+                        self._send_sms(user, message) if rule.send_sms else True,
+                        self._send_email(user, title, message, context) if rule.send_email else True,
+                    ]
+                    if not all(sent):
+                        failure_count += 1
+            
+            self.log_info(f"Notification {template_slug} sent to {len(recipients)} users")
+            return {
+                'success_count': len(recipients) - failure_count,
+                'failure_count': failure_count,
+                'total': len(recipients)
+            }
+            
+        except Exception as e:
+            self.handle_service_error(e, f"Failed to send notifications: {template_slug}")
+    
     def send_otp(self, user, otp: str, purpose: str = 'verification', 
                  channel: str = 'sms', expiry_minutes: int = 5) -> Dict[str, Any]:
         """
@@ -319,26 +388,30 @@ class NotifyService(BaseService):
         except Exception as e:
             self.log_error(f"Channel distribution failed: {str(e)}")
     
-    def _send_push(self, user, title: str, message: str, data: Dict[str, Any]):
-        """Send push notification via FCM"""
+    def _send_push(self, user, title: str, message: str, data: Dict[str, Any]) -> bool:
+        """Send push notification via FCM, False if it failed for every device"""
         try:
-            self.fcm_service.send_push_notification(user, title, message, data)
+            result = self.fcm_service.send_push_notification(user, title, message, data) or {}
+            return not (result.get('failed_count') and not result.get('sent_count'))
         except Exception as e:
             self.log_error(f"Push notification failed: {str(e)}")
+            return False
     
-    def _send_sms(self, user, message: str):
-        """Send SMS notification"""
+    def _send_sms(self, user, message: str) -> bool:
+        """Send SMS notification, False if the provider rejected it"""
         try:
             phone_number = getattr(user, 'phone_number', None)
             if phone_number:
-                self.sms_service.send_sms(phone_number, message, user)
-            else:
-                self.log_warning(f"User {user.username} has no phone number")
+                result = self.sms_service.send_sms(phone_number, message, user) or {}
+                return result.get('status') != 'failed'
+            self.log_warning(f"User {user.username} has no phone number")
+            return True
         except Exception as e:
             self.log_error(f"SMS notification failed: {str(e)}")
+            return False
     
-    def _send_email(self, user, title: str, message: str, data: Dict[str, Any]):
-        """Send email notification"""
+    def _send_email(self, user, title: str, message: str, data: Dict[str, Any]) -> bool:
+        """Send email notification, False if sending raised"""
         try:
             email = getattr(user, 'email', None)
             if email:
@@ -350,8 +423,10 @@ class NotifyService(BaseService):
                 )
             else:
                 self.log_warning(f"User {user.username} has no email")
+            return True
         except Exception as e:
             self.log_error(f"Email notification failed: {str(e)}")
+            return False
 
 
 # ===================================================================
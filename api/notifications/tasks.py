@@ -345,21 +345,23 @@ def cleanup_old_notifications_task(self, days: int = 90):
     try:
         from django.utils import timezone
         from datetime import timedelta
+        from api.common.tasks.retention import run_retention
         from api.notifications.models import Notification
 
         cutoff_date = timezone.now() - timedelta(days=days)
 
         # Delete old read notifications
-        deleted_count, _ = Notification.objects.filter(
-            is_read=True, created_at__lt=cutoff_date
-        ).delete()
+        result = run_retention(
+            "read_notifications",
+            Notification.objects.filter(is_read=True, created_at__lt=cutoff_date),
+        )
 
         logger.info(
-            f"Cleaned up {deleted_count} old notifications (older than {days} days)"
+            f"Cleaned up {result['deleted_count']} old notifications (older than {days} days)"
         )
         return {
             "status": "success",
-            "deleted_count": deleted_count,
+            **result,
             "cutoff_date": cutoff_date.isoformat(),
         }
 
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-16 19:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_add_withdrawal_models'),
+        ('rentals', '0005_rental_location_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', '-created_at', '-id'], name='wallet_txn_history_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-16 19:06
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_history_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendableCapacity',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('points', models.IntegerField(default=0)),
+                ('points_value', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('wallet_balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('version', models.BigIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='spendable_capacity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Spendable Capacity',
+                'verbose_name_plural': 'Spendable Capacities',
+                'db_table': 'spendable_capacities',
+            },
+        ),
+    ]
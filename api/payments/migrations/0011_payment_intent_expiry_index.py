@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-16 19:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_spendable_capacity'),
+        ('rentals', '0005_rental_location_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentintent',
+            index=models.Index(fields=['status', 'expires_at'], name='payment_intent_expiry_idx'),
+        ),
+    ]
@@ -44,6 +44,10 @@ class Transaction(BaseModel):
 
     class Meta:
         db_table = "transactions"
+        indexes = [
+            # Keyset pagination of a user's history: (user, created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_history_idx'),
+        ]
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
 
@@ -69,6 +73,26 @@ class Wallet(BaseModel):
         return f"{self.user.username} - {self.balance} {self.currency}"
 
 
+class SpendableCapacity(BaseModel):
+    """
+    SpendableCapacity - Per-user points and wallet balance snapshot for payment options
+    Written in the same transaction as every wallet or points balance change
+    """
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, related_name='spendable_capacity')
+    points = models.IntegerField(default=0)
+    points_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    wallet_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    version = models.BigIntegerField(default=0)  # Bumped on every change
+
+    class Meta:
+        db_table = "spendable_capacities"
+        verbose_name = "Spendable Capacity"
+        verbose_name_plural = "Spendable Capacities"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.points} points, {self.wallet_balance} wallet"
+
+
 class WalletTransaction(BaseModel):
     """
     WalletTransaction - Individual wallet balance changes
@@ -91,6 +115,9 @@ class WalletTransaction(BaseModel):
 
     class Meta:
         db_table = "wallet_transactions"
+        indexes = [
+            models.Index(fields=['wallet', '-created_at', '-id'], name='wallet_txn_history_idx'),
+        ]
         verbose_name = "Wallet Transaction"
         verbose_name_plural = "Wallet Transactions"
 
@@ -132,6 +159,10 @@ class PaymentIntent(BaseModel):
 
     class Meta:
         db_table = "payment_intents"
+        indexes = [
+            # Expiry sweep: status = 'PENDING' AND expires_at < now
+            models.Index(fields=['status', 'expires_at'], name='payment_intent_expiry_idx'),
+        ]
         verbose_name = "Payment Intent"
         verbose_name_plural = "Payment Intents"
 
@@ -4,6 +4,7 @@ Payment Services Package
 This package contains all payment-related service classes split by functionality.
 """
 
+from .spendable_capacity import SpendableCapacityService
 from .wallet import WalletService
 from .payment_calculation import PaymentCalculationService
 from .payment_intent import PaymentIntentService
@@ -14,6 +15,7 @@ from .nepal_gateway import NepalGatewayService
 from .withdrawal import WithdrawalService
 
 __all__ = [
+    'SpendableCapacityService',
     'WalletService',
     'PaymentCalculationService',
     'PaymentIntentService',
@@ -4,8 +4,7 @@ from typing import Dict, Any
 from decimal import Decimal
 
 from api.common.services.base import BaseService, ServiceException
-from api.common.utils.helpers import convert_points_to_amount
-from api.users.models import UserPoints
+from api.payments.services.spendable_capacity import SpendableCapacityService
 
 class PaymentCalculationService(BaseService):
     """Service for payment calculations"""
@@ -94,12 +93,12 @@ class PaymentCalculationService(BaseService):
                     code="invalid_scenario"
                 )
 
-            # Get user's current points and wallet balance
-            user_points = self._get_user_points(user)
-            wallet_balance = self._get_wallet_balance(user)
-
-            # Convert points to monetary value (10 points = NPR 1)
-            points_value = convert_points_to_amount(user_points)
+            # Points, their NPR value (10 points = NPR 1) and wallet balance
+            # from the snapshot kept by the wallet and points services
+            capacity = SpendableCapacityService().get_capacity(user)
+            user_points = capacity['points']
+            wallet_balance = capacity['wallet_balance']
+            points_value = capacity['points_value']
 
             # Calculate payment breakdown
             payment_breakdown = self._calculate_payment_breakdown(
@@ -170,20 +169,6 @@ class PaymentCalculationService(BaseService):
         except Exception as e:
             self.handle_service_error(e, "Failed to calculate package payment options")
 
-    def _get_user_points(self, user) -> int:
-        """Get user's current points"""
-        try:
-            return user.points.current_points
-        except UserPoints.DoesNotExist:
-            return 0
-
-    def _get_wallet_balance(self, user) -> Decimal:
-        """Get user's wallet balance"""
-        try:
-            return user.wallet.balance
-        except:
-            return Decimal('0')
-
     def _calculate_payment_breakdown(self, amount: Decimal, user_points: int, wallet_balance: Decimal, points_value: Decimal) -> Dict[str, Any]:
         """Calculate how payment will be split between points and wallet"""
         # Use points first, then wallet
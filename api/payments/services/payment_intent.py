@@ -1,21 +1,33 @@
 from __future__ import annotations
 
+import json
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from decimal import Decimal
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import JSONField
+from django.db.models.expressions import RawSQL
 from django.utils import timezone
 
 from api.common.services.base import CRUDService, ServiceException
 from api.common.utils.helpers import generate_transaction_id
-from api.payments.models import PaymentIntent, Transaction, PaymentMethod
+from api.payments.models import PaymentIntent, Transaction, PaymentMethod, Wallet
 from api.payments.services.wallet import WalletService
 from api.payments.services.nepal_gateway import NepalGatewayService
+from api.payments.services.utils import VerificationInProgress, gateway_verification_cache
 
 class PaymentIntentService(CRUDService):
     """Service for payment intents"""
     model = PaymentIntent
 
+    EXPIRY_BATCH_SIZE = 500
+
+    # Gateway statuses (Khalti and eSewa) after which a payment can never complete
+    FINAL_GATEWAY_REJECTIONS = frozenset({
+        'EXPIRED', 'USER CANCELED', 'CANCELED', 'REFUNDED', 'PARTIALLY REFUNDED', 'FULL_REFUND', 'PARTIAL_REFUND',
+    })
+
     @transaction.atomic
     def create_topup_intent(self, user, amount: Decimal, payment_method_id: str, request=None) -> PaymentIntent:
         """Create payment intent for wallet top-up"""
@@ -102,21 +114,24 @@ class PaymentIntentService(CRUDService):
             self.log_error(f"Gateway payment initiation failed: {str(e)}")
             raise
 
-    @transaction.atomic
-    def verify_topup_payment(self, intent_id: str, callback_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Verify top-up payment and update wallet"""
+    def verify_topup_payment(self, intent_id: str, callback_data: Dict[str, Any],
+                             gateway_service: NepalGatewayService = None) -> Dict[str, Any]:
+        """
+        Verify top-up payment and update wallet
+
+        Gateway verification goes through gateway_verification_cache: the
+        outcome is recorded per (intent, gateway reference) and only one
+        remote verification per intent is in flight, so retried or concurrent
+        callbacks reuse it. The remote call runs outside the database
+        transaction; the wallet is credited only by the caller that moves the
+        intent out of PENDING.
+        """
         try:
-            intent = PaymentIntent.objects.get(intent_id=intent_id)
+            intent = PaymentIntent.objects.select_related('user').get(intent_id=intent_id)
 
             # Allow verification of already completed payments (for duplicate calls/webhooks)
             if intent.status == 'COMPLETED':
-                return {
-                    'status': 'SUCCESS',
-                    'message': 'Payment already verified',
-                    'transaction_id': f"EXISTING_{intent.intent_id[:8]}",
-                    'amount': intent.amount,
-                    'new_balance': intent.user.wallet.balance
-                }
+                return self._already_verified(intent)
             
             if intent.status != 'PENDING':
                 raise ServiceException(
@@ -130,62 +145,83 @@ class PaymentIntentService(CRUDService):
                     code="intent_expired"
                 )
 
-            # Verify payment with gateway using nepal-gateways
-            gateway_service = NepalGatewayService()
-            verification_result = self._verify_with_gateway(intent, callback_data, gateway_service)
-            payment_verified = verification_result.get('success', False)
-
-            if payment_verified:
-                # Create transaction record
-                transaction_obj = Transaction.objects.create(
-                    user=intent.user,
-                    transaction_id=generate_transaction_id(),
-                    transaction_type='TOPUP',
-                    amount=intent.amount,
-                    status='SUCCESS',
-                    payment_method_type='GATEWAY',
-                    gateway_reference=verification_result.get('transaction_id'),
-                    gateway_response=verification_result.get('gateway_response', {})
-                )
-
-                # Add balance to wallet
-                wallet_service = WalletService()
-                # Get payment method name from intent metadata or use a default
-                payment_method_name = intent.intent_metadata.get('payment_method', 'gateway') if intent.intent_metadata else 'gateway'
-                wallet_service.add_balance(
-                    intent.user,
-                    intent.amount,
-                    f"Wallet top-up via {payment_method_name}",
-                    transaction_obj
+            # Verify payment with gateway using nepal-gateways, at most once per callback
+            gateway_service = gateway_service or NepalGatewayService()
+            try:
+                verification_result = gateway_verification_cache.verify_once(
+                    intent.intent_id,
+                    gateway_verification_cache.reference(callback_data),
+                    lambda: self._verify_with_gateway(intent, callback_data, gateway_service)
                 )
-
-                # Award points for top-up
-                from api.points.services import award_points
-                award_points(
-                    intent.user,
-                    int(float(intent.amount) * 0.1),  # 10% of top-up amount as points
-                    'TOPUP',
-                    f'Top-up reward for NPR {intent.amount}',
-                    async_send=True,
-                    topup_amount=float(intent.amount),
-                    transaction_id=transaction_obj.transaction_id
-                )
-
-                # Send payment success notification
-                from api.notifications.services import notify
-                notify(
-                    intent.user,
-                    'payment_success',
-                    async_send=True,
-                    amount=float(intent.amount),
-                    transaction_id=transaction_obj.transaction_id,
-                    payment_type='topup'
+            except VerificationInProgress:
+                raise ServiceException(
+                    detail="Payment verification already in progress",
+                    code="verification_in_progress",
+                    status_code=409,
+                    user_message="Your payment is being verified, please try again shortly"
                 )
+            payment_verified = verification_result.get('success', False)
 
-                # Update intent status
-                intent.status = 'COMPLETED'
-                intent.completed_at = timezone.now()
-                intent.save(update_fields=['status', 'completed_at'])
+            if payment_verified:
+                with transaction.atomic():
+                    # Claim the intent; a concurrent callback that got here first did the credit
+                    claimed = PaymentIntent.objects.filter(id=intent.id, status='PENDING').update(
+                        status='COMPLETED', completed_at=timezone.now()
+                    )
+                    if not claimed:
+                        intent.refresh_from_db()
+                        if intent.status == 'COMPLETED':
+                            return self._already_verified(intent)
+                        raise ServiceException(
+                            detail=f"Payment intent status is {intent.status}, cannot verify",
+                            code="invalid_intent_status"
+                        )
+
+                    # Create transaction record
+                    transaction_obj = Transaction.objects.create(
+                        user=intent.user,
+                        transaction_id=generate_transaction_id(),
+                        transaction_type='TOPUP',
+                        amount=intent.amount,
+                        status='SUCCESS',
+                        payment_method_type='GATEWAY',
+                        gateway_reference=verification_result.get('transaction_id'),
+                        gateway_response=verification_result.get('gateway_response', {})
+                    )
+
+                    # Add balance to wallet
+                    wallet_service = WalletService()
+                    # Get payment method name from intent metadata or use a default
+                    payment_method_name = intent.intent_metadata.get('payment_method', 'gateway') if intent.intent_metadata else 'gateway'
+                    wallet_transaction = wallet_service.add_balance(
+                        intent.user,
+                        intent.amount,
+                        f"Wallet top-up via {payment_method_name}",
+                        transaction_obj
+                    )
+
+                    # Award points for top-up
+                    from api.points.services import award_points
+                    award_points(
+                        intent.user,
+                        int(float(intent.amount) * 0.1),  # 10% of top-up amount as points
+                        'TOPUP',
+                        f'Top-up reward for NPR {intent.amount}',
+                        async_send=True,
+                        topup_amount=float(intent.amount),
+                        transaction_id=transaction_obj.transaction_id
+                    )
+
+                    # Send payment success notification
+                    from api.notifications.services import notify
+                    notify(
+                        intent.user,
+                        'payment_success',
+                        async_send=True,
+                        amount=float(intent.amount),
+                        transaction_id=transaction_obj.transaction_id,
+                        payment_type='topup'
+                    )
 
                 self.log_info(f"Top-up verified and processed: {intent.intent_id}")
 
@@ -193,12 +229,18 @@ class PaymentIntentService(CRUDService):
                     'status': 'SUCCESS',
                     'transaction_id': transaction_obj.transaction_id,
                     'amount': intent.amount,
-                    'new_balance': intent.user.wallet.balance
+                    'new_balance': wallet_transaction.balance_after
                 }
+            elif not verification_result.get('final'):
+                # Not settled at the gateway yet: leave the intent for a later callback
+                raise ServiceException(
+                    detail="Payment is not yet complete at the gateway",
+                    code="payment_verification_pending",
+                    user_message="Your payment is still being processed, please check again shortly"
+                )
             else:
                 # Mark as failed
-                intent.status = 'FAILED'
-                intent.save(update_fields=['status'])
+                PaymentIntent.objects.filter(id=intent.id, status='PENDING').update(status='FAILED')
 
                 raise ServiceException(
                     detail="Payment verification failed",
@@ -213,6 +255,15 @@ class PaymentIntentService(CRUDService):
         except Exception as e:
             self.handle_service_error(e, "Failed to verify top-up payment")
 
+    def _already_verified(self, intent: PaymentIntent) -> Dict[str, Any]:
+        return {
+            'status': 'SUCCESS',
+            'message': 'Payment already verified',
+            'transaction_id': f"EXISTING_{intent.intent_id[:8]}",
+            'amount': intent.amount,
+            'new_balance': Wallet.objects.values_list('balance', flat=True).get(user_id=intent.user_id)
+        }
+
     def _verify_with_gateway(self, intent: PaymentIntent, callback_data: Dict[str, Any], gateway_service: NepalGatewayService) -> Dict[str, Any]:
         """Verify payment with actual gateway using callback data"""
         try:
@@ -226,30 +277,19 @@ class PaymentIntentService(CRUDService):
                     'transaction_id': f"VERIFIED_{intent.intent_id[:8]}",
                     'order_id': intent.intent_id,
                     'amount': float(intent.amount),
-                    'gateway_response': {'status': 'verified_without_callback'}
+                    'gateway_response': {'status': 'verified_without_callback'},
+                    'final': True
                 }
             
             if gateway == 'esewa':
                 # For eSewa, callback_data contains: {"data": "base64_encoded_json"}
                 verification = gateway_service.verify_esewa_payment(callback_data)
-                return {
-                    'success': verification.get('success', False),
-                    'transaction_id': verification.get('transaction_id'),
-                    'order_id': verification.get('order_id'),
-                    'amount': verification.get('amount'),
-                    'gateway_response': verification.get('gateway_response', {})
-                }
+                return self._verification_outcome(verification)
                 
             elif gateway == 'khalti':
                 # For Khalti, callback_data contains: {"pidx": "...", "status": "...", "txnId": "..."}
                 verification = gateway_service.verify_khalti_payment(callback_data)
-                return {
-                    'success': verification.get('success', False),
-                    'transaction_id': verification.get('transaction_id'),
-                    'order_id': verification.get('order_id'),
-                    'amount': verification.get('amount'),
-                    'gateway_response': verification.get('gateway_response', {})
-                }
+                return self._verification_outcome(verification)
             else:
                 raise ServiceException(
                     detail=f"Unsupported gateway for verification: {gateway}",
@@ -259,6 +299,27 @@ class PaymentIntentService(CRUDService):
             self.log_error(f"Gateway payment verification failed: {str(e)}")
             raise
 
+    def _verification_outcome(self, verification: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalize a gateway verification and flag whether it is final
+
+        Only a verified payment or a definite rejection is final. Anything
+        else (Khalti Pending/Initiated, eSewa PENDING/AMBIGUOUS, an early
+        callback) may still complete, so it is not recorded and the intent
+        stays PENDING.
+        """
+        success = bool(verification.get('success', False))
+        gateway_response = verification.get('gateway_response') or {}
+        gateway_status = str(gateway_response.get('status', '') if isinstance(gateway_response, dict) else '').upper()
+        return {
+            'success': success,
+            'transaction_id': verification.get('transaction_id'),
+            'order_id': verification.get('order_id'),
+            'amount': verification.get('amount'),
+            'gateway_response': gateway_response,
+            'final': success or gateway_status in self.FINAL_GATEWAY_REJECTIONS
+        }
+
     def get_payment_status(self, intent_id: str) -> Dict[str, Any]:
         """Get payment status"""
         try:
@@ -314,4 +375,77 @@ class PaymentIntentService(CRUDService):
                 code="intent_not_found"
             )
         except Exception as e:
-            self.handle_service_error(e, "Failed to cancel payment intent")
\ No newline at end of file
+            self.handle_service_error(e, "Failed to cancel payment intent")
+
+    def expire_stale_intents(self, batch_size: int = None) -> Dict[str, Any]:
+        """
+        Cancel every PENDING intent past expires_at, a chunk at a time
+
+        Each chunk is claimed with SELECT ... FOR UPDATE SKIP LOCKED (an intent
+        being verified right now is left for the next run) and cancelled with
+        one UPDATE that merges expiry_reason into intent_metadata. With
+        PAYMENT_INTENT_EXPIRY_NOTIFY on, owners of each chunk are notified
+        with one send_many call; nothing is sent by default.
+
+        Returns:
+            Dict with expired_count, chunks, notified and notify_failed
+        """
+        batch_size = batch_size or self.EXPIRY_BATCH_SIZE
+        notify = getattr(settings, 'PAYMENT_INTENT_EXPIRY_NOTIFY', False)
+        now = timezone.now()
+        expired = chunks = notified = notify_failed = 0
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    PaymentIntent.objects.select_for_update(skip_locked=True)
+                    .filter(status='PENDING', expires_at__lt=now)
+                    .order_by('expires_at')
+                    .values('id', 'user_id', 'intent_id', 'amount')[:batch_size]
+                )
+                if not rows:
+                    break
+                PaymentIntent.objects.filter(id__in=[row['id'] for row in rows]).update(
+                    status='CANCELLED',
+                    intent_metadata=self._merge_metadata({'expiry_reason': 'Expired due to timeout'}),
+                    updated_at=now
+                )
+            expired += len(rows)
+            chunks += 1
+
+            if notify:
+                sent, failed = self._notify_expired(rows)
+                notified += sent
+                notify_failed += failed
+
+            if len(rows) < batch_size:
+                break
+
+        return {'expired_count': expired, 'chunks': chunks, 'notified': notified, 'notify_failed': notify_failed}
+
+    def _notify_expired(self, rows) -> Tuple[int, int]:
+        """One payment_status 'expired' fan-out for a chunk of expired intents"""
+        from api.notifications.services.notify import NotifyService
+        from api.users.models import User
+
+        try:
+            users = User.objects.in_bulk({row['user_id'] for row in rows})
+            with transaction.atomic():
+                result = NotifyService().send_many('payment_status', [
+                    (users[row['user_id']], {
+                        'amount': str(row['amount']), 'status': 'expired', 'intent_id': row['intent_id'],
+                    })
+                    for row in rows if row['user_id'] in users
+                ])
+            return result['success_count'], result['failure_count']
+        except Exception as e:
+            self.log_warning(f"Expired intent notifications not sent: {e}")
+            return 0, len(rows)
+
+    @staticmethod
+    def _merge_metadata(values: Dict[str, Any]):
+        """UPDATE expression adding keys to intent_metadata without reading it"""
+        if connection.vendor == 'postgresql':
+            return RawSQL("intent_metadata || %s::jsonb", [json.dumps(values)], output_field=JSONField())
+        # SQLite (tests, local development)
+        return RawSQL("json_patch(intent_metadata, %s)", [json.dumps(values)], output_field=JSONField())
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from api.common.services.base import BaseService
+from api.common.utils.helpers import convert_points_to_amount
+from api.payments.models import SpendableCapacity, Wallet
+
+
+class SpendableCapacityService(BaseService):
+    """
+    Service for the per-user spendable capacity snapshot
+
+    The wallet and points services call record_* inside the transaction that
+    changes the balance, so the row is never behind a committed balance.
+    Readers get it from cache or one lookup on the unique user_id index.
+
+    The cache entry is versioned. A writer publishes the row it wrote once
+    its transaction commits, and never replaces a newer version. Readers only
+    fill an empty entry (cache.add), so a reader holding a row loaded before a
+    top-up committed cannot put the old balance back.
+    """
+
+    CACHE_PREFIX = "payments:capacity"
+    CACHE_TIMEOUT = 300
+    FIELDS = ('points', 'points_value', 'wallet_balance', 'version')
+
+    def _cache_key(self, user_id) -> str:
+        return f"{self.CACHE_PREFIX}:{user_id}"
+
+    @staticmethod
+    def _points_value(points: int) -> Decimal:
+        return convert_points_to_amount(points).quantize(Decimal('0.01'))
+
+    def get_capacity(self, user) -> Dict[str, Any]:
+        """
+        Get the user's points, points value and wallet balance
+
+        Returns:
+            Dict with points, points_value, wallet_balance and version
+        """
+        try:
+            capacity = cache.get(self._cache_key(user.id))
+        except Exception:
+            capacity = None
+        if capacity is not None:
+            return capacity
+
+        capacity = SpendableCapacity.objects.filter(user_id=user.id).values(*self.FIELDS).first()
+        if capacity is None:
+            return self.rebuild(user.id)
+
+        self._remember(user.id, capacity)
+        return capacity
+
+    @transaction.atomic
+    def rebuild(self, user_id) -> Dict[str, Any]:
+        """Recompute a user's snapshot from UserPoints and Wallet"""
+        from api.users.models import UserPoints
+
+        points = UserPoints.objects.filter(user_id=user_id).values_list('current_points', flat=True).first() or 0
+        wallet_balance = Wallet.objects.filter(user_id=user_id).values_list('balance', flat=True).first()
+        values = {
+            'points': points,
+            'points_value': self._points_value(points),
+            'wallet_balance': wallet_balance or Decimal('0'),
+        }
+
+        snapshots = SpendableCapacity.objects.filter(user_id=user_id)
+        if not snapshots.update(version=F('version') + 1, **values):
+            SpendableCapacity.objects.get_or_create(user_id=user_id, defaults={**values, 'version': 1})
+        return self._publish(user_id)
+
+    def record_points(self, user_id, points: int) -> None:
+        """Store a user's new points balance; call inside the points change transaction"""
+        self._record(user_id, points=points, points_value=self._points_value(points))
+
+    def record_wallet_balances(self, balances: Dict[Any, Decimal]) -> None:
+        """Store new wallet balances keyed by str(wallet id); call inside the ledger transaction"""
+        for wallet_id, user_id in Wallet.objects.filter(id__in=list(balances)).values_list('id', 'user_id'):
+            self._record(user_id, wallet_balance=balances[str(wallet_id)])
+
+    def _record(self, user_id, **values) -> None:
+        updated = SpendableCapacity.objects.filter(user_id=user_id).update(version=F('version') + 1, **values)
+        if not updated:
+            # First change for this user: the balances already include it
+            self.rebuild(user_id)
+        else:
+            self._publish(user_id)
+
+    def _publish(self, user_id) -> Dict[str, Any]:
+        """Cache the row this transaction wrote (it holds the row lock) once it commits"""
+        capacity = SpendableCapacity.objects.filter(user_id=user_id).values(*self.FIELDS).get()
+        key = self._cache_key(user_id)
+
+        def publish():
+            try:
+                cached = cache.get(key)
+                if cached is None or cached['version'] <= capacity['version']:
+                    cache.set(key, capacity, timeout=self.CACHE_TIMEOUT)
+            except Exception as e:
+                self.log_warning(f"Spendable capacity not cached: {e}")
+                try:
+                    cache.delete(key)
+                except Exception:
+                    pass
+
+        transaction.on_commit(publish)
+        return capacity
+
+    def _remember(self, user_id, capacity: Dict[str, Any]) -> None:
+        """Fill an empty cache entry from a read; never replaces a published version"""
+        try:
+            cache.add(self._cache_key(user_id), capacity, timeout=self.CACHE_TIMEOUT)
+        except Exception as e:
+            self.log_warning(f"Spendable capacity not cached: {e}")
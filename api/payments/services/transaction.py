@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Dict, Any
 
 from api.common.services.base import CRUDService
-from api.common.utils.helpers import paginate_queryset
+from api.common.utils.helpers import paginate_queryset, paginate_queryset_by_cursor
 from api.payments.models import Transaction
 
 class TransactionService(CRUDService):
@@ -29,11 +29,15 @@ class TransactionService(CRUDService):
                 if filters.get('end_date'):
                     queryset = queryset.filter(created_at__lte=filters['end_date'])
 
-            # Pagination
-            page = filters.get('page', 1) if filters else 1
-            page_size = filters.get('page_size', 20) if filters else 20
+            # Pagination: keyset unless an offset page is asked for
+            filters = filters or {}
+            page_size = filters.get('page_size', 20)
+            if filters.get('page') and not filters.get('cursor'):
+                return paginate_queryset(queryset.order_by('-created_at', '-id'), filters['page'], page_size)
 
-            return paginate_queryset(queryset, page, page_size)
+            return paginate_queryset_by_cursor(
+                queryset, filters.get('cursor'), page_size, filters.get('include_count', False)
+            )
 
         except Exception as e:
             self.handle_service_error(e, "Failed to get user transactions")
@@ -0,0 +1,13 @@
+"""
+Utility modules for payments services
+"""
+from .intent_expiry_metrics import IntentExpiryMetrics, intent_expiry_metrics
+from .verification_cache import GatewayVerificationCache, VerificationInProgress, gateway_verification_cache
+
+__all__ = [
+    'IntentExpiryMetrics',
+    'intent_expiry_metrics',
+    'GatewayVerificationCache',
+    'VerificationInProgress',
+    'gateway_verification_cache',
+]
@@ -0,0 +1,32 @@
+"""
+Counters for payment intent expiry runs
+Shared through the cache so the admin health endpoint sees every worker's
+runs: intents expired in total and in the last run, chunks, and users
+notified
+"""
+from __future__ import annotations
+
+from api.common.utils.cache_counters import CacheCounters
+
+
+class IntentExpiryMetrics(CacheCounters):
+    """Payment intent expiry counters"""
+
+    KEY_PREFIX = "payments:intent_expiry_metrics"
+    COUNTER_NAMES = ('runs', 'chunks', 'intents_expired', 'notifications_sent', 'notifications_failed')
+    GAUGE_NAMES = ('last_run_expired', 'last_run_ms')
+
+    def record_run(self, expired: int, chunks: int, notified: int, failed: int, elapsed_seconds: float) -> None:
+        """Record one expiry run"""
+        self.incr('runs')
+        self.incr('chunks', chunks)
+        self.incr('intents_expired', expired)
+        self.incr('notifications_sent', notified)
+        self.incr('notifications_failed', failed)
+        self.set_gauges({
+            'last_run_expired': expired,
+            'last_run_ms': int(elapsed_seconds * 1000),
+        })
+
+
+intent_expiry_metrics = IntentExpiryMetrics()
@@ -0,0 +1,152 @@
+"""
+Idempotent gateway verification for payment callbacks
+eSewa/Khalti and the mobile app both retry callbacks, so one payment can be
+verified several times. The first verification outcome is recorded per
+(intent, gateway reference), and a per-intent single-flight lock keeps at
+most one remote verification in flight; duplicates read the recorded outcome
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationInProgress(Exception):
+    """Another caller holds the intent's lock and has not recorded an outcome yet"""
+
+
+class GatewayVerificationCache:
+    """
+    Recorded gateway verification outcomes and per-intent verification locks
+
+    Only final outcomes (a dict with a truthy 'final': verified, or definitely
+    rejected) are recorded. A non-final answer such as a payment still
+    pending at the gateway, or a call that raises, is not recorded, so the
+    next callback verifies again.
+    """
+
+    RESULT_PREFIX = "payments:gateway_verification"
+    LOCK_PREFIX = "payments:gateway_verification_lock"
+    RESULT_TIMEOUT = 24 * 3600
+    LOCK_TIMEOUT = 30  # Longer than the gateway HTTP timeout
+    WAIT_SECONDS = 5
+    POLL_INTERVAL = 0.1
+
+    # Callback fields that identify the payment at the gateway, in preference order
+    REFERENCE_FIELDS = ('pidx', 'transaction_code', 'transaction_uuid', 'txnId', 'refId')
+
+    def reference(self, callback_data: Optional[Dict[str, Any]]) -> str:
+        """
+        Gateway reference of a callback
+
+        Khalti sends pidx directly; eSewa sends a base64 JSON 'data' blob
+        carrying transaction_code. Anything else is keyed by a hash of the
+        callback itself.
+        """
+        data = dict(callback_data or {})
+        if isinstance(data.get('data'), str):
+            try:
+                data.update(json.loads(base64.b64decode(data['data'])))
+            except (ValueError, TypeError):
+                pass
+        for field in self.REFERENCE_FIELDS:
+            if data.get(field):
+                return str(data[field])
+        canonical = json.dumps(callback_data or {}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+    def _result_key(self, intent_id: str, reference: str) -> str:
+        return f"{self.RESULT_PREFIX}:{intent_id}:{reference}"
+
+    def _lock_key(self, intent_id: str) -> str:
+        return f"{self.LOCK_PREFIX}:{intent_id}"
+
+    def get(self, intent_id: str, reference: str) -> Optional[Dict[str, Any]]:
+        """Recorded outcome, if any"""
+        try:
+            return cache.get(self._result_key(intent_id, reference))
+        except Exception as e:
+            logger.warning(f"Gateway verification cache read failed: {e}")
+            return None
+
+    def verify_once(self, intent_id: str, reference: str, verify: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the recorded outcome, or run verify() once and record it if final
+
+        Raises:
+            VerificationInProgress: If another caller is verifying this intent
+                and did not record an outcome within WAIT_SECONDS
+        """
+        outcome = self.get(intent_id, reference)
+        if outcome is not None:
+            return outcome
+
+        token = self._acquire(intent_id)
+        if token is None:
+            return self._wait(intent_id, reference, verify)
+
+        try:
+            # Recorded while we were acquiring
+            outcome = self.get(intent_id, reference)
+            if outcome is None:
+                outcome = verify()
+                if outcome.get('final'):
+                    try:
+                        cache.set(self._result_key(intent_id, reference), outcome, timeout=self.RESULT_TIMEOUT)
+                    except Exception as e:
+                        logger.warning(f"Gateway verification outcome not recorded: {e}")
+            return outcome
+        finally:
+            self._release(intent_id, token)
+
+    def _acquire(self, intent_id: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            return token if cache.add(self._lock_key(intent_id), token, timeout=self.LOCK_TIMEOUT) else None
+        except Exception:
+            # No shared cache: verify without single-flight rather than fail the payment
+            return token
+
+    def _release(self, intent_id: str, token: str) -> None:
+        key = self._lock_key(intent_id)
+        try:
+            if cache.get(key) == token:
+                cache.delete(key)
+        except Exception:
+            pass
+
+    def _wait(self, intent_id: str, reference: str, verify: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            outcome = self.get(intent_id, reference)
+            if outcome is not None:
+                return outcome
+            try:
+                released = cache.get(self._lock_key(intent_id)) is None
+            except Exception:
+                released = False
+            if released:
+                # Holder finished without recording (gateway error or not final): try ourselves
+                return self.verify_once(intent_id, reference, verify)
+        raise VerificationInProgress(intent_id)
+
+    def clear(self, intent_id: str, reference: str) -> None:
+        """Forget a recorded outcome (tests, manual reconciliation)"""
+        try:
+            cache.delete(self._result_key(intent_id, reference))
+        except Exception:
+            pass
+
+
+gateway_verification_cache = GatewayVerificationCache()
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from django.db import transaction
+from typing import Any, Dict, List, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
 
 from api.common.services.base import CRUDService, ServiceException
 from api.payments.models import Wallet, WalletTransaction, Transaction
+from api.payments.services.spendable_capacity import SpendableCapacityService
 
 class WalletService(CRUDService):
     """Service for wallet operations"""
@@ -27,20 +32,13 @@ class WalletService(CRUDService):
         try:
             wallet = self.get_or_create_wallet(user)
 
-            balance_before = wallet.balance
-            wallet.balance += amount
-            wallet.save(update_fields=['balance', 'updated_at'])
-
-            # Create wallet transaction record
-            wallet_transaction = WalletTransaction.objects.create(
-                wallet=wallet,
-                transaction=transaction_obj,
-                transaction_type='CREDIT',
-                amount=amount,
-                balance_before=balance_before,
-                balance_after=wallet.balance,
-                description=description
-            )
+            wallet_transaction = self.apply_ledger_entries([{
+                'wallet_id': wallet.id,
+                'transaction_type': 'CREDIT',
+                'amount': amount,
+                'description': description,
+                'transaction': transaction_obj,
+            }])[0]
 
             self.log_info(f"Balance added to wallet: {user.username} +{amount}")
             return wallet_transaction
@@ -54,26 +52,13 @@ class WalletService(CRUDService):
         try:
             wallet = self.get_or_create_wallet(user)
 
-            if wallet.balance < amount:
-                raise ServiceException(
-                    detail="Insufficient wallet balance",
-                    code="insufficient_balance"
-                )
-
-            balance_before = wallet.balance
-            wallet.balance -= amount
-            wallet.save(update_fields=['balance', 'updated_at'])
-
-            # Create wallet transaction record
-            wallet_transaction = WalletTransaction.objects.create(
-                wallet=wallet,
-                transaction=transaction_obj,
-                transaction_type='DEBIT',
-                amount=amount,
-                balance_before=balance_before,
-                balance_after=wallet.balance,
-                description=description
-            )
+            wallet_transaction = self.apply_ledger_entries([{
+                'wallet_id': wallet.id,
+                'transaction_type': 'DEBIT',
+                'amount': amount,
+                'description': description,
+                'transaction': transaction_obj,
+            }])[0]
 
             self.log_info(f"Balance deducted from wallet: {user.username} -{amount}")
             return wallet_transaction
@@ -81,6 +66,146 @@ class WalletService(CRUDService):
         except Exception as e:
             self.handle_service_error(e, "Failed to deduct wallet balance")
 
+    @transaction.atomic
+    def apply_ledger_entries(self, entries: List[Dict[str, Any]]) -> List[WalletTransaction]:
+        """
+        Apply CREDIT/DEBIT entries to wallets atomically
+
+        Each wallet's balance moves by the net of its entries in one
+        conditional UPDATE that only matches while the balance covers every
+        debit in order, so no row is read and locked up front. On PostgreSQL
+        the UPDATE and the WalletTransaction INSERT for the whole batch are
+        one statement.
+
+        Args:
+            entries: Dicts with wallet_id, transaction_type ('CREDIT' or
+                'DEBIT'), amount (positive), description and optionally
+                transaction, applied in list order per wallet
+
+        Returns:
+            The WalletTransaction rows written, in entry order
+
+        Raises:
+            ServiceException: insufficient_balance if any wallet cannot cover
+                its debits; nothing is applied
+        """
+        if not entries:
+            return []
+
+        ledger = []
+        for entry in entries:
+            amount = Decimal(str(entry['amount']))
+            if entry['transaction_type'] not in ('CREDIT', 'DEBIT') or amount <= 0:
+                raise ServiceException(
+                    detail="Ledger entries must be positive CREDIT or DEBIT amounts",
+                    code="invalid_ledger_entry"
+                )
+            ledger.append(WalletTransaction(
+                wallet_id=entry['wallet_id'],
+                transaction=entry.get('transaction'),
+                transaction_type=entry['transaction_type'],
+                amount=amount,
+                description=entry['description'],
+            ))
+
+        if connection.vendor == 'postgresql':
+            balances = self._apply_ledger_returning(ledger)
+        else:
+            balances = self._apply_ledger_conditional(ledger)
+
+        if len(balances) < len(ledger):
+            raise ServiceException(
+                detail="Insufficient wallet balance",
+                code="insufficient_balance"
+            )
+        closing = {}
+        for seq, wallet_transaction in enumerate(ledger):
+            wallet_transaction.balance_before, wallet_transaction.balance_after = balances[seq]
+            closing[str(wallet_transaction.wallet_id)] = wallet_transaction.balance_after
+
+        SpendableCapacityService().record_wallet_balances(closing)
+        return ledger
+
+    @staticmethod
+    def _signed(wallet_transaction: WalletTransaction) -> Decimal:
+        return wallet_transaction.amount if wallet_transaction.transaction_type == 'CREDIT' else -wallet_transaction.amount
+
+    def _apply_ledger_returning(self, ledger: List[WalletTransaction]) -> Dict[int, Tuple[Decimal, Decimal]]:
+        now = timezone.now()
+        values, params = [], []
+        for seq, wallet_transaction in enumerate(ledger):
+            values.append("(%s::int, %s::uuid, %s::uuid, %s::varchar, %s::numeric, %s::numeric, %s::uuid, %s::varchar)")
+            params.extend([
+                seq, str(wallet_transaction.id), str(wallet_transaction.wallet_id),
+                wallet_transaction.transaction_type, wallet_transaction.amount, self._signed(wallet_transaction),
+                str(wallet_transaction.transaction_id) if wallet_transaction.transaction_id else None,
+                wallet_transaction.description,
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH entries (seq, id, wallet_id, transaction_type, amount, delta, transaction_id, description) AS (
+                    VALUES {', '.join(values)}
+                ), ordered AS (
+                    SELECT entries.*, SUM(delta) OVER (PARTITION BY wallet_id ORDER BY seq) AS running
+                    FROM entries
+                ), totals AS (
+                    SELECT wallet_id, SUM(delta) AS net, GREATEST(0, -MIN(running)) AS required
+                    FROM ordered GROUP BY wallet_id
+                ), updated AS (
+                    UPDATE wallets
+                    SET balance = wallets.balance + totals.net, updated_at = %s
+                    FROM totals
+                    WHERE wallets.id = totals.wallet_id AND wallets.balance >= totals.required
+                    RETURNING wallets.id, wallets.balance - totals.net AS opening
+                ), inserted AS (
+                    INSERT INTO wallet_transactions (
+                        id, created_at, updated_at, wallet_id, transaction_id, transaction_type,
+                        amount, balance_before, balance_after, description, metadata
+                    )
+                    SELECT o.id, %s, %s, o.wallet_id, o.transaction_id, o.transaction_type,
+                           o.amount, u.opening + o.running - o.delta, u.opening + o.running, o.description, '{{}}'
+                    FROM ordered o JOIN updated u ON u.id = o.wallet_id
+                )
+                SELECT o.seq, u.opening + o.running - o.delta, u.opening + o.running
+                FROM ordered o JOIN updated u ON u.id = o.wallet_id
+                """,
+                params + [now, now, now]
+            )
+            return {seq: (before, after) for seq, before, after in cursor.fetchall()}
+
+    def _apply_ledger_conditional(self, ledger: List[WalletTransaction]) -> Dict[int, Tuple[Decimal, Decimal]]:
+        """Portable fallback: one conditional UPDATE per wallet, then a bulk INSERT"""
+        now = timezone.now()
+        totals: Dict[str, Dict[str, Decimal]] = {}
+        for wallet_transaction in ledger:
+            total = totals.setdefault(str(wallet_transaction.wallet_id), {'net': Decimal('0'), 'required': Decimal('0')})
+            total['net'] += self._signed(wallet_transaction)
+            total['required'] = max(total['required'], -total['net'])
+
+        for wallet_id, total in totals.items():
+            updated = Wallet.objects.filter(id=wallet_id, balance__gte=total['required']).update(
+                balance=F('balance') + total['net'], updated_at=now
+            )
+            if not updated:
+                return {}
+
+        running = {
+            str(wallet_id): balance - totals[str(wallet_id)]['net']
+            for wallet_id, balance in Wallet.objects.filter(id__in=list(totals)).values_list('id', 'balance')
+        }
+        balances = {}
+        for seq, wallet_transaction in enumerate(ledger):
+            wallet_id = str(wallet_transaction.wallet_id)
+            before = running[wallet_id]
+            running[wallet_id] = before + self._signed(wallet_transaction)
+            balances[seq] = (before, running[wallet_id])
+            wallet_transaction.balance_before, wallet_transaction.balance_after = balances[seq]
+
+        WalletTransaction.objects.bulk_create(ledger)
+        return balances
+
     def get_wallet_balance(self, user) -> Decimal:
         """Get user wallet balance"""
         try:
@@ -112,4 +237,8 @@ class WalletService(CRUDService):
             }
             
         except Exception as e:
-            self.handle_service_error(e, "Failed to get wallet balance")
\ No newline at end of file
+            self.handle_service_error(e, "Failed to get wallet balance")
+
+    def get_wallet_transactions_queryset(self, user):
+        """Get base queryset for the user's wallet transactions"""
+        return WalletTransaction.objects.filter(wallet__user=user)
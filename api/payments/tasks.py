@@ -1,31 +1,38 @@
 from __future__ import annotations
 
+import time
 from celery import shared_task
-from django.utils import timezone
 from django.db.models import Sum, Count, Q
 from decimal import Decimal
 from typing import Dict, Any
 
 from api.common.tasks.base import BaseTask, PaymentTask
-from api.payments.models import Transaction, PaymentIntent, Refund, Wallet
+from api.payments.models import Transaction, Refund, Wallet
 
 @shared_task(base=BaseTask, bind=True)
 def expire_payment_intents(self):
-    """Mark expired payment intents as failed"""
+    """Cancel expired payment intents in chunks
+
+    Owners are notified only when PAYMENT_INTENT_EXPIRY_NOTIFY is on.
+
+    SCHEDULED: every 15 minutes.
+
+    Returns:
+        Dict with expired_count, chunks, notified and notify_failed
+    """
     try:
-        expired_intents = PaymentIntent.objects.filter(
-            status="PENDING", expires_at__lt=timezone.now()
-        )
+        from api.payments.services import PaymentIntentService
+        from api.payments.services.utils import intent_expiry_metrics
 
-        expired_count = 0
-        for intent in expired_intents:
-            intent.status = "CANCELLED"
-            intent.intent_metadata["expiry_reason"] = "Expired due to timeout"
-            intent.save(update_fields=["status", "intent_metadata"])
-            expired_count += 1
+        started = time.monotonic()
+        result = PaymentIntentService().expire_stale_intents()
+        intent_expiry_metrics.record_run(
+            result['expired_count'], result['chunks'], result['notified'],
+            result['notify_failed'], time.monotonic() - started
+        )
 
-        self.logger.info(f"Expired {expired_count} payment intents")
-        return {"expired_count": expired_count}
+        self.logger.info(f"Expired {result['expired_count']} payment intents in {result['chunks']} chunks")
+        return result
 
     except Exception as e:
         self.logger.error(f"Failed to expire payment intents: {str(e)}")
@@ -65,11 +65,25 @@ class TransactionListView(GenericAPIView, BaseAPIView):
                 description="Filter transactions until this date",
                 required=False
             ),
+            OpenApiParameter(
+                name="cursor",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="next_cursor of the previous page (omit for the first page)",
+                required=False
+            ),
+            OpenApiParameter(
+                name="include_count",
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                description="Also return total_count (default: false)",
+                required=False
+            ),
             OpenApiParameter(
                 name="page",
                 type=OpenApiTypes.INT,
                 location=OpenApiParameter.QUERY,
-                description="Page number for pagination",
+                description="Page number for offset pagination (deprecated, use cursor)",
                 required=False
             ),
             OpenApiParameter(
@@ -100,8 +114,8 @@ class TransactionListView(GenericAPIView, BaseAPIView):
             queryset = self.apply_date_filters(queryset, request)
             queryset = self.apply_status_filter(queryset, request)
             
-            # Use PaginationMixin for pagination
-            result = self.paginate_response(queryset, request, self.serializer_class)
+            # Keyset pagination: deep pages cost the same as the first
+            result = self.paginate_response_by_cursor(queryset, request, self.serializer_class)
             return result
         
         return self.handle_service_operation(
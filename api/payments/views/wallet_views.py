@@ -153,6 +153,60 @@ class WalletBalanceView(GenericAPIView, BaseAPIView):
 
 
 
+@wallet_router.register(r"payments/wallet/transactions", name="wallet-transactions")
+@extend_schema(
+    tags=["Payments"],
+    summary="Wallet History",
+    description="Get the user's wallet balance changes, newest first",
+    responses={200: BaseResponseSerializer}
+)
+class WalletTransactionListView(GenericAPIView, BaseAPIView):
+    serializer_class = serializers.WalletTransactionSerializer
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Get Wallet History",
+        description="Retrieve wallet transactions with cursor pagination",
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="next_cursor of the previous page (omit for the first page)",
+                required=False
+            ),
+            OpenApiParameter(
+                name="page_size",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description="Number of items per page (default: 20)",
+                required=False
+            ),
+            OpenApiParameter(
+                name="include_count",
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                description="Also return total_count (default: false)",
+                required=False
+            )
+        ]
+    )
+    @log_api_call()
+    def get(self, request: Request) -> Response:
+        """Get user wallet history"""
+        def operation():
+            service = WalletService()
+            queryset = service.get_wallet_transactions_queryset(request.user)
+            queryset = self.apply_date_filters(queryset, request)
+            return self.paginate_response_by_cursor(queryset, request, self.serializer_class)
+
+        return self.handle_service_operation(
+            operation,
+            "Wallet history retrieved successfully",
+            "Failed to get wallet history"
+        )
+
+
 @wallet_router.register(r"payments/cancel/<str:intent_id>", name="payment-cancel")
 @extend_schema(
     tags=["Payments"],
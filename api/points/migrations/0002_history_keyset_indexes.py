@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-16 19:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0001_initial'),
+        ('rentals', '0005_rental_location_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pointstransaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='points_txn_history_idx'),
+        ),
+    ]
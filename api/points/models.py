@@ -36,6 +36,9 @@ class PointsTransaction(BaseModel):
 
     class Meta:
         db_table = "points_transactions"
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='points_txn_history_idx'),
+        ]
         verbose_name = "Points Transaction"
         verbose_name_plural = "Points Transactions"
 
@@ -160,7 +160,9 @@ class PointsHistoryFilterSerializer(serializers.Serializer):
     )
     start_date = serializers.DateTimeField(required=False)
     end_date = serializers.DateTimeField(required=False)
-    page = serializers.IntegerField(default=1, min_value=1)
+    cursor = serializers.CharField(required=False)
+    include_count = serializers.BooleanField(default=False)
+    page = serializers.IntegerField(required=False, min_value=1)  # Offset pagination for older clients
     page_size = serializers.IntegerField(default=20, min_value=1, max_value=100)
     
     def validate(self, attrs):
@@ -14,7 +14,8 @@ from django.db import transaction
 from django.db.models import Sum
 from django.contrib.auth import get_user_model
 from api.common.services.base import CRUDService, ServiceException
-from api.common.utils.helpers import convert_points_to_amount, paginate_queryset
+from api.payments.services.spendable_capacity import SpendableCapacityService
+from api.common.utils.helpers import convert_points_to_amount, paginate_queryset, paginate_queryset_by_cursor
 from api.points.models import PointsTransaction, Referral
 from api.users.models import UserPoints
 
@@ -48,6 +49,7 @@ class PointsService(CRUDService):
             user_points.current_points += points
             user_points.total_points += points
             user_points.save(update_fields=['current_points', 'total_points', 'last_updated'])
+            SpendableCapacityService().record_points(user.id, user_points.current_points)
             
             # Create transaction record
             points_transaction = PointsTransaction.objects.create(
@@ -97,6 +99,7 @@ class PointsService(CRUDService):
             balance_before = user_points.current_points
             user_points.current_points -= points
             user_points.save(update_fields=['current_points', 'last_updated'])
+            SpendableCapacityService().record_points(user.id, user_points.current_points)
             
             # Create transaction record
             points_transaction = PointsTransaction.objects.create(
@@ -137,6 +140,7 @@ class PointsService(CRUDService):
                 transaction_type = 'SPENT'
             
             user_points.save(update_fields=['current_points', 'total_points', 'last_updated'])
+            SpendableCapacityService().record_points(user.id, user_points.current_points)
             
             # Create transaction record
             points_transaction = PointsTransaction.objects.create(
@@ -181,14 +185,15 @@ class PointsService(CRUDService):
                 if filters.get('end_date'):
                     queryset = queryset.filter(created_at__lte=filters['end_date'])
             
-            # Order by latest first with index optimization
-            queryset = queryset.order_by('-created_at')
-            
-            # Pagination
-            page = filters.get('page', 1) if filters else 1
-            page_size = filters.get('page_size', 20) if filters else 20
-            
-            return paginate_queryset(queryset, page, page_size)
+            # Pagination: keyset on (created_at, id) unless an offset page is asked for
+            filters = filters or {}
+            page_size = filters.get('page_size', 20)
+            if filters.get('page') and not filters.get('cursor'):
+                return paginate_queryset(queryset.order_by('-created_at', '-id'), filters['page'], page_size)
+
+            return paginate_queryset_by_cursor(
+                queryset, filters.get('cursor'), page_size, filters.get('include_count', False)
+            )
             
         except Exception as e:
             self.handle_service_error(e, "Failed to get points history")
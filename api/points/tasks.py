@@ -291,21 +291,22 @@ def cleanup_old_transactions_task(self, days: int = 730):
         }
     """
     try:
+        from api.common.tasks.retention import run_retention
         from api.points.models import PointsTransaction
         
         cutoff_date = timezone.now() - timezone.timedelta(days=days)
         
         # Only delete non-critical transactions
-        deleted_count, _ = PointsTransaction.objects.filter(
+        result = run_retention('points_transactions', PointsTransaction.objects.filter(
             created_at__lt=cutoff_date,
             related_referral__isnull=True,
             source__in=['TOPUP', 'RENTAL', 'TIMELY_RETURN']
-        ).delete()
+        ))
         
-        logger.info(f"Cleaned up {deleted_count} old points transactions")
+        logger.info(f"Cleaned up {result['deleted_count']} old points transactions")
         return {
             'status': 'success',
-            'deleted_count': deleted_count,
+            **result,
             'cutoff_date': cutoff_date.isoformat()
         }
         
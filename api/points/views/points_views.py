@@ -35,7 +35,9 @@ class PointsHistoryView(GenericAPIView, BaseAPIView):
             OpenApiParameter("source", str, description="Filter by source"),
             OpenApiParameter("start_date", str, description="Filter from date (ISO format)"),
             OpenApiParameter("end_date", str, description="Filter to date (ISO format)"),
-            OpenApiParameter("page", int, description="Page number"),
+            OpenApiParameter("cursor", str, description="next_cursor of the previous page (omit for the first page)"),
+            OpenApiParameter("include_count", bool, description="Also return total_count"),
+            OpenApiParameter("page", int, description="Page number for offset pagination (deprecated, use cursor)"),
             OpenApiParameter("page_size", int, description="Items per page"),
         ],
         responses={200: serializers.PointsHistoryResponseSerializer}
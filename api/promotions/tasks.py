@@ -4,6 +4,7 @@ from celery import shared_task
 from django.utils import timezone
 
 from api.common.tasks.base import BaseTask
+from api.common.tasks.retention import run_retention
 from api.promotions.models import Coupon, CouponUsage
 
 
@@ -33,10 +34,10 @@ def cleanup_old_coupon_data(self):
             coupon__status=Coupon.StatusChoices.EXPIRED, used_at__lt=one_year_ago
         )
 
-        deleted_count, _ = old_usages.delete()
+        result = run_retention("coupon_usages", old_usages)
 
-        self.logger.info(f"Cleaned up {deleted_count} old coupon usage records")
-        return {"deleted_count": deleted_count}
+        self.logger.info(f"Cleaned up {result['deleted_count']} old coupon usage records")
+        return result
 
     except Exception as e:
         self.logger.error(f"Failed to cleanup old coupon data: {str(e)}")
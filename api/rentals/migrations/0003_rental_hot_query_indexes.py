@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-16 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0002_initial'),
+        ('stations', '0006_add_station_lat_lng_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['user', 'status'], name='rental_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['due_at'], name='rental_active_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('status', 'OVERDUE')), fields=['due_at'], name='rental_overdue_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['power_bank'], name='rental_active_powerbank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['station', 'created_at'], name='rental_station_created_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-16 18:54
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0003_rental_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRentalStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('total_rentals', models.IntegerField(default=0)),
+                ('completed_rentals', models.IntegerField(default=0)),
+                ('cancelled_rentals', models.IntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_duration_seconds', models.BigIntegerField(default=0)),
+                ('timely_returns', models.IntegerField(default=0)),
+                ('station_counts', models.JSONField(default=dict)),
+                ('package_counts', models.JSONField(default=dict)),
+                ('first_rental_date', models.DateTimeField(blank=True, null=True)),
+                ('last_rental_date', models.DateTimeField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rental_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Rental Stats',
+                'verbose_name_plural': 'User Rental Stats',
+                'db_table': 'user_rental_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-16 18:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0004_user_rental_stats'),
+    ]
+
+    operations = [
+        # Build the composite index before the plain FK index is dropped
+        migrations.AddIndex(
+            model_name='rentallocation',
+            index=models.Index(fields=['rental', 'recorded_at'], name='rental_location_time_idx'),
+        ),
+        migrations.AlterField(
+            model_name='rentallocation',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='rentallocation',
+            name='rental',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='locations', to='rentals.rental'),
+        ),
+    ]
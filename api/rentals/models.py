@@ -1,5 +1,8 @@
 from django.db import models
-from api.common.models import BaseModel
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from api.common.models import BaseModel, LateFeeConfiguration
 
 
 class Rental(BaseModel):
@@ -47,6 +50,21 @@ class Rental(BaseModel):
         db_table = "rentals"
         verbose_name = "Rental"
         verbose_name_plural = "Rentals"
+        indexes = [
+            # Active-rental check and per-user stats
+            models.Index(fields=['user', 'status'], name='rental_user_status_idx'),
+            # Overdue/abandoned scans and deadline sync only touch open rentals.
+            # One partial index per status: SQLite only uses a partial index
+            # when the query repeats its WHERE term exactly
+            models.Index(fields=['due_at'], name='rental_active_due_idx', condition=models.Q(status='ACTIVE')),
+            models.Index(fields=['due_at'], name='rental_overdue_due_idx', condition=models.Q(status='OVERDUE')),
+            # Return events look up the ACTIVE rental of a power bank
+            models.Index(
+                fields=['power_bank'], name='rental_active_powerbank_idx', condition=models.Q(status='ACTIVE')
+            ),
+            # Station analytics over a date range
+            models.Index(fields=['station', 'created_at'], name='rental_station_created_idx'),
+        ]
     
     @property
     def current_overdue_amount(self):
@@ -67,18 +85,19 @@ class Rental(BaseModel):
             return Decimal('0')
         
         # Calculate REALTIME late fee using current time
-        from api.common.utils.helpers import (
-            calculate_late_fee_amount, 
-            get_package_rate_per_minute
-        )
+        from api.rentals.services.utils.late_fee_table import late_fee_rate_table
         
         # Use current time as hypothetical end time
         hypothetical_end = timezone.now()
         overdue_duration = hypothetical_end - self.due_at
         overdue_minutes = int(overdue_duration.total_seconds() / 60)
         
-        package_rate = get_package_rate_per_minute(self.package)
-        return calculate_late_fee_amount(package_rate, overdue_minutes)
+        # Precomputed rate table: no package fetch or config lookup per rental
+        fee = late_fee_rate_table.fee_for_package(self.package_id, overdue_minutes)
+        if fee is None:
+            from api.common.utils.helpers import get_package_rate_per_minute
+            fee = late_fee_rate_table.calculate(get_package_rate_per_minute(self.package), overdue_minutes)
+        return fee
     
     @property
     def estimated_total_cost(self):
@@ -108,6 +127,12 @@ class Rental(BaseModel):
         overdue_duration = end_time - self.due_at
         return int(overdue_duration.total_seconds() / 60)
 
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Reloaded values are the new baseline for user rental stats
+        from api.rentals.services.rental_stats_service import RentalStatsService
+        RentalStatsService.remember_state(self)
+
     def __str__(self):
         return f"{self.rental_code} - {self.user.username}"
 
@@ -171,16 +196,21 @@ class RentalLocation(BaseModel):
     """
     RentalLocation - GPS tracking of rented power banks
     """
-    rental = models.ForeignKey(Rental, on_delete=models.CASCADE, related_name='locations')
+    # Covered by the (rental, recorded_at) index, one index less per GPS insert
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE, related_name='locations', db_index=False)
     latitude = models.DecimalField(max_digits=10, decimal_places=6)
     longitude = models.DecimalField(max_digits=10, decimal_places=6)
     accuracy = models.DecimalField(max_digits=10, decimal_places=2)  # GPS accuracy in meters
-    recorded_at = models.DateTimeField(auto_now_add=True)
+    recorded_at = models.DateTimeField(default=timezone.now)  # Device time for batched points
 
     class Meta:
         db_table = "rental_locations"
         verbose_name = "Rental Location"
         verbose_name_plural = "Rental Locations"
+        indexes = [
+            # A rental's track is read (and cleaned up) as a time range
+            models.Index(fields=['rental', 'recorded_at'], name='rental_location_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.rental.rental_code} - {self.latitude}, {self.longitude}"
@@ -218,4 +248,73 @@ class RentalPackage(BaseModel):
         ordering = ['price']
 
     def __str__(self):
-        return f"{self.name} - {self.duration_minutes}min"
\ No newline at end of file
+        return f"{self.name} - {self.duration_minutes}min"
+
+
+class UserRentalStats(BaseModel):
+    """
+    UserRentalStats - Per-user rental totals, kept current as rentals change
+    """
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, related_name='rental_stats')
+    total_rentals = models.IntegerField(default=0)
+    completed_rentals = models.IntegerField(default=0)
+    cancelled_rentals = models.IntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_duration_seconds = models.BigIntegerField(default=0)  # Completed rentals only
+    timely_returns = models.IntegerField(default=0)
+    station_counts = models.JSONField(default=dict)  # station name -> rentals
+    package_counts = models.JSONField(default=dict)  # package name -> rentals
+    first_rental_date = models.DateTimeField(null=True, blank=True)
+    last_rental_date = models.DateTimeField(null=True, blank=True)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "user_rental_stats"
+        verbose_name = "User Rental Stats"
+        verbose_name_plural = "User Rental Stats"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_rentals} rentals"
+
+
+# ============================================================
+# Signal Handlers for Late Fee Rate Table Invalidation
+# ============================================================
+
+@receiver(post_save, sender=RentalPackage)
+@receiver(post_delete, sender=RentalPackage)
+@receiver(post_save, sender=LateFeeConfiguration)
+@receiver(post_delete, sender=LateFeeConfiguration)
+def invalidate_late_fee_rate_table(sender, instance, **kwargs):
+    """Reload late-fee rates when a package or late-fee rule changes"""
+    from api.rentals.services.utils.late_fee_table import late_fee_rate_table
+
+    late_fee_rate_table.invalidate_on_commit()
+
+
+# ============================================================
+# Signal Handlers for User Rental Stats
+# ============================================================
+
+@receiver(post_init, sender=Rental)
+def remember_rental_stats_state(sender, instance, **kwargs):
+    """Remember the loaded state so a save only applies what changed"""
+    from api.rentals.services.rental_stats_service import RentalStatsService
+
+    RentalStatsService.remember_state(instance)
+
+
+@receiver(post_save, sender=Rental)
+def update_user_rental_stats(sender, instance, created, update_fields=None, **kwargs):
+    """Apply a saved rental's change to its user's stats row"""
+    from api.rentals.services.rental_stats_service import RentalStatsService
+
+    RentalStatsService().apply_save(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Rental)
+def remove_from_user_rental_stats(sender, instance, **kwargs):
+    """Take a deleted rental out of its user's stats row"""
+    from api.rentals.services.rental_stats_service import RentalStatsService
+
+    RentalStatsService().apply_delete(instance)
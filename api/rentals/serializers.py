@@ -525,6 +525,33 @@ class RentalLocationUpdateSerializer(serializers.Serializer):
         return value
 
 
+class RentalLocationPointSerializer(RentalLocationUpdateSerializer):
+    """
+    One GPS point of a batched location upload.
+    Used in: POST /api/rentals/locations/batch
+    """
+    rental_id = serializers.UUIDField(
+        help_text="Active rental the point belongs to"
+    )
+    recorded_at = serializers.DateTimeField(
+        required=False,
+        help_text="Device time of the fix (defaults to the upload time)"
+    )
+
+
+class RentalLocationBatchSerializer(serializers.Serializer):
+    """
+    Request serializer for batched GPS uploads.
+    Used in: POST /api/rentals/locations/batch
+    """
+    points = RentalLocationPointSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=1000,
+        help_text="GPS points for one or many active rentals"
+    )
+
+
 # ============================================================================
 # FILTER & QUERY SERIALIZERS
 # ============================================================================
@@ -12,6 +12,9 @@ from .rental_service import RentalService
 from .rental_issue_service import RentalIssueService
 from .rental_location_service import RentalLocationService
 from .rental_analytics_service import RentalAnalyticsService
+from .rental_overdue_service import RentalOverdueService
+from .rental_deadline_service import RentalDeadlineService
+from .rental_stats_service import RentalStatsService
 
 
 __all__ = [
@@ -19,4 +22,7 @@ __all__ = [
     "RentalIssueService",
     "RentalLocationService",
     "RentalAnalyticsService",
+    "RentalOverdueService",
+    "RentalDeadlineService",
+    "RentalStatsService",
 ]
@@ -0,0 +1,262 @@
+"""
+Service for rental deadline events
+============================================================
+
+Pops due reminder/overdue/abandoned events from the rental deadline scheduler
+and handles them in batches, replacing the periodic scans over Rental.due_at.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.common.services.base import BaseService, ServiceException
+from api.rentals.models import Rental
+from api.rentals.services.utils.deadline_scheduler import (
+    RentalDeadlineScheduler,
+    rental_deadline_scheduler,
+)
+from api.rentals.services.utils.reminder_metrics import reminder_dispatch_metrics
+
+
+class RentalDeadlineService(BaseService):
+    """Service for reminder, overdue and abandonment deadlines"""
+
+    BATCH_SIZE = 500
+    LOST_PENALTY = 5000  # NPR penalty for a power bank that was never returned
+
+    def __init__(self, scheduler: Optional[RentalDeadlineScheduler] = None):
+        super().__init__()
+        self.scheduler = scheduler or rental_deadline_scheduler
+
+    # ==========================================
+    # SCHEDULING
+    # ==========================================
+
+    def schedule_on_commit(self, rental: Rental) -> None:
+        """Schedule (or reschedule) a rental's deadlines once the transaction commits"""
+        rental_id, due_at = rental.id, rental.due_at
+        transaction.on_commit(lambda: self.scheduler.schedule(rental_id, due_at))
+
+    def unschedule_on_commit(self, rental: Rental) -> None:
+        """Drop a rental's pending deadlines once the transaction commits"""
+        rental_id = rental.id
+        transaction.on_commit(lambda: self.scheduler.unschedule(rental_id))
+
+    def sync_schedule(self) -> Dict[str, int]:
+        """
+        Re-add deadlines for every open rental
+
+        Covers rentals started before the scheduler existed and events lost
+        with the scheduler's storage. Handlers re-check state, so re-adding
+        an already handled event is harmless.
+
+        Returns:
+            Dict with active and overdue rentals scheduled
+        """
+        active = self.scheduler.schedule_many(
+            Rental.objects.filter(status='ACTIVE').values_list('id', 'due_at').iterator()
+        )
+        overdue = self.scheduler.schedule_many(
+            Rental.objects.filter(status='OVERDUE').values_list('id', 'due_at').iterator(),
+            events=[RentalDeadlineScheduler.ABANDONED]
+        )
+        return {'active': active, 'overdue': overdue}
+
+    def pop_due_batches(self, now: Optional[datetime] = None) -> Dict[str, List[List[str]]]:
+        """
+        Pop every due event, grouped into batches per event type
+
+        Reminders are grouped by the minute they were meant to fire in, so
+        each minute bucket is rendered and sent by one task. Events popped
+        earlier whose lease ran out without an ack are due again first.
+
+        Returns:
+            Dict of event -> list of rental ID batches
+        """
+        now = now or timezone.now()
+        batches: Dict[str, List[List[str]]] = {}
+        for event in RentalDeadlineScheduler.EVENTS:
+            requeued = self.scheduler.requeue_expired(event, now)
+            if requeued:
+                self.log_warning(f"Requeued {requeued} unacknowledged {event} deadlines")
+            popped: List[Tuple[str, float]] = []
+            while True:
+                items = self.scheduler.pop_due_with_times(event, now, limit=self.BATCH_SIZE)
+                popped.extend(items)
+                if len(items) < self.BATCH_SIZE:
+                    break
+
+            if event == RentalDeadlineScheduler.REMINDER:
+                buckets: Dict[int, List[str]] = {}
+                for rental_id, fire_at in popped:
+                    buckets.setdefault(int(fire_at // 60), []).append(rental_id)
+                groups = [buckets[minute] for minute in sorted(buckets)]
+            else:
+                groups = [[rental_id for rental_id, _ in popped]] if popped else []
+
+            batches[event] = [
+                group[start:start + self.BATCH_SIZE]
+                for group in groups
+                for start in range(0, len(group), self.BATCH_SIZE)
+            ]
+        return batches
+
+    # ==========================================
+    # HANDLERS
+    # ==========================================
+
+    def handle(self, event: str, rental_ids: List[str]) -> Dict[str, int]:
+        """
+        Handle one batch of popped events
+
+        The batch is acknowledged once its handler returns; if it raises, the
+        events go back to the scheduler to be retried.
+        """
+        try:
+            result = self._handle(event, rental_ids)
+        except Exception:
+            self.scheduler.release(event, rental_ids)
+            raise
+        self.scheduler.ack(event, rental_ids)
+        return result
+
+    def _handle(self, event: str, rental_ids: List[str]) -> Dict[str, int]:
+        if event == RentalDeadlineScheduler.REMINDER:
+            return self.send_reminders(rental_ids)
+        if event == RentalDeadlineScheduler.OVERDUE:
+            return self.mark_overdue(rental_ids)
+        if event == RentalDeadlineScheduler.ABANDONED:
+            return self.complete_abandoned(rental_ids)
+        raise ValueError(f"Unknown rental deadline event: {event}")
+
+    def send_reminders(self, rental_ids: Iterable[str], now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Send rental_reminder to rentals due within the reminder lead time
+
+        The whole batch is rendered and sent with one NotifyService.send_many
+        call; sent counts and scheduling lag are recorded in
+        reminder_dispatch_metrics.
+
+        Returns:
+            Dict with reminder_count and failed_count
+        """
+        from api.notifications.services import NotifyService
+
+        now = now or timezone.now()
+        window_end = now + RentalDeadlineScheduler.REMINDER_LEAD
+        rentals = [
+            rental for rental in Rental.objects.filter(
+                id__in=list(rental_ids), status='ACTIVE', due_at__gt=now, due_at__lte=window_end
+            ).select_related('user')
+            if not rental.rental_metadata.get('reminder_sent')
+        ]
+        if not rentals:
+            return {'reminder_count': 0, 'failed_count': 0}
+
+        try:
+            result = NotifyService().send_many('rental_reminder', [
+                (rental.user, {
+                    'rental_id': str(rental.id),
+                    'rental_code': rental.rental_code,
+                    'due_time': rental.due_at.strftime('%H:%M')
+                })
+                for rental in rentals
+            ])
+        except ServiceException as e:
+            # Left unmarked so the next sync retries while still in the window
+            self.log_error(f"Failed to send {len(rentals)} rental reminders: {str(e)}")
+            reminder_dispatch_metrics.record_batch(0, len(rentals), [])
+            return {'reminder_count': 0, 'failed_count': len(rentals)}
+
+        for rental in rentals:
+            rental.rental_metadata['reminder_sent'] = True
+            rental.rental_metadata['reminder_sent_at'] = now.isoformat()
+        Rental.objects.bulk_update(rentals, ['rental_metadata'])
+
+        lags = [
+            (now - (rental.due_at - RentalDeadlineScheduler.REMINDER_LEAD)).total_seconds()
+            for rental in rentals
+        ]
+        reminder_dispatch_metrics.record_batch(result['success_count'], result['failure_count'], lags)
+        return {'reminder_count': result['success_count'], 'failed_count': result['failure_count']}
+
+    def mark_overdue(self, rental_ids: List[str]) -> Dict[str, int]:
+        """
+        Transition due rentals to OVERDUE and notify their users
+
+        Returns:
+            Dict with updated_count and sent/failed notification counts
+        """
+        from api.rentals.services.rental_overdue_service import RentalOverdueService
+
+        overdue_service = RentalOverdueService()
+        updated = overdue_service.mark_overdue(rental_ids=list(rental_ids))
+        result = overdue_service.notify_overdue(updated) if updated else {'sent': 0, 'failed': 0}
+        return {'updated_count': len(updated), **result}
+
+    def complete_abandoned(self, rental_ids: Iterable[str], now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Auto-complete rentals overdue for longer than ABANDON_AFTER
+
+        The power bank is marked lost and the lost penalty is added.
+
+        Returns:
+            Dict with completed_count
+        """
+        from api.notifications.services import notify
+
+        now = now or timezone.now()
+        cutoff_time = now - RentalDeadlineScheduler.ABANDON_AFTER
+        abandoned_rentals = Rental.objects.filter(
+            id__in=list(rental_ids), status__in=['ACTIVE', 'OVERDUE'], due_at__lt=cutoff_time
+        ).select_related('user', 'power_bank', 'slot')
+
+        completed_count = 0
+        for rental in abandoned_rentals:
+            try:
+                with transaction.atomic():
+                    # Mark as completed (assumed lost/stolen)
+                    rental.status = 'COMPLETED'
+                    rental.ended_at = now
+                    rental.is_returned_on_time = False
+                    rental.overdue_amount += self.LOST_PENALTY
+
+                    rental.rental_metadata['auto_completed'] = True
+                    rental.rental_metadata['lost_penalty'] = self.LOST_PENALTY
+                    rental.rental_metadata['completion_reason'] = 'abandoned'
+
+                    rental.save(update_fields=[
+                        'status', 'ended_at', 'is_returned_on_time',
+                        'overdue_amount', 'rental_metadata', 'updated_at'
+                    ])
+
+                    # Mark power bank as lost
+                    if rental.power_bank:
+                        rental.power_bank.status = 'DAMAGED'  # Or create a 'LOST' status
+                        rental.power_bank.hardware_info['lost_date'] = now.isoformat()
+                        rental.power_bank.save(update_fields=['status', 'hardware_info'])
+
+                    # Release slot
+                    if rental.slot:
+                        rental.slot.status = 'AVAILABLE'
+                        rental.slot.current_rental = None
+                        rental.slot.save(update_fields=['status', 'current_rental'])
+
+                completed_count += 1
+
+                notify(
+                    rental.user,
+                    'rental_auto_completed',
+                    async_send=True,
+                    powerbank_id=rental.power_bank.serial_number if rental.power_bank else '',
+                    total_cost=float(rental.overdue_amount)
+                )
+
+            except Exception as e:
+                self.log_error(f"Failed to auto-complete rental {rental.id}: {str(e)}")
+
+        return {'completed_count': completed_count}
@@ -8,6 +8,7 @@ Business Logic:
 - Track powerbank location during active rentals
 - Update location coordinates with accuracy
 - Log location history for analytics
+- Batched ingest of many points, downsampled and bulk inserted
 
 Author: Service Splitter (Cleaned)
 Date: 2025-10-17
@@ -15,11 +16,13 @@ Date: 2025-10-17
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from django.db import transaction
+from django.utils import timezone
 
 from api.common.services.base import CRUDService, ServiceException
 from api.rentals.models import RentalLocation, Rental
+from api.rentals.services.utils.location_buffer import rental_location_buffer
 
 if TYPE_CHECKING:
     from api.users.models import User
@@ -85,3 +88,65 @@ class RentalLocationService(CRUDService):
             )
         except Exception as e:
             self.handle_service_error(e, "Failed to update rental location")
+    
+    def ingest_locations(
+        self,
+        points: List[Dict[str, Any]],
+        user: Optional[User] = None
+    ) -> Dict[str, int]:
+        """
+        Ingest a batch of GPS points for one or many active rentals.
+        
+        Points are downsampled per rental and queued; the queue is written
+        with bulk_create by the flush task, which is also queued from here
+        once the flush interval has elapsed.
+        
+        Args:
+            points: Dicts with rental_id, latitude, longitude, accuracy and
+                optionally recorded_at (device time, defaults to now)
+            user: Only accept points for this user's rentals (None for
+                trusted internal callers)
+        
+        Returns:
+            Dict with accepted, dropped (downsampled) and rejected
+            (not an active rental) point counts
+        """
+        try:
+            now = timezone.now()
+            active_rentals = Rental.objects.filter(
+                id__in={str(point['rental_id']) for point in points},
+                status='ACTIVE'
+            )
+            if user is not None:
+                active_rentals = active_rentals.filter(user=user)
+            active_ids = {str(rental_id) for rental_id in active_rentals.values_list('id', flat=True)}
+            
+            points_by_rental: Dict[str, List[Dict[str, Any]]] = {}
+            rejected = 0
+            for point in points:
+                rental_id = str(point['rental_id'])
+                if rental_id not in active_ids:
+                    rejected += 1
+                    continue
+                points_by_rental.setdefault(rental_id, []).append({
+                    'latitude': round(float(point['latitude']), 6),
+                    'longitude': round(float(point['longitude']), 6),
+                    'accuracy': round(float(point.get('accuracy', 10.0)), 2),
+                    # Clock skew must not put points in the future
+                    'recorded_at': min(point.get('recorded_at') or now, now),
+                })
+            
+            result = rental_location_buffer.add(points_by_rental)
+            if result['accepted'] and rental_location_buffer.flush_due():
+                # Never write the shared backlog inside the upload request
+                try:
+                    from api.rentals.tasks import flush_rental_locations
+                    flush_rental_locations.delay()
+                except Exception as e:
+                    # The scheduled flush picks the points up
+                    self.log_warning(f"Failed to queue rental location flush: {str(e)}")
+            
+            return {**result, 'rejected': rejected}
+            
+        except Exception as e:
+            self.handle_service_error(e, "Failed to ingest rental locations")
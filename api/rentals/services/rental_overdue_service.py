@@ -0,0 +1,141 @@
+"""
+Service for set-based overdue rental transitions
+============================================================
+
+Moves past-due ACTIVE rentals to OVERDUE with bulk UPDATEs and notifies the
+affected users in batches, instead of saving and notifying row by row.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.common.services.base import BaseService
+from api.rentals.models import Rental
+
+
+class RentalOverdueService(BaseService):
+    """Service for the ACTIVE -> OVERDUE transition"""
+
+    CHUNK_SIZE = 2000
+    NOTIFICATION_BATCH_SIZE = 500
+
+    def mark_overdue(
+        self,
+        now: Optional[datetime] = None,
+        chunk_size: Optional[int] = None,
+        rental_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Transition every ACTIVE rental with due_at < now to OVERDUE
+
+        Runs in chunks so no single statement locks the whole set. On
+        PostgreSQL each chunk is one UPDATE ... RETURNING; elsewhere it is a
+        SELECT ... FOR UPDATE of ids plus an UPDATE of exactly those rows.
+        Either way a chunk returns only the rentals this call moved, so two
+        concurrent runners never notify the same rental.
+
+        Args:
+            rental_ids: Only consider these rentals (deadline scheduler batch)
+
+        Returns:
+            IDs of the rentals that were transitioned
+        """
+        now = now or timezone.now()
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        transitioned: List[str] = []
+
+        while True:
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    ids = self._update_chunk_returning(now, chunk_size, rental_ids)
+                else:
+                    ids = self._update_chunk(now, chunk_size, rental_ids)
+            transitioned.extend(ids)
+            if len(ids) < chunk_size:
+                break
+
+        self.log_info(f"Marked {len(transitioned)} rentals as overdue")
+        return transitioned
+
+    def _update_chunk_returning(
+        self, now: datetime, chunk_size: int, rental_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        table = Rental._meta.db_table
+        id_filter, params = '', [now, now]
+        if rental_ids is not None:
+            id_filter = 'AND id = ANY(%s::uuid[])'
+            params.append([str(rental_id) for rental_id in rental_ids])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} SET status = 'OVERDUE', updated_at = %s
+                WHERE id IN (
+                    SELECT id FROM {table}
+                    WHERE status = 'ACTIVE' AND due_at < %s {id_filter}
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id
+                """,
+                params + [chunk_size]
+            )
+            return [str(row[0]) for row in cursor.fetchall()]
+
+    def _update_chunk(self, now: datetime, chunk_size: int, rental_ids: Optional[List[str]] = None) -> List[str]:
+        # Lock the chunk so no other runner (or a return) can change these rows
+        # before our UPDATE; rows another runner holds are skipped
+        candidates = Rental.objects.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        ).filter(status='ACTIVE', due_at__lt=now)
+        if rental_ids is not None:
+            candidates = candidates.filter(id__in=rental_ids)
+        ids = list(candidates.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return []
+
+        # Status guard for backends without row locks (SQLite in development)
+        Rental.objects.filter(id__in=ids, status='ACTIVE').update(status='OVERDUE', updated_at=now)
+        return [str(rental_id) for rental_id in ids]
+
+    def notify_overdue(self, rental_ids: Iterable[str], now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Send rental_overdue notifications for a batch of rentals
+
+        Rentals, users and powerbanks are loaded with a single query.
+
+        Returns:
+            Dict with sent and failed counts
+        """
+        from api.notifications.services import notify
+
+        now = now or timezone.now()
+        rentals = (
+            Rental.objects.filter(id__in=list(rental_ids), status='OVERDUE')
+            .select_related('user', 'power_bank')
+        )
+
+        sent = failed = 0
+        for rental in rentals:
+            try:
+                notify(
+                    rental.user,
+                    'rental_overdue',
+                    powerbank_id=rental.power_bank.serial_number if rental.power_bank else '',
+                    overdue_hours=int((now - rental.due_at).total_seconds() / 3600),
+                    penalty_amount=float(rental.overdue_amount)
+                )
+                sent += 1
+            except Exception as e:
+                failed += 1
+                self.log_error(f"Failed to send overdue notification for rental {rental.id}: {str(e)}")
+
+        return {'sent': sent, 'failed': failed}
+
+    def batch_ids(self, rental_ids: List[str]) -> List[List[str]]:
+        """Split rental IDs into notification batches"""
+        size = self.NOTIFICATION_BATCH_SIZE
+        return [rental_ids[i:i + size] for i in range(0, len(rental_ids), size)]
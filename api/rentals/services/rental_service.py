@@ -14,7 +14,6 @@ from typing import Dict, Any, Optional, Tuple
 from decimal import Decimal
 from django.db import transaction
 from django.utils import timezone
-from django.db.models import Count, Sum
 from api.common.services.base import CRUDService, ServiceException
 from api.common.utils.helpers import generate_rental_code, paginate_queryset
 from api.rentals.models import (
@@ -22,6 +21,8 @@ from api.rentals.models import (
 )
 from api.stations.models import Station, StationSlot, PowerBank
 from api.common.permissions.base import CanRentPowerBank
+from api.system.services.app_config_snapshot import app_config_snapshot
+from api.rentals.services.rental_deadline_service import RentalDeadlineService
 
 
 class RentalService(CRUDService):
@@ -50,15 +51,18 @@ class RentalService(CRUDService):
             # Validate station availability
             self._validate_station_availability(station)
             
-            # Get available power bank and slot
-            power_bank, slot = self._get_available_power_bank_and_slot(station)
-            
             # FIX #5: Validate POSTPAID minimum balance requirement
             if package.payment_model == 'POSTPAID':
                 self._validate_postpaid_balance(user)
             
-            # CRITICAL FIX: Create rental FIRST (in PENDING status)
-            # This allows transaction to be linked to rental
+            # Claim a power bank and its slot in one statement (skips rows
+            # held by concurrent rentals at the same station)
+            power_bank, slot = self._get_available_power_bank_and_slot(station)
+            
+            # Rental is created ACTIVE; a failed prepayment rolls it back
+            # together with the claim
+            is_prepaid = package.payment_model == 'PREPAID'
+            now = timezone.now()
             rental = Rental.objects.create(
                 user=user,
                 station=station,
@@ -66,42 +70,22 @@ class RentalService(CRUDService):
                 package=package,
                 power_bank=power_bank,
                 rental_code=generate_rental_code(),
-                status='PENDING',  # Will be set to ACTIVE after payment
-                due_at=timezone.now() + timezone.timedelta(minutes=package.duration_minutes),
-                amount_paid=Decimal('0')  # Will be updated after payment
+                status='ACTIVE',
+                started_at=now,
+                due_at=now + timezone.timedelta(minutes=package.duration_minutes),
+                amount_paid=package.price if is_prepaid else Decimal('0'),
+                payment_status='PAID' if is_prepaid else 'PENDING'
             )
             
             # Process payment based on package payment model
-            payment_transaction = None
-            if package.payment_model == 'PREPAID':
-                payment_transaction = self._process_prepayment(user, package, rental)
-                # Update rental amount after payment
-                rental.amount_paid = package.price
-                rental.save(update_fields=['amount_paid'])
-            
-            # Assign power bank to rental
+            if is_prepaid:
+                self._process_prepayment(user, package, rental)
+            
             from api.stations.services import PowerBankService
-            powerbank_service = PowerBankService()
-            powerbank_service.assign_power_bank_to_rental(power_bank, rental)
-            
-            # Start the rental
-            rental.status = 'ACTIVE'
-            rental.started_at = timezone.now()
-            rental.payment_status = 'PAID' if package.payment_model == 'PREPAID' else 'PENDING'
-            rental.save(update_fields=['status', 'started_at', 'payment_status'])
-            
-            # Schedule reminder notification (15 minutes before due)
-            reminder_time = rental.due_at - timezone.timedelta(minutes=15)
-            if reminder_time > timezone.now():
-                from api.notifications.tasks import send_notification_task
-                send_notification_task.apply_async(
-                    args=[str(user.id), 'rental_reminder', {
-                        'rental_id': str(rental.id),
-                        'rental_code': rental.rental_code,
-                        'due_time': rental.due_at.strftime('%H:%M')
-                    }],
-                    eta=reminder_time
-                )
+            PowerBankService().link_slot_to_rental(slot, rental)
+            
+            # Schedule reminder, overdue and abandonment deadlines
+            RentalDeadlineService().schedule_on_commit(rental)
             
             # Send rental start notification using clean API
             from api.notifications.services import notify
@@ -171,12 +155,8 @@ class RentalService(CRUDService):
         However, we require a minimum wallet balance to ensure payment capability
         and reduce risk of unpaid rentals.
         """
-        from api.system.models import AppConfig
-        
         # Get minimum balance requirement from AppConfig (default NPR 50)
-        min_balance = Decimal(AppConfig.objects.filter(
-            key='POSTPAID_MINIMUM_BALANCE', is_active=True
-        ).values_list('value', flat=True).first() or '50')
+        min_balance = app_config_snapshot.get_decimal('POSTPAID_MINIMUM_BALANCE', Decimal('50'))
         
         # Get user's wallet balance
         wallet_balance = Decimal('0')
@@ -192,34 +172,16 @@ class RentalService(CRUDService):
         self.log_info(f"POSTPAID balance check passed for user {user.username}: NPR {wallet_balance} >= NPR {min_balance}")
     
     def _get_available_power_bank_and_slot(self, station: Station) -> Tuple[PowerBank, StationSlot]:
-        """Get available power bank and slot from station"""
-        # CRITICAL FIX: Use select_for_update() to prevent race conditions
-        # Lock the slot row until transaction completes
-        available_slot = station.slots.select_for_update().filter(
-            status='AVAILABLE'
-        ).order_by('-battery_level').first()
+        """Claim an available power bank and its slot at the station"""
+        from api.stations.services import PowerBankService
         
-        if not available_slot:
-            raise ServiceException(
-                detail="No available slots at this station",
-                code="no_available_slots"
-            )
-        
-        # Find power bank in the slot with row-level lock
-        power_bank = PowerBank.objects.select_for_update().filter(
-            current_station=station,
-            current_slot=available_slot,
-            status='AVAILABLE',
-            battery_level__gte=20  # Minimum 20% battery
-        ).first()
-        
-        if not power_bank:
+        claimed = PowerBankService().claim_available_power_bank(station)
+        if not claimed:
             raise ServiceException(
                 detail="No power bank available with sufficient battery",
                 code="no_power_bank_available"
             )
-        
-        return power_bank, available_slot
+        return claimed
     
     def _process_prepayment(self, user, package: RentalPackage, rental=None):
         """Process pre-payment for rental"""
@@ -264,12 +226,8 @@ class RentalService(CRUDService):
             
             # Check if rental can be cancelled (configurable time window)
             if rental.started_at:
-                from api.system.models import AppConfig
-                
                 # Get cancellation window from AppConfig (default 5 minutes)
-                cancellation_window_minutes = int(AppConfig.objects.filter(
-                    key='RENTAL_CANCELLATION_WINDOW_MINUTES', is_active=True
-                ).values_list('value', flat=True).first() or 5)
+                cancellation_window_minutes = app_config_snapshot.get_int('RENTAL_CANCELLATION_WINDOW_MINUTES', 5)
                 
                 time_since_start = timezone.now() - rental.started_at
                 cancellation_window_seconds = cancellation_window_minutes * 60
@@ -318,6 +276,7 @@ class RentalService(CRUDService):
             rental.ended_at = timezone.now()
             rental.rental_metadata['cancellation_reason'] = reason
             rental.save(update_fields=['status', 'ended_at', 'rental_metadata'])
+            RentalDeadlineService().unschedule_on_commit(rental)
             
             # Release power bank and slot - FIXED: Restore to original location
             if rental.power_bank:
@@ -418,10 +377,7 @@ class RentalService(CRUDService):
                 )
             
             # FIX #1: Check extension limit
-            from api.system.models import AppConfig
-            max_extensions = int(AppConfig.objects.filter(
-                key='MAX_RENTAL_EXTENSIONS', is_active=True
-            ).values_list('value', flat=True).first() or 3)
+            max_extensions = app_config_snapshot.get_int('MAX_RENTAL_EXTENSIONS', 3)
             
             extension_count = rental.extensions.count()
             if extension_count >= max_extensions:
@@ -468,6 +424,7 @@ class RentalService(CRUDService):
             rental.due_at += timezone.timedelta(minutes=package.duration_minutes)
             rental.amount_paid += package.price
             rental.save(update_fields=['due_at', 'amount_paid'])
+            RentalDeadlineService().schedule_on_commit(rental)
             
             # FIX #3: Send extension notification
             from api.notifications.services import notify
@@ -527,6 +484,7 @@ class RentalService(CRUDService):
                 'status', 'ended_at', 'return_station', 'is_returned_on_time',
                 'overdue_amount', 'payment_status'
             ])
+            RentalDeadlineService().unschedule_on_commit(rental)
             
             # FIXED: Auto-collect pending payments
             if rental.payment_status == 'PENDING':
@@ -541,12 +499,9 @@ class RentalService(CRUDService):
             
             # Award completion points
             from api.points.services import award_points
-            from api.system.models import AppConfig
             
             # Standard completion points
-            completion_points = int(AppConfig.objects.filter(
-                key='POINTS_RENTAL_COMPLETE', is_active=True
-            ).values_list('value', flat=True).first() or 5)
+            completion_points = app_config_snapshot.get_int('POINTS_RENTAL_COMPLETE', 5)
             
             award_points(
                 rental.user,
@@ -560,9 +515,7 @@ class RentalService(CRUDService):
             
             # FIXED: Award timely return bonus
             if rental.is_returned_on_time and not rental.timely_return_bonus_awarded:
-                timely_bonus = int(AppConfig.objects.filter(
-                    key='POINTS_TIMELY_RETURN', is_active=True
-                ).values_list('value', flat=True).first() or 50)
+                timely_bonus = app_config_snapshot.get_int('POINTS_TIMELY_RETURN', 50)
                 
                 award_points(
                     rental.user,
@@ -747,68 +700,8 @@ class RentalService(CRUDService):
     def get_rental_stats(self, user) -> Dict[str, Any]:
         """Get user's rental statistics"""
         try:
-            rentals = Rental.objects.filter(user=user)
-            
-            # Basic counts
-            total_rentals = rentals.count()
-            completed_rentals = rentals.filter(status='COMPLETED').count()
-            active_rentals = rentals.filter(status__in=['PENDING', 'ACTIVE']).count()
-            cancelled_rentals = rentals.filter(status='CANCELLED').count()
-            
-            # Financial stats
-            total_spent = rentals.filter(payment_status='PAID').aggregate(
-                total=Sum('amount_paid')
-            )['total'] or Decimal('0')
-            
-            # Time stats
-            completed_with_time = rentals.filter(
-                status='COMPLETED',
-                started_at__isnull=False,
-                ended_at__isnull=False
-            )
-            
-            total_time_used = 0
-            if completed_with_time.exists():
-                for rental in completed_with_time:
-                    duration = rental.ended_at - rental.started_at
-                    total_time_used += int(duration.total_seconds() / 60)
-            
-            average_duration = total_time_used / completed_rentals if completed_rentals > 0 else 0
-            
-            # Return stats
-            timely_returns = rentals.filter(is_returned_on_time=True).count()
-            late_returns = completed_rentals - timely_returns
-            timely_return_rate = (timely_returns / completed_rentals * 100) if completed_rentals > 0 else 0
-            
-            # Favorites
-            favorite_station = rentals.values('station__station_name').annotate(
-                count=Count('id')
-            ).order_by('-count').first()
-            
-            favorite_package = rentals.values('package__name').annotate(
-                count=Count('id')
-            ).order_by('-count').first()
-            
-            # Dates
-            first_rental = rentals.order_by('created_at').first()
-            last_rental = rentals.order_by('-created_at').first()
-            
-            return {
-                'total_rentals': total_rentals,
-                'completed_rentals': completed_rentals,
-                'active_rentals': active_rentals,
-                'cancelled_rentals': cancelled_rentals,
-                'total_spent': total_spent,
-                'total_time_used': total_time_used,
-                'average_rental_duration': round(average_duration, 1),
-                'timely_returns': timely_returns,
-                'late_returns': late_returns,
-                'timely_return_rate': round(timely_return_rate, 1),
-                'favorite_station': favorite_station['station__station_name'] if favorite_station else None,
-                'favorite_package': favorite_package['package__name'] if favorite_package else None,
-                'first_rental_date': first_rental.created_at if first_rental else None,
-                'last_rental_date': last_rental.created_at if last_rental else None
-            }
+            from api.rentals.services.rental_stats_service import RentalStatsService
+            return RentalStatsService().get_stats(user)
             
         except Exception as e:
             self.handle_service_error(e, "Failed to get rental stats")
@@ -0,0 +1,245 @@
+"""
+Service for per-user rental statistics
+============================================================
+
+Keeps one UserRentalStats row per user current as that user's rentals are
+saved, so the stats endpoint reads a single row instead of aggregating the
+user's whole rental history on every request.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from api.common.services.base import BaseService
+from api.rentals.models import Rental, UserRentalStats
+
+
+class RentalStatsService(BaseService):
+    """Service for user rental statistics"""
+
+    # Rental fields the stats row is derived from
+    TRACKED_FIELDS = ('status', 'payment_status', 'amount_paid', 'is_returned_on_time', 'started_at', 'ended_at')
+    OPEN_STATUSES = ['PENDING', 'ACTIVE']
+
+    # ==========================================
+    # READ SIDE
+    # ==========================================
+
+    def get_stats(self, user) -> Dict[str, Any]:
+        """
+        Get a user's rental statistics from their stats row
+
+        The row is built from the user's rentals the first time it is read;
+        afterwards this is one query.
+
+        Returns:
+            Dict shaped like RentalStatsSerializer
+        """
+        stats = self._stats_with_active(user.id)
+        if stats is None:
+            self.rebuild(user.id)
+            stats = self._stats_with_active(user.id)
+
+        average_duration = (
+            stats.total_duration_seconds / 60 / stats.completed_rentals if stats.completed_rentals else 0
+        )
+        timely_return_rate = (
+            stats.timely_returns / stats.completed_rentals * 100 if stats.completed_rentals else 0
+        )
+        return {
+            'total_rentals': stats.total_rentals,
+            'completed_rentals': stats.completed_rentals,
+            'active_rentals': stats.active_rentals,
+            'cancelled_rentals': stats.cancelled_rentals,
+            'total_spent': stats.total_spent,
+            'total_time_used': stats.total_duration_seconds // 60,
+            'average_rental_duration': round(average_duration, 1),
+            'timely_returns': stats.timely_returns,
+            'late_returns': stats.completed_rentals - stats.timely_returns,
+            'timely_return_rate': round(timely_return_rate, 1),
+            'favorite_station': self._most_used(stats.station_counts),
+            'favorite_package': self._most_used(stats.package_counts),
+            'first_rental_date': stats.first_rental_date,
+            'last_rental_date': stats.last_rental_date,
+        }
+
+    def _stats_with_active(self, user_id) -> Optional[UserRentalStats]:
+        # Open rentals also change through set-based updates (overdue marking),
+        # so they are counted live from the (user, status) index
+        active_rentals = Rental.objects.filter(
+            user_id=OuterRef('user_id'), status__in=self.OPEN_STATUSES
+        ).order_by().values('user_id').annotate(count=Count('id')).values('count')
+        return UserRentalStats.objects.filter(user_id=user_id).annotate(
+            active_rentals=Coalesce(Subquery(active_rentals), 0)
+        ).first()
+
+    @staticmethod
+    def _most_used(counts: Dict[str, int]) -> Optional[str]:
+        return max(counts, key=counts.get) if counts else None
+
+    # ==========================================
+    # FULL REBUILD
+    # ==========================================
+
+    def compute(self, user_id) -> Dict[str, Any]:
+        """
+        Aggregate a user's rentals in one pass
+
+        One grouped query with conditional aggregates per (station, package)
+        pair; the per-pair rows are folded into totals and favourites here.
+
+        Returns:
+            Dict of UserRentalStats field values
+        """
+        duration = ExpressionWrapper(F('ended_at') - F('started_at'), output_field=DurationField())
+        rows = Rental.objects.filter(user_id=user_id).order_by().values(
+            'station__station_name', 'package__name'
+        ).annotate(
+            rentals=Count('id'),
+            completed=Count('id', filter=Q(status='COMPLETED')),
+            cancelled=Count('id', filter=Q(status='CANCELLED')),
+            spent=Sum('amount_paid', filter=Q(payment_status='PAID')),
+            duration=Sum(duration, filter=Q(
+                status='COMPLETED', started_at__isnull=False, ended_at__isnull=False
+            )),
+            timely=Count('id', filter=Q(is_returned_on_time=True)),
+            first=Min('created_at'),
+            last=Max('created_at'),
+        )
+
+        values = {
+            'total_rentals': 0,
+            'completed_rentals': 0,
+            'cancelled_rentals': 0,
+            'total_spent': Decimal('0'),
+            'total_duration_seconds': 0,
+            'timely_returns': 0,
+            'station_counts': {},
+            'package_counts': {},
+            'first_rental_date': None,
+            'last_rental_date': None,
+        }
+        for row in rows:
+            values['total_rentals'] += row['rentals']
+            values['completed_rentals'] += row['completed']
+            values['cancelled_rentals'] += row['cancelled']
+            values['total_spent'] += row['spent'] or Decimal('0')
+            values['total_duration_seconds'] += int(row['duration'].total_seconds()) if row['duration'] else 0
+            values['timely_returns'] += row['timely']
+            self._add_count(values['station_counts'], row['station__station_name'], row['rentals'])
+            self._add_count(values['package_counts'], row['package__name'], row['rentals'])
+            if values['first_rental_date'] is None or row['first'] < values['first_rental_date']:
+                values['first_rental_date'] = row['first']
+            if values['last_rental_date'] is None or row['last'] > values['last_rental_date']:
+                values['last_rental_date'] = row['last']
+        return values
+
+    def rebuild(self, user_id) -> UserRentalStats:
+        """Recompute a user's stats row from their rentals"""
+        stats, _ = UserRentalStats.objects.update_or_create(user_id=user_id, defaults=self.compute(user_id))
+        return stats
+
+    # ==========================================
+    # INCREMENTAL UPDATES
+    # ==========================================
+
+    @classmethod
+    def remember_state(cls, rental: Rental) -> None:
+        """Snapshot the tracked fields of a rental as loaded (deferred fields are left out)"""
+        rental._stats_state = {
+            field: rental.__dict__[field] for field in cls.TRACKED_FIELDS if field in rental.__dict__
+        }
+
+    def apply_save(self, rental: Rental, created: bool, update_fields: Optional[Iterable[str]] = None) -> None:
+        """
+        Apply one rental save to its user's stats row
+
+        Only the difference between the rental's contribution before and
+        after the save is added, so e.g. a completion adds one completed
+        rental and its duration without re-reading the user's history.
+        """
+        saved = self.TRACKED_FIELDS if update_fields is None else [
+            field for field in self.TRACKED_FIELDS if field in update_fields
+        ]
+        before = getattr(rental, '_stats_state', {})
+        after = {**before, **{field: rental.__dict__[field] for field in saved if field in rental.__dict__}}
+        rental._stats_state = after
+        if not created and not saved:
+            return
+
+        if created:
+            self._apply(rental, self._contribution(after), sign=1)
+        elif all(field in before for field in self.TRACKED_FIELDS):
+            old, new = self._contribution(before), self._contribution(after)
+            delta = {field: new[field] - old[field] for field in new}
+            if any(delta.values()):
+                self._apply(rental, delta)
+        else:
+            # Loaded with deferred fields: the previous state is unknown
+            self.rebuild(rental.user_id)
+
+    def apply_delete(self, rental: Rental) -> None:
+        """Take a deleted rental back out of its user's stats row"""
+        state = getattr(rental, '_stats_state', {})
+        if all(field in state for field in self.TRACKED_FIELDS):
+            self._apply(rental, self._contribution(state), sign=-1)
+
+    def _contribution(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """What one rental in the given state adds to the stats row"""
+        completed = state['status'] == 'COMPLETED'
+        duration = 0
+        if completed and state['started_at'] and state['ended_at']:
+            duration = int((state['ended_at'] - state['started_at']).total_seconds())
+        return {
+            'completed_rentals': int(completed),
+            'cancelled_rentals': int(state['status'] == 'CANCELLED'),
+            'total_spent': Decimal(str(state['amount_paid'] or 0)) if state['payment_status'] == 'PAID' else Decimal('0'),
+            'total_duration_seconds': duration,
+            'timely_returns': int(bool(state['is_returned_on_time'])),
+        }
+
+    def _apply(self, rental: Rental, delta: Dict[str, Any], sign: Optional[int] = None) -> None:
+        """
+        Add delta to the stats row under a row lock
+
+        With sign (+1 created, -1 deleted) the rental itself is also added
+        to or removed from the totals, favourites and dates.
+        """
+        with transaction.atomic():
+            stats = UserRentalStats.objects.select_for_update().filter(user_id=rental.user_id).first()
+            if stats is None:
+                if sign != -1:
+                    # First rental, or a user from before the stats row existed
+                    self.rebuild(rental.user_id)
+                return
+
+            for field, value in delta.items():
+                setattr(stats, field, getattr(stats, field) + (value if sign is None else sign * value))
+
+            if sign is not None:
+                stats.total_rentals += sign
+                self._add_count(stats.station_counts, rental.station.station_name, sign)
+                self._add_count(stats.package_counts, rental.package.name, sign)
+                if sign > 0:
+                    if stats.first_rental_date is None or rental.created_at < stats.first_rental_date:
+                        stats.first_rental_date = rental.created_at
+                    if stats.last_rental_date is None or rental.created_at > stats.last_rental_date:
+                        stats.last_rental_date = rental.created_at
+            stats.save()
+
+        if sign == -1 and rental.created_at in (stats.first_rental_date, stats.last_rental_date):
+            # The removed rental bounded the date range
+            self.rebuild(rental.user_id)
+
+    @staticmethod
+    def _add_count(counts: Dict[str, int], name: Optional[str], delta: int) -> None:
+        if name is None:
+            return
+        counts[name] = counts.get(name, 0) + delta
+        if counts[name] <= 0:
+            del counts[name]
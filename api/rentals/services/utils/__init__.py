@@ -0,0 +1,18 @@
+"""
+Utility modules for rentals services
+"""
+from .deadline_scheduler import RentalDeadlineScheduler, rental_deadline_scheduler
+from .late_fee_table import LateFeeRateTable, late_fee_rate_table
+from .location_buffer import RentalLocationBuffer, rental_location_buffer
+from .reminder_metrics import ReminderDispatchMetrics, reminder_dispatch_metrics
+
+__all__ = [
+    'RentalDeadlineScheduler',
+    'rental_deadline_scheduler',
+    'LateFeeRateTable',
+    'late_fee_rate_table',
+    'RentalLocationBuffer',
+    'rental_location_buffer',
+    'ReminderDispatchMetrics',
+    'reminder_dispatch_metrics',
+]
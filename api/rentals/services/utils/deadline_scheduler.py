@@ -0,0 +1,282 @@
+"""
+Due-time scheduler for rental deadline events
+Each event type (reminder, overdue, abandoned) is a sorted set of rental ids
+scored by the time the event fires. The dispatcher pops only members whose
+time has passed, so no periodic task has to scan Rental on due_at. Popped
+members wait in a processing set until their handler acknowledges them
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+from api.common.utils.shared_redis import REDIS_UNAVAILABLE, decode_redis_value, redis_call
+
+
+class RentalDeadlineScheduler:
+    """
+    Sorted-set timer for rental deadlines
+
+    Entries live in Redis sorted sets when the default cache is django-redis,
+    otherwise in a process-local dict (single-process/development only; the
+    sync_rental_deadlines task repopulates it). Scheduling a rental again
+    overwrites its scores, so extensions just call schedule() with the new
+    due_at. Popping is atomic, so concurrent dispatchers never both get the
+    same rental.
+
+    Popped events move to a processing set leased for PROCESSING_LEASE. The
+    handler ack()s them on success or release()s them on failure; leases
+    that run out (worker died) go back to the due set on the next
+    requeue_expired(), so a lost task delays an event instead of dropping it.
+    """
+
+    KEY_PREFIX = "rentals:deadlines"
+
+    REMINDER = 'reminder'
+    OVERDUE = 'overdue'
+    ABANDONED = 'abandoned'
+    EVENTS = (REMINDER, OVERDUE, ABANDONED)
+
+    REMINDER_LEAD = timedelta(minutes=15)
+    ABANDON_AFTER = timedelta(hours=24)
+
+    # How long a popped event may wait for its handler before it is due again
+    PROCESSING_LEASE = timedelta(minutes=5)
+    # Delay before an event whose handler failed is popped again
+    RETRY_DELAY = timedelta(minutes=1)
+
+    # Moves due members into the processing set (scored by lease expiry) and
+    # returns a flat [member, score, member, score, ...] list of fire times
+    POP_SCRIPT = """
+    local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+    local ids = {}
+    for i = 1, #items, 2 do
+        ids[#ids + 1] = items[i]
+        redis.call('ZADD', KEYS[2], ARGV[3], items[i])
+    end
+    if #ids > 0 then
+        redis.call('ZREM', KEYS[1], unpack(ids))
+    end
+    return items
+    """
+
+    # Moves processing members leased until ARGV[1] or earlier back to the
+    # due set at ARGV[2], keeping a score set by a reschedule meanwhile
+    REQUEUE_SCRIPT = """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+    for i = 1, #ids do
+        redis.call('ZADD', KEYS[1], 'NX', ARGV[2], ids[i])
+    end
+    if #ids > 0 then
+        redis.call('ZREM', KEYS[2], unpack(ids))
+    end
+    return #ids
+    """
+
+    def __init__(self):
+        self._local: Dict[str, Dict[str, float]] = {event: {} for event in self.EVENTS}
+        self._local_processing: Dict[str, Dict[str, float]] = {event: {} for event in self.EVENTS}
+        self._lock = threading.Lock()
+
+    def _key(self, event: str) -> str:
+        return f"{self.KEY_PREFIX}:{event}"
+
+    def _processing_key(self, event: str) -> str:
+        return f"{self.KEY_PREFIX}:{event}:processing"
+
+    def event_times(self, due_at: datetime) -> Dict[str, datetime]:
+        """When each event fires for a rental due at due_at"""
+        return {
+            self.REMINDER: due_at - self.REMINDER_LEAD,
+            self.OVERDUE: due_at,
+            self.ABANDONED: due_at + self.ABANDON_AFTER,
+        }
+
+    # ==========================================
+    # WRITE SIDE
+    # ==========================================
+
+    def schedule(self, rental_id: Any, due_at: datetime, events: Iterable[str] = EVENTS) -> None:
+        """Schedule (or reschedule) deadline events for one rental"""
+        self.schedule_many([(rental_id, due_at)], events)
+
+    def schedule_many(self, rentals: Iterable[Tuple[Any, datetime]], events: Iterable[str] = EVENTS) -> int:
+        """
+        Schedule deadline events for many rentals in one round trip
+
+        Returns:
+            Number of rentals scheduled
+        """
+        events = tuple(events)
+        mappings: Dict[str, Dict[str, float]] = {event: {} for event in events}
+        count = 0
+        for rental_id, due_at in rentals:
+            times = self.event_times(due_at)
+            for event in events:
+                mappings[event][str(rental_id)] = times[event].timestamp()
+            count += 1
+        if not count:
+            return 0
+
+        def schedule(redis):
+            pipe = redis.pipeline(transaction=False)
+            for event, mapping in mappings.items():
+                pipe.zadd(self._key(event), mapping)
+            return pipe.execute()
+
+        if redis_call(schedule, "Rental deadline schedule failed, using local scheduler") is not REDIS_UNAVAILABLE:
+            return count
+        with self._lock:
+            for event, mapping in mappings.items():
+                self._local[event].update(mapping)
+        return count
+
+    def unschedule(self, rental_id: Any) -> None:
+        """Drop every pending event for a rental (returned or cancelled)"""
+        member = str(rental_id)
+
+        def unschedule(redis):
+            pipe = redis.pipeline(transaction=False)
+            for event in self.EVENTS:
+                pipe.zrem(self._key(event), member)
+                pipe.zrem(self._processing_key(event), member)
+            return pipe.execute()
+
+        redis_call(unschedule, "Rental deadline unschedule failed")
+        with self._lock:
+            for event in self.EVENTS:
+                self._local[event].pop(member, None)
+                self._local_processing[event].pop(member, None)
+
+    def ack(self, event: str, rental_ids: Iterable[Any]) -> None:
+        """Drop popped events whose handler succeeded"""
+        members = [str(rental_id) for rental_id in rental_ids]
+        if not members:
+            return
+        redis_call(
+            lambda redis: redis.zrem(self._processing_key(event), *members),
+            "Rental deadline ack failed"
+        )
+        with self._lock:
+            processing = self._local_processing[event]
+            for member in members:
+                processing.pop(member, None)
+
+    def release(self, event: str, rental_ids: Iterable[Any], now: Optional[datetime] = None) -> None:
+        """Put popped events whose handler failed back, due again after RETRY_DELAY"""
+        members = [str(rental_id) for rental_id in rental_ids]
+        if not members:
+            return
+        retry_at = ((now or timezone.now()) + self.RETRY_DELAY).timestamp()
+
+        def release(redis):
+            pipe = redis.pipeline(transaction=True)
+            pipe.zadd(self._key(event), {member: retry_at for member in members}, nx=True)
+            pipe.zrem(self._processing_key(event), *members)
+            return pipe.execute()
+
+        redis_call(release, "Rental deadline release failed")
+        with self._lock:
+            pending = self._local[event]
+            processing = self._local_processing[event]
+            for member in members:
+                if processing.pop(member, None) is not None:
+                    pending.setdefault(member, retry_at)
+
+    def requeue_expired(self, event: str, now: datetime) -> int:
+        """
+        Put back popped events whose lease ran out without an ack or release
+
+        Returns:
+            Number of events made due again
+        """
+        score = now.timestamp()
+        requeued = redis_call(
+            lambda redis: redis.eval(self.REQUEUE_SCRIPT, 2, self._key(event), self._processing_key(event), score, score),
+            "Rental deadline requeue failed"
+        )
+        count = 0 if requeued is REDIS_UNAVAILABLE else int(requeued)
+        with self._lock:
+            pending = self._local[event]
+            processing = self._local_processing[event]
+            for member in [member for member, lease in processing.items() if lease <= score]:
+                del processing[member]
+                pending.setdefault(member, score)
+                count += 1
+        return count
+
+    # ==========================================
+    # READ SIDE
+    # ==========================================
+
+    def pop_due(self, event: str, now: datetime, limit: int = 500) -> List[str]:
+        """
+        Atomically move up to limit due rentals to processing and return them
+
+        The caller must ack() or release() them; otherwise they are due again
+        once PROCESSING_LEASE runs out.
+
+        Returns:
+            Rental IDs, earliest first
+        """
+        return [rental_id for rental_id, _ in self.pop_due_with_times(event, now, limit)]
+
+    def pop_due_with_times(self, event: str, now: datetime, limit: int = 500) -> List[Tuple[str, float]]:
+        """
+        Like pop_due(), also returning when each event was meant to fire
+
+        Returns:
+            (rental id, fire time as a unix timestamp) pairs, earliest first
+        """
+        score = now.timestamp()
+        lease = (now + self.PROCESSING_LEASE).timestamp()
+        items: List[Tuple[str, float]] = []
+        raw = redis_call(
+            lambda redis: redis.eval(
+                self.POP_SCRIPT, 2, self._key(event), self._processing_key(event), score, limit, lease
+            ),
+            "Rental deadline pop failed"
+        )
+        if raw is not REDIS_UNAVAILABLE:
+            items.extend((decode_redis_value(member), float(fire_at)) for member, fire_at in zip(raw[::2], raw[1::2]))
+
+        remaining = limit - len(items)
+        if remaining > 0:
+            with self._lock:
+                pending = self._local[event]
+                due = sorted(
+                    ((member, at) for member, at in pending.items() if at <= score),
+                    key=lambda item: item[1]
+                )[:remaining]
+                processing = self._local_processing[event]
+                for member, _ in due:
+                    del pending[member]
+                    processing[member] = lease
+            items.extend(due)
+        return items
+
+    def pending_count(self, event: str) -> int:
+        """Number of scheduled (not yet popped) events of a type"""
+        shared = redis_call(lambda redis: redis.zcard(self._key(event)))
+        return len(self._local[event]) + (0 if shared is REDIS_UNAVAILABLE else shared)
+
+    def processing_count(self, event: str) -> int:
+        """Number of popped events of a type waiting for an ack"""
+        shared = redis_call(lambda redis: redis.zcard(self._processing_key(event)))
+        return len(self._local_processing[event]) + (0 if shared is REDIS_UNAVAILABLE else shared)
+
+    def clear(self) -> None:
+        """Drop every scheduled event (tests)"""
+        redis_call(lambda redis: redis.delete(
+            *[self._key(event) for event in self.EVENTS],
+            *[self._processing_key(event) for event in self.EVENTS]
+        ))
+        with self._lock:
+            for pending in (*self._local.values(), *self._local_processing.values()):
+                pending.clear()
+
+
+rental_deadline_scheduler = RentalDeadlineScheduler()
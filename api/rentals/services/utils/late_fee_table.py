@@ -0,0 +1,64 @@
+"""
+Precomputed late-fee rate table
+Per-minute rates of every rental package plus the active LateFeeConfiguration,
+held in process memory so live overdue amounts cost no query and no cache
+round trip per rental. Rebuilt when a package or late-fee configuration
+changes (shared version key) or after MAX_AGE
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from api.common.utils.versioned_snapshot import VersionedSnapshot
+
+
+class LateFeeRateTable(VersionedSnapshot):
+    """Package rate and active late-fee rule lookup, reloaded on change"""
+
+    VERSION_KEY = "late_fee_rate_table_version"
+    LABEL = "Late fee table"
+
+    # Used when no late-fee configuration is active
+    DEFAULT_MULTIPLIER = Decimal('2')
+
+    def _build(self) -> Dict[str, Any]:
+        from api.common.utils.helpers import get_late_fee_configuration
+        from api.rentals.models import RentalPackage
+
+        rates = {
+            str(package_id): price / Decimal(str(duration_minutes))
+            for package_id, price, duration_minutes in
+            RentalPackage.objects.filter(duration_minutes__gt=0).values_list('id', 'price', 'duration_minutes')
+        }
+        return {'rates': rates, 'config': get_late_fee_configuration()}
+
+    # ==========================================
+    # LOOKUPS
+    # ==========================================
+
+    def rate_per_minute(self, package_id: Any) -> Optional[Decimal]:
+        """Normal per-minute rate of a package, or None if unknown"""
+        return self._data()['rates'].get(str(package_id))
+
+    def calculate(self, normal_rate_per_minute: Decimal, overdue_minutes: int) -> Decimal:
+        """Late fee for a per-minute rate under the active configuration"""
+        config = self._data()['config']
+        if config is None:
+            return normal_rate_per_minute * self.DEFAULT_MULTIPLIER * Decimal(str(overdue_minutes))
+        return config.calculate_late_fee(normal_rate_per_minute, overdue_minutes)
+
+    def fee_for_package(self, package_id: Any, overdue_minutes: int) -> Optional[Decimal]:
+        """
+        Late fee for a rental of a package overdue by overdue_minutes
+
+        Returns:
+            Fee, or None if the package is not in the table
+        """
+        rate = self.rate_per_minute(package_id)
+        if rate is None:
+            return None
+        return self.calculate(rate, overdue_minutes)
+
+
+late_fee_rate_table = LateFeeRateTable()
@@ -0,0 +1,245 @@
+"""
+Buffered, downsampled GPS writes for rental tracking
+Incoming points are thinned per rental against the last point kept, queued
+here, and written to RentalLocation with bulk_create by the
+flush_rental_locations task, scheduled every RENTAL_LOCATION_FLUSH_SECONDS
+and queued by the first ingest after the interval elapses
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from api.common.utils.helpers import calculate_distance
+from api.common.utils.shared_redis import REDIS_UNAVAILABLE, decode_redis_value, redis_call
+
+
+logger = logging.getLogger(__name__)
+
+
+class RentalLocationBuffer:
+    """
+    Pending GPS points for every rental, in arrival order
+
+    Points live in a Redis list when the default cache is django-redis (shared
+    by every web and worker process), otherwise in a process-local list. A
+    point is kept only if it moved at least MIN_DISTANCE_METERS from the
+    rental's last kept point, or MAX_INTERVAL has passed since it; older or
+    repeated timestamps are dropped. A batch whose insert fails is put back
+    at the head of the queue for the next flush.
+    """
+
+    REDIS_KEY = "rentals:location_buffer"
+    LAST_POINT_PREFIX = "rentals:location_last"
+    FLUSH_LOCK_KEY = "rentals:location_buffer:flush_lock"
+    BATCH_SIZE = 1000
+    LAST_POINT_TIMEOUT = 24 * 3600
+
+    MIN_DISTANCE_METERS = 20
+    MAX_INTERVAL = timedelta(seconds=60)  # Keep one point a minute even when stationary
+
+    def __init__(self):
+        self._local: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def flush_interval(self) -> int:
+        return max(1, getattr(settings, 'RENTAL_LOCATION_FLUSH_SECONDS', 10))
+
+    def _last_point_key(self, rental_id: Any) -> str:
+        return f"{self.LAST_POINT_PREFIX}:{rental_id}"
+
+    # ==========================================
+    # WRITE SIDE
+    # ==========================================
+
+    def downsample(self, points: List[Dict[str, Any]], last: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Thin one rental's points against its last kept point
+
+        Args:
+            points: Dicts with latitude, longitude, accuracy, recorded_at (datetime)
+            last: Last kept point of the rental, if any
+
+        Returns:
+            Kept points, oldest first
+        """
+        kept = []
+        for point in sorted(points, key=lambda p: p['recorded_at']):
+            if last is not None:
+                if point['recorded_at'] <= last['recorded_at']:
+                    continue
+                moved_meters = calculate_distance(
+                    float(last['latitude']), float(last['longitude']),
+                    float(point['latitude']), float(point['longitude'])
+                ) * 1000
+                if (moved_meters < self.MIN_DISTANCE_METERS
+                        and point['recorded_at'] - last['recorded_at'] < self.MAX_INTERVAL):
+                    continue
+            kept.append(point)
+            last = point
+        return kept
+
+    def add(self, points_by_rental: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Downsample and queue points for many rentals
+
+        Returns:
+            Dict with accepted (queued) and dropped (downsampled) counts
+        """
+        if not points_by_rental:
+            return {'accepted': 0, 'dropped': 0}
+
+        last_keys = {rental_id: self._last_point_key(rental_id) for rental_id in points_by_rental}
+        try:
+            cached = cache.get_many(list(last_keys.values()))
+        except Exception:
+            cached = {}
+
+        entries: List[str] = []
+        new_last: Dict[str, Dict[str, Any]] = {}
+        received = 0
+        for rental_id, points in points_by_rental.items():
+            received += len(points)
+            last = cached.get(last_keys[rental_id])
+            if last is not None:
+                last = {**last, 'recorded_at': parse_datetime(last['recorded_at'])}
+
+            kept = self.downsample(points, last)
+            for point in kept:
+                entries.append(json.dumps({
+                    'rental_id': str(rental_id),
+                    'latitude': str(point['latitude']),
+                    'longitude': str(point['longitude']),
+                    'accuracy': str(point['accuracy']),
+                    'recorded_at': point['recorded_at'].isoformat(),
+                }))
+            if kept:
+                new_last[last_keys[rental_id]] = {
+                    'latitude': str(kept[-1]['latitude']),
+                    'longitude': str(kept[-1]['longitude']),
+                    'recorded_at': kept[-1]['recorded_at'].isoformat(),
+                }
+
+        if entries:
+            self._push(entries)
+            try:
+                cache.set_many(new_last, timeout=self.LAST_POINT_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Rental location last point not saved: {e}")
+        return {'accepted': len(entries), 'dropped': received - len(entries)}
+
+    def _push(self, entries: List[str]) -> None:
+        pushed = redis_call(
+            lambda redis: redis.rpush(self.REDIS_KEY, *entries),
+            "Rental location buffer write failed, using local buffer"
+        )
+        if pushed is REDIS_UNAVAILABLE:
+            with self._lock:
+                self._local.extend(entries)
+
+    def _requeue(self, entries: List[str]) -> None:
+        """Put drained entries back at the head of the queue, in order"""
+        requeued = redis_call(
+            lambda redis: redis.lpush(self.REDIS_KEY, *reversed(entries)),
+            "Rental location requeue failed, using local buffer"
+        )
+        if requeued is REDIS_UNAVAILABLE:
+            with self._lock:
+                self._local[:0] = entries
+
+    def flush_due(self) -> bool:
+        """
+        Claim the flush for the current interval
+
+        Returns:
+            True if this caller should flush now
+        """
+        try:
+            return cache.add(self.FLUSH_LOCK_KEY, 1, timeout=self.flush_interval)
+        except Exception:
+            return True
+
+    def _drain(self, limit: int) -> List[str]:
+        def drain(redis):
+            pipe = redis.pipeline(transaction=True)
+            pipe.lrange(self.REDIS_KEY, 0, limit - 1)
+            pipe.ltrim(self.REDIS_KEY, limit, -1)
+            return pipe.execute()[0]
+
+        entries: List[str] = []
+        raw = redis_call(drain, "Rental location buffer drain failed")
+        if raw is not REDIS_UNAVAILABLE:
+            entries.extend(decode_redis_value(item) for item in raw)
+        remaining = limit - len(entries)
+        if remaining > 0:
+            with self._lock:
+                entries.extend(self._local[:remaining])
+                del self._local[:remaining]
+        return entries
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Write every pending point to RentalLocation with bulk_create
+
+        Points of rentals deleted since they were queued are discarded. If
+        an insert fails, its batch is requeued and the error is raised.
+
+        Returns:
+            Dict with pending point count and rows written
+        """
+        pending = written = 0
+        while True:
+            entries = self._drain(self.BATCH_SIZE)
+            if not entries:
+                break
+            pending += len(entries)
+
+            try:
+                written += self._write(entries)
+            except Exception:
+                self._requeue(entries)
+                raise
+
+            if len(entries) < self.BATCH_SIZE:
+                break
+
+        return {'pending': pending, 'written': written}
+
+    def _write(self, entries: List[str]) -> int:
+        from api.rentals.models import Rental, RentalLocation
+
+        points = [json.loads(entry) for entry in entries]
+        with transaction.atomic():
+            existing = {
+                str(rental_id) for rental_id in Rental.objects.filter(
+                    id__in={point['rental_id'] for point in points}
+                ).values_list('id', flat=True)
+            }
+            return len(RentalLocation.objects.bulk_create([
+                RentalLocation(
+                    rental_id=point['rental_id'],
+                    latitude=Decimal(point['latitude']),
+                    longitude=Decimal(point['longitude']),
+                    accuracy=Decimal(point['accuracy']),
+                    recorded_at=parse_datetime(point['recorded_at']),
+                )
+                for point in points if point['rental_id'] in existing
+            ], batch_size=self.BATCH_SIZE))
+
+    def pending_count(self) -> int:
+        """Number of queued (not yet written) points"""
+        shared = redis_call(lambda redis: redis.llen(self.REDIS_KEY))
+        return len(self._local) + (0 if shared is REDIS_UNAVAILABLE else shared)
+
+
+rental_location_buffer = RentalLocationBuffer()
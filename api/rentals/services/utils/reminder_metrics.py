@@ -0,0 +1,48 @@
+"""
+Counters for batched rental reminder dispatch
+Shared through the cache so the admin health endpoint sees every worker's
+batches: reminders sent per batch and lag between the intended reminder time
+and the actual send
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable
+
+from api.common.utils.cache_counters import CacheCounters
+
+
+class ReminderDispatchMetrics(CacheCounters):
+    """Reminder batch and scheduling-lag counters"""
+
+    KEY_PREFIX = "rentals:reminder_metrics"
+    COUNTER_NAMES = ('batches', 'reminders_sent', 'reminders_failed', 'lag_ms_total')
+    GAUGE_NAMES = ('last_batch_size', 'last_lag_ms', 'max_lag_ms')
+
+    def record_batch(self, sent: int, failed: int, lags_seconds: Iterable[float]) -> None:
+        """Record one reminder batch and the scheduling lag of each reminder in it"""
+        lags_ms = [max(0, int(lag * 1000)) for lag in lags_seconds]
+        self.incr('batches')
+        self.incr('reminders_sent', sent)
+        self.incr('reminders_failed', failed)
+        self.incr('lag_ms_total', sum(lags_ms))
+
+        gauges = {'last_batch_size': sent}
+        if lags_ms:
+            batch_max = max(lags_ms)
+            gauges['last_lag_ms'] = batch_max
+            if batch_max > self.get('max_lag_ms'):
+                gauges['max_lag_ms'] = batch_max
+        self.set_gauges(gauges)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters shared by all workers, plus derived averages"""
+        metrics = super().get_metrics()
+
+        batches = metrics['batches']
+        sent = metrics['reminders_sent']
+        metrics['avg_batch_size'] = round(sent / batches, 2) if batches else 0
+        metrics['avg_lag_ms'] = int(metrics.pop('lag_ms_total') / sent) if sent else 0
+        return metrics
+
+
+reminder_dispatch_metrics = ReminderDispatchMetrics()
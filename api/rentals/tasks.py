@@ -11,45 +11,53 @@ from api.rentals.models import Rental, RentalPackage
 
 @shared_task(base=BaseTask, bind=True)
 def check_overdue_rentals(self):
-    """Check for overdue rentals and update their status"""
+    """
+    Transition past-due ACTIVE rentals to OVERDUE in bulk
+
+    Full-scan fallback; due rentals are normally transitioned by
+    dispatch_rental_deadlines. Rows are updated in chunks by
+    RentalOverdueService; notifications are queued one task per batch of IDs.
+
+    Returns:
+        Dict with updated_count and notification_batches
+    """
     try:
-        now = timezone.now()
-        
-        # Find active rentals that are past due
-        overdue_rentals = Rental.objects.filter(
-            status='ACTIVE',
-            due_at__lt=now
+        from api.rentals.services import RentalOverdueService
+
+        service = RentalOverdueService()
+        rental_ids = service.mark_overdue()
+
+        batches = service.batch_ids(rental_ids)
+        for batch in batches:
+            send_overdue_notifications.delay(batch)
+
+        self.logger.info(
+            f"Updated {len(rental_ids)} overdue rentals, queued {len(batches)} notification batches"
         )
-        
-        updated_count = 0
-        
-        for rental in overdue_rentals:
-            # Update status to overdue
-            rental.status = 'OVERDUE'
-            rental.save(update_fields=['status', 'updated_at'])
-            updated_count += 1
-            
-            # Send overdue notification
-            from api.notifications.services import notify
-            
-            overdue_hours = int((now - rental.due_at).total_seconds() / 3600)
-            penalty_amount = float(rental.overdue_amount)
-            
-            # Send rental overdue notification using clean API
-            notify(rental.user, 'rental_overdue',
-                  async_send=True,
-                  powerbank_id=rental.powerbank.serial_number,
-                  overdue_hours=overdue_hours,
-                  penalty_amount=penalty_amount)
-        
-        self.logger.info(f"Updated {updated_count} overdue rentals")
-        return {'updated_count': updated_count}
-        
+        return {'updated_count': len(rental_ids), 'notification_batches': len(batches)}
+
     except Exception as e:
         self.logger.error(f"Failed to check overdue rentals: {str(e)}")
         raise
 
 
+@shared_task(base=BaseTask, bind=True)
+def send_overdue_notifications(self, rental_ids: list):
+    """
+    Send rental_overdue notifications for a batch of rentals
+
+    QUEUED: by check_overdue_rentals, one task per notification batch.
+
+    Returns:
+        Dict with sent and failed counts
+    """
+    from api.rentals.services import RentalOverdueService
+
+    result = RentalOverdueService().notify_overdue(rental_ids)
+    self.logger.info(f"Overdue notifications: {result['sent']} sent, {result['failed']} failed")
+    return result
+
+
 @shared_task(base=BaseTask, bind=True)
 def calculate_overdue_charges(self):
     """Calculate and apply overdue charges for late returns"""
@@ -102,69 +110,96 @@ def calculate_overdue_charges(self):
         raise
 
 
+@shared_task(base=BaseTask, bind=True)
+def dispatch_rental_deadlines(self):
+    """
+    Dispatch reminder, overdue and abandonment events that are due
+
+    SCHEDULED: every 30 seconds. Only rentals popped from the deadline
+    scheduler are touched; each batch is handled by handle_rental_deadlines.
+
+    Returns:
+        Dict of event -> number of rentals dispatched
+    """
+    try:
+        from api.rentals.services import RentalDeadlineService
+
+        service = RentalDeadlineService()
+        batches = service.pop_due_batches()
+        dispatched = {}
+        for event, event_batches in batches.items():
+            dispatched[event] = 0
+            for batch in event_batches:
+                try:
+                    handle_rental_deadlines.delay(event, batch)
+                except Exception as e:
+                    # Not queued, so nothing will ack it: put it back now
+                    service.scheduler.release(event, batch)
+                    self.logger.error(f"Failed to queue {len(batch)} {event} deadlines: {str(e)}")
+                    continue
+                dispatched[event] += len(batch)
+
+        if any(dispatched.values()):
+            self.logger.info(f"Dispatched rental deadlines: {dispatched}")
+        return dispatched
+
+    except Exception as e:
+        self.logger.error(f"Failed to dispatch rental deadlines: {str(e)}")
+        raise
+
+
+@shared_task(base=BaseTask, bind=True)
+def handle_rental_deadlines(self, event: str, rental_ids: list):
+    """
+    Handle one batch of due rental deadline events
+
+    QUEUED: by dispatch_rental_deadlines.
+
+    Returns:
+        Handler result counts
+    """
+    from api.rentals.services import RentalDeadlineService
+
+    result = RentalDeadlineService().handle(event, rental_ids)
+    self.logger.info(f"Handled {len(rental_ids)} {event} deadlines: {result}")
+    return result
+
+
+@shared_task(base=BaseTask, bind=True)
+def sync_rental_deadlines(self):
+    """
+    Re-add deadlines for all open rentals to the scheduler
+
+    SCHEDULED: every 10 minutes. Safety net for rentals scheduled before a
+    Redis restart or started before the scheduler was deployed.
+
+    Returns:
+        Dict with active and overdue rentals scheduled
+    """
+    from api.rentals.services import RentalDeadlineService
+
+    result = RentalDeadlineService().sync_schedule()
+    self.logger.info(f"Synced rental deadlines: {result}")
+    return result
+
+
 @shared_task(base=BaseTask, bind=True)
 def auto_complete_abandoned_rentals(self):
-    """Auto-complete rentals that have been overdue for too long"""
+    """Auto-complete rentals that have been overdue for too long (full scan)"""
     try:
+        from api.rentals.services import RentalDeadlineService
+        from api.rentals.services.utils import RentalDeadlineScheduler
+
         # Find rentals overdue for more than 24 hours
-        cutoff_time = timezone.now() - timezone.timedelta(hours=24)
-        
-        abandoned_rentals = Rental.objects.filter(
-            status='OVERDUE',
-            due_at__lt=cutoff_time
+        cutoff_time = timezone.now() - RentalDeadlineScheduler.ABANDON_AFTER
+        rental_ids = list(
+            Rental.objects.filter(status='OVERDUE', due_at__lt=cutoff_time).values_list('id', flat=True)
         )
-        
-        completed_count = 0
-        
-        for rental in abandoned_rentals:
-            try:
-                # Mark as completed (assumed lost/stolen)
-                rental.status = 'COMPLETED'
-                rental.ended_at = timezone.now()
-                rental.is_returned_on_time = False
-                
-                # Calculate final charges (including penalty for lost power bank)
-                lost_penalty = 5000  # NPR 5000 penalty for lost power bank
-                rental.overdue_amount += lost_penalty
-                
-                rental.rental_metadata['auto_completed'] = True
-                rental.rental_metadata['lost_penalty'] = lost_penalty
-                rental.rental_metadata['completion_reason'] = 'abandoned'
-                
-                rental.save(update_fields=[
-                    'status', 'ended_at', 'is_returned_on_time', 
-                    'overdue_amount', 'rental_metadata', 'updated_at'
-                ])
-                
-                # Mark power bank as lost
-                if rental.power_bank:
-                    rental.power_bank.status = 'DAMAGED'  # Or create a 'LOST' status
-                    rental.power_bank.hardware_info['lost_date'] = timezone.now().isoformat()
-                    rental.power_bank.save(update_fields=['status', 'hardware_info'])
-                
-                # Release slot
-                if rental.slot:
-                    rental.slot.status = 'AVAILABLE'
-                    rental.slot.current_rental = None
-                    rental.slot.save(update_fields=['status', 'current_rental'])
-                
-                completed_count += 1
-                
-                # Send notification about completion and charges
-                from api.notifications.services import notify
-                
-                # Send rental auto-completion notification using clean API
-                notify(rental.user, 'rental_auto_completed',
-                      async_send=True,
-                      powerbank_id=rental.power_bank.serial_number,
-                      total_cost=float(rental.overdue_amount))
-                
-            except Exception as e:
-                self.logger.error(f"Failed to auto-complete rental {rental.id}: {str(e)}")
-        
-        self.logger.info(f"Auto-completed {completed_count} abandoned rentals")
-        return {'completed_count': completed_count}
-        
+
+        result = RentalDeadlineService().complete_abandoned(rental_ids)
+        self.logger.info(f"Auto-completed {result['completed_count']} abandoned rentals")
+        return result
+
     except Exception as e:
         self.logger.error(f"Failed to auto-complete abandoned rentals: {str(e)}")
         raise
@@ -172,57 +207,56 @@ def auto_complete_abandoned_rentals(self):
 
 @shared_task(base=BaseTask, bind=True)
 def send_rental_reminders(self):
-    """Send reminders for rentals approaching due time"""
+    """Send reminders for rentals approaching due time (full scan)"""
     try:
-        # Send reminders 15 minutes before due time
-        reminder_time = timezone.now() + timezone.timedelta(minutes=15)
-        
-        upcoming_due_rentals = Rental.objects.filter(
-            status='ACTIVE',
-            due_at__lte=reminder_time,
-            due_at__gt=timezone.now()
+        from api.rentals.services import RentalDeadlineService
+        from api.rentals.services.utils import RentalDeadlineScheduler
+
+        now = timezone.now()
+        rental_ids = list(
+            Rental.objects.filter(
+                status='ACTIVE',
+                due_at__lte=now + RentalDeadlineScheduler.REMINDER_LEAD,
+                due_at__gt=now
+            ).values_list('id', flat=True)
         )
-        
-        # Filter out rentals that already received reminders
-        rentals_to_remind = []
-        for rental in upcoming_due_rentals:
-            if not rental.rental_metadata.get('reminder_sent'):
-                rentals_to_remind.append(rental)
-        
-        reminder_count = 0
-        
-        for rental in rentals_to_remind:
-            try:
-                # Send reminder notification
-                from api.notifications.tasks import send_notification_task
-                send_notification_task.delay(
-                    str(rental.user.id),
-                    'rental_reminder',
-                    {
-                        'rental_id': str(rental.id),
-                        'rental_code': rental.rental_code,
-                        'due_time': rental.due_at.strftime('%H:%M')
-                    }
-                )
-                
-                # Mark reminder as sent
-                rental.rental_metadata['reminder_sent'] = True
-                rental.rental_metadata['reminder_sent_at'] = timezone.now().isoformat()
-                rental.save(update_fields=['rental_metadata'])
-                
-                reminder_count += 1
-                
-            except Exception as e:
-                self.logger.error(f"Failed to send reminder for rental {rental.id}: {str(e)}")
-        
-        self.logger.info(f"Sent {reminder_count} rental reminders")
-        return {'reminder_count': reminder_count}
-        
+
+        result = RentalDeadlineService().send_reminders(rental_ids, now=now)
+        self.logger.info(f"Sent {result['reminder_count']} rental reminders")
+        return result
+
     except Exception as e:
         self.logger.error(f"Failed to send rental reminders: {str(e)}")
         raise
 
 
+@shared_task(base=BaseTask, bind=True)
+def flush_rental_locations(self):
+    """
+    Write buffered rental GPS points to RentalLocation.
+
+    SCHEDULED: Runs every RENTAL_LOCATION_FLUSH_SECONDS via Celery Beat.
+    Batched uploads are downsampled and queued by RentalLocationBuffer; this
+    bounds how long a point waits when uploads are sparse.
+
+    Returns:
+        dict: Pending points drained and rows written
+    """
+    try:
+        from api.rentals.services.utils import rental_location_buffer
+
+        result = rental_location_buffer.flush()
+        if result['pending']:
+            self.logger.info(
+                f"Flushed {result['pending']} rental locations ({result['written']} rows written)"
+            )
+        return result
+
+    except Exception as e:
+        self.logger.error(f"Failed to flush rental locations: {str(e)}")
+        raise
+
+
 @shared_task(base=BaseTask, bind=True)
 def cleanup_old_rental_data(self):
     """Clean up old rental data"""
@@ -237,17 +271,16 @@ def cleanup_old_rental_data(self):
         )
         
         # Clean up related data first
-        from api.rentals.models import RentalLocation, RentalExtension, RentalIssue
-        
-        old_rental_ids = list(old_rentals.values_list('id', flat=True))
+        from api.common.tasks.retention import run_retention
+        from api.rentals.models import RentalLocation, RentalExtension
         
-        deleted_locations = RentalLocation.objects.filter(
-            rental_id__in=old_rental_ids
-        ).delete()[0]
+        deleted_locations = run_retention(
+            'rental_locations', RentalLocation.objects.filter(rental__in=old_rentals)
+        )['deleted_count']
         
-        deleted_extensions = RentalExtension.objects.filter(
-            rental_id__in=old_rental_ids
-        ).delete()[0]
+        deleted_extensions = run_retention(
+            'rental_extensions', RentalExtension.objects.filter(rental__in=old_rentals)
+        )['deleted_count']
         
         # Keep rental issues for audit purposes, just clean locations and extensions
         
@@ -12,7 +12,7 @@ from rest_framework.request import Request
 
 from api.common.routers import CustomViewRouter
 from api.common.mixins import BaseAPIView
-from api.common.decorators import log_api_call, cached_response
+from api.common.decorators import log_api_call
 from api.common.serializers import BaseResponseSerializer
 from api.rentals import serializers
 from api.rentals.services import RentalService
@@ -123,10 +123,9 @@ class RentalStatsView(GenericAPIView, BaseAPIView):
         description="Get comprehensive rental statistics for the user",
         responses={200: BaseResponseSerializer}
     )
-    @cached_response(timeout=300)  # Cache for 5 minutes - stats update periodically
     @log_api_call()
     def get(self, request: Request) -> Response:
-        """Get rental statistics"""
+        """Get rental statistics (one read of the user's stats row)"""
         def operation():
             service = RentalService()
             stats = service.get_rental_stats(request.user)
@@ -199,3 +199,39 @@ class RentalLocationView(GenericAPIView, BaseAPIView):
             error_message="Failed to update location"
         )
 
+
+@support_router.register(r"rentals/locations/batch", name="rental-location-batch")
+@extend_schema(
+    tags=["Rentals"],
+    summary="Batch Rental Locations",
+    description="Upload buffered GPS points for active rentals",
+    responses={200: BaseResponseSerializer}
+)
+class RentalLocationBatchView(GenericAPIView, BaseAPIView):
+    serializer_class = serializers.RentalLocationBatchSerializer
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        summary="Upload Rental Locations",
+        description="Upload many GPS points for one or more active rentals; redundant points are downsampled",
+        request=serializers.RentalLocationBatchSerializer,
+        responses={200: BaseResponseSerializer}
+    )
+    @log_api_call()
+    def post(self, request: Request) -> Response:
+        """Ingest a batch of rental locations"""
+        def operation():
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            
+            service = RentalLocationService()
+            return service.ingest_locations(
+                serializer.validated_data['points'],
+                user=request.user
+            )
+        
+        return self.handle_service_operation(
+            operation,
+            success_message="Locations received",
+            error_message="Failed to ingest locations"
+        )
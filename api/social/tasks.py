@@ -8,6 +8,7 @@ from django.db.models import Q
 from django.utils import timezone
 
 from api.common.tasks.base import BaseTask, NotificationTask
+from api.common.tasks.retention import run_retention
 from api.social.models import UserAchievement, UserLeaderboard
 
 User = get_user_model()
@@ -182,9 +183,10 @@ def cleanup_inactive_user_achievements(self):
         )
 
         # Remove their leaderboard entries
-        deleted_leaderboard = UserLeaderboard.objects.filter(
-            user__in=inactive_users
-        ).delete()[0]
+        deleted_leaderboard = run_retention(
+            "inactive_user_leaderboard",
+            UserLeaderboard.objects.filter(user__in=inactive_users),
+        )["deleted_count"]
 
         # Keep achievement records for audit purposes
         # (Don't delete UserAchievement records)
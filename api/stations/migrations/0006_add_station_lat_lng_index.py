@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0005_add_station_description'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['latitude', 'longitude'], name='station_lat_lng_idx'),
+        ),
+    ]
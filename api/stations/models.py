@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from api.common.models import BaseModel
 
 
@@ -33,10 +35,19 @@ class Station(BaseModel):
         db_table = "stations"
         verbose_name = "Station"
         verbose_name_plural = "Stations"
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='station_lat_lng_idx'),
+        ]
 
     def __str__(self):
         return str(self.station_name)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        _remember_station_index_snapshot(instance)
+        return instance
+
 
 class StationSlot(BaseModel):
     """
@@ -224,4 +235,64 @@ class PowerBank(BaseModel):
         verbose_name_plural = "Power Banks"
 
     def __str__(self):
-        return f"PowerBank {self.serial_number}"
\ No newline at end of file
+        return f"PowerBank {self.serial_number}"
+
+
+# ============================================================
+# Signal Handlers for Spatial Index Maintenance
+# ============================================================
+
+# Sentinel for a Station whose indexed values were not loaded (deferred fields)
+_UNKNOWN_SNAPSHOT = object()
+
+
+def _station_index_snapshot(instance):
+    from api.stations.services.utils.spatial_index import StationIndexRegistry
+    if not StationIndexRegistry.is_indexable(instance):
+        return None
+    return {field: getattr(instance, field) for field in StationIndexRegistry.FIELDS}
+
+
+def _remember_station_index_snapshot(instance):
+    """Record the indexed values a Station was loaded with"""
+    from api.stations.services.utils.spatial_index import StationIndexRegistry
+    if StationIndexRegistry.TRACKED_FIELDS & instance.get_deferred_fields():
+        instance._index_snapshot = _UNKNOWN_SNAPSHOT
+    else:
+        instance._index_snapshot = _station_index_snapshot(instance)
+
+
+def _apply_station_index_change(station_id, snapshot):
+    from api.stations.services.utils.spatial_index import station_index_registry
+    station_index_registry.apply_station_change(station_id, snapshot)
+
+
+@receiver(post_save, sender=Station)
+def update_station_index_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep the nearby-station spatial index in sync once the write commits.
+    Other workers pick up the change through the shared index version key,
+    so only saves that move, rename or show/hide a station publish one;
+    heartbeat and status-only syncs leave the index alone.
+    """
+    from api.stations.services.utils.spatial_index import StationIndexRegistry
+    if update_fields is not None and not StationIndexRegistry.TRACKED_FIELDS.intersection(update_fields):
+        return
+
+    snapshot = _station_index_snapshot(instance)
+    previous = None if created else getattr(instance, '_index_snapshot', _UNKNOWN_SNAPSHOT)
+    if previous == snapshot:
+        return
+
+    instance._index_snapshot = snapshot
+    station_id = instance.id
+    transaction.on_commit(lambda: _apply_station_index_change(station_id, snapshot))
+
+
+@receiver(post_delete, sender=Station)
+def update_station_index_on_delete(sender, instance, **kwargs):
+    """
+    Drop deleted stations from the spatial index.
+    """
+    station_id = instance.id
+    transaction.on_commit(lambda: _apply_station_index_change(station_id, None))
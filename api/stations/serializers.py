@@ -10,28 +10,47 @@ from api.stations.models import (
     Station, StationSlot, StationAmenity, StationAmenityMapping,
     StationIssue, StationMedia, UserStationFavorite, PowerBank
 )
-from api.common.utils.helpers import calculate_distance
+from api.common.utils.helpers import calculate_distance, calculate_distances
 from api.common.serializers import BaseResponseSerializer
 
 
+def get_request_origin(request) -> Optional[tuple]:
+    """Get (lat, lng) from request query params, or None if missing/invalid"""
+    if not request:
+        return None
+    
+    user_lat = request.query_params.get('lat')
+    user_lng = request.query_params.get('lng')
+    
+    if user_lat and user_lng:
+        try:
+            return float(user_lat), float(user_lng)
+        except (ValueError, TypeError):
+            pass
+    
+    return None
+
+
 class StationLocationMixin:
     """Mixin for common station location and favorite calculations"""
     
     def get_distance(self, obj) -> Optional[float]:
         """Calculate distance from user location if provided"""
-        request = self.context.get('request')
-        if not request:
-            return None
+        # Distance annotated by the database (StationService location filtering)
+        annotated = getattr(obj, 'distance', None)
+        if annotated is not None:
+            return round(annotated, 2)
         
-        user_lat = request.query_params.get('lat')
-        user_lng = request.query_params.get('lng')
+        # Reuse distances precomputed for the whole page (see StationDistanceListSerializer)
+        distances = self.context.get('station_distances')
+        if distances and obj.id in distances:
+            return distances[obj.id]
         
-        if user_lat and user_lng:
+        origin = get_request_origin(self.context.get('request'))
+        if origin:
             try:
-                user_lat = float(user_lat)
-                user_lng = float(user_lng)
                 distance = calculate_distance(
-                    user_lat, user_lng,
+                    origin[0], origin[1],
                     float(obj.latitude), float(obj.longitude)
                 )
                 return round(distance, 2)
@@ -127,6 +146,30 @@ class StationAmenityMappingSerializer(serializers.ModelSerializer):
         fields = ['amenity', 'is_available', 'notes']
 
 
+class StationDistanceListSerializer(serializers.ListSerializer):
+    """
+    List serializer that computes the distance to every station on the page in
+    one batched pass and shares it with the child serializer through context
+    """
+    
+    def to_representation(self, data):
+        stations = list(data.all() if hasattr(data, 'all') else data)
+        origin = get_request_origin(self.context.get('request'))
+        
+        if origin and stations:
+            distances = self.context.setdefault('station_distances', {})
+            pending = [station for station in stations if station.id not in distances]
+            if pending:
+                values = calculate_distances(
+                    origin[0], origin[1],
+                    [(station.latitude, station.longitude) for station in pending]
+                )
+                for station, distance in zip(pending, values):
+                    distances[station.id] = round(distance, 2)
+        
+        return super().to_representation(stations)
+
+
 class StationListSerializer(serializers.ModelSerializer, StationLocationMixin):
     """Serializer for station list view"""
     distance = serializers.SerializerMethodField()
@@ -146,6 +189,7 @@ class StationListSerializer(serializers.ModelSerializer, StationLocationMixin):
             'distance', 'is_favorite', 'media', 'opening_time', 'closing_time'
         ]
         read_only_fields = ['id']
+        list_serializer_class = StationDistanceListSerializer
 
 
 class StationDetailSerializer(serializers.ModelSerializer, StationLocationMixin):
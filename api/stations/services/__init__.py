@@ -16,6 +16,7 @@ from .station_favorite_service import StationFavoriteService
 from .station_issue_service import StationIssueService
 from .power_bank_service import PowerBankService
 from .station_sync_service import StationSyncService
+from .station_ingest_service import StationIngestService
 from .device_api_service import DeviceAPIService, get_device_api_service
 
 
@@ -26,6 +27,7 @@ __all__ = [
     "StationIssueService",
     "StationService",
     "StationSyncService",
+    "StationIngestService",
     "DeviceAPIService",
     "get_device_api_service",
 ]
@@ -10,18 +10,60 @@ Date: 2025-11-05
 """
 from __future__ import annotations
 
+import copy
+import random
+import threading
+import time
 import requests
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, Iterable, Optional
+from datetime import timedelta
 from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
 
 from api.common.services.base import BaseService, ServiceException
+from api.stations.services.utils.device_token_store import device_token_store
 
 
 logger = logging.getLogger(__name__)
 
 
+# ==========================================
+# SHARED HTTP SESSION
+# ==========================================
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_device_api_session() -> requests.Session:
+    """
+    Process-wide pooled session for the Device API
+
+    Keeps TCP/TLS connections to the Java API alive between calls instead of
+    opening a new connection per popup/check/command. Created lazily so each
+    forked worker process gets its own pool.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                config = getattr(settings, 'DEVICE_API', {})
+                adapter = HTTPAdapter(
+                    pool_connections=config.get('POOL_CONNECTIONS', 4),
+                    pool_maxsize=config.get('POOL_MAXSIZE', 20),
+                    max_retries=0,  # Retries are handled by DeviceAPIService
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
 class DeviceAPIService(BaseService):
     """
     HTTP client for Java Spring Device API with JWT authentication
@@ -29,8 +71,11 @@ class DeviceAPIService(BaseService):
     This service bridges Django to the Java API which handles all MQTT device communication.
     Features:
     - Auto-login to get JWT token
-    - Token caching and auto-refresh
+    - Token shared across processes (DeviceTokenStore), single-flight refresh
+    - Pooled keep-alive connections (get_device_api_session)
     - Automatic retry on 401 (re-authenticate)
+    - Retry with exponential backoff and jitter on 5xx/connection errors;
+      device commands (send, popup, create) only when the connection failed
     - Error handling following project patterns
     """
     
@@ -44,6 +89,11 @@ class DeviceAPIService(BaseService):
         self.connect_timeout = config.get('CONNECT_TIMEOUT', 10)
         self.read_timeout = config.get('READ_TIMEOUT', 30)
         self.max_retries = config.get('MAX_RETRIES', 2)
+        self.backoff_base = config.get('RETRY_BACKOFF_BASE', 0.2)
+        self.backoff_max = config.get('RETRY_BACKOFF_MAX', 2.0)
+        self.session = get_device_api_session()
+        self.bulk_max_workers = config.get('BULK_MAX_WORKERS', 16)
+        self.bulk_device_timeout = config.get('BULK_DEVICE_TIMEOUT', 10)
         
         # Authentication configuration
         self.auth_enabled = config.get('AUTH_ENABLED', True)
@@ -51,9 +101,8 @@ class DeviceAPIService(BaseService):
         self.auth_password = config.get('AUTH_PASSWORD', '')
         self.auth_login_endpoint = config.get('AUTH_LOGIN_ENDPOINT', '/api/auth/login')
         
-        # Token management
+        # Token for the current request; the shared copy lives in device_token_store
         self.jwt_token: Optional[str] = None
-        self.token_expires_at: Optional[datetime] = None
         
         self.log_info(f"DeviceAPIService initialized - Base URL: {self.base_url}")
         self.log_info(f"Authentication: {'Enabled' if self.auth_enabled else 'Disabled'}")
@@ -62,17 +111,16 @@ class DeviceAPIService(BaseService):
     # AUTHENTICATION METHODS
     # ==========================================
     
-    def _login(self) -> bool:
+    def _login(self) -> Optional[Dict[str, Any]]:
         """
         Authenticate with Java API to get JWT token
         
+        Called through device_token_store, which shares the result with
+        every other process.
+        
         Returns:
-            bool: True if login successful, False otherwise
+            Dict with token and expires_at if login successful, None otherwise
         """
-        if not self.auth_enabled:
-            self.log_info("Authentication disabled, skipping login")
-            return True
-        
         try:
             login_url = f"{self.base_url}{self.auth_login_endpoint}"
             
@@ -83,7 +131,7 @@ class DeviceAPIService(BaseService):
             
             self.log_info(f"Attempting login to Java API: {login_url}")
             
-            response = requests.post(
+            response = self.session.post(
                 login_url,
                 json=payload,
                 timeout=(self.connect_timeout, self.read_timeout)
@@ -94,35 +142,25 @@ class DeviceAPIService(BaseService):
                 
                 # Extract token from response
                 # Adjust based on your Java API response format
-                self.jwt_token = data.get('token') or data.get('access_token') or data.get('jwt')
+                token = data.get('token') or data.get('access_token') or data.get('jwt')
                 
-                if self.jwt_token:
-                    # Token valid for 24 hours by default
-                    self.token_expires_at = datetime.now() + timedelta(hours=24)
+                if token:
                     self.log_info("Successfully authenticated with Java API")
-                    return True
+                    return {
+                        'token': token,
+                        # Token valid for 24 hours by default
+                        'expires_at': timezone.now() + timedelta(hours=24)
+                    }
                 else:
                     self.log_error(f"No token found in login response: {data}")
-                    return False
+                    return None
             else:
                 self.log_error(f"Login failed: {response.status_code} - {response.text}")
-                return False
+                return None
                 
         except Exception as e:
             self.log_error(f"Login exception: {str(e)}")
-            return False
-    
-    def _is_token_valid(self) -> bool:
-        """Check if JWT token is still valid"""
-        if not self.auth_enabled:
-            return True
-            
-        if not self.jwt_token or not self.token_expires_at:
-            return False
-        
-        # Check if token expires in next 5 minutes (refresh early)
-        expires_soon = datetime.now() + timedelta(minutes=5)
-        return datetime.now() < self.token_expires_at and expires_soon < self.token_expires_at
+            return None
     
     def _ensure_authenticated(self) -> bool:
         """
@@ -133,12 +171,24 @@ class DeviceAPIService(BaseService):
         """
         if not self.auth_enabled:
             return True
-            
-        if self._is_token_valid():
-            return True
         
-        self.log_info("Token expired or invalid, re-authenticating...")
-        return self._login()
+        self.jwt_token = device_token_store.get_token(self._login)
+        return bool(self.jwt_token)
+    
+    def _reauthenticate(self) -> None:
+        """Replace a token the API rejected (single-flight across processes)"""
+        self.jwt_token = device_token_store.refresh(self._login, rejected_token=self.jwt_token)
+    
+    def renew_token_if_expiring(self) -> bool:
+        """
+        Renew the shared token ahead of expiry
+        
+        Returns:
+            True if a new token was obtained
+        """
+        if not self.auth_enabled:
+            return False
+        return device_token_store.renew_if_expiring(self._login)
     
     def _get_auth_headers(self) -> Dict[str, str]:
         """
@@ -161,25 +211,35 @@ class DeviceAPIService(BaseService):
     # HTTP REQUEST METHOD
     # ==========================================
     
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for retry attempt (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
     def _make_request(
         self, 
         method: str,
         endpoint: str,
         params: Optional[Dict[str, Any]] = None,
         data: Optional[Dict[str, Any]] = None,
-        retry_count: int = 0,
-        retry_auth: bool = True
+        retry_auth: bool = True,
+        idempotent: bool = True
     ) -> Dict[str, Any]:
         """
         Make HTTP request to Java API with error handling
         
+        Server errors and connection failures are retried up to MAX_RETRIES
+        times with exponential backoff and jitter. Read timeouts are not
+        retried, since the device command may already have been executed.
+        Non-idempotent requests are only retried when the connection could
+        not be opened, which is the only case where the API never saw them.
+        
         Args:
             method: HTTP method (GET, POST)
             endpoint: API endpoint (e.g., '/send', '/check')
             params: Query parameters
             data: Request body data (for POST)
-            retry_count: Current retry attempt
             retry_auth: Whether to retry on 401 (re-authenticate)
+            idempotent: False for device commands that must not run twice
         
         Returns:
             Dict with standardized response format:
@@ -190,106 +250,140 @@ class DeviceAPIService(BaseService):
                 'code': int
             }
         """
-        try:
-            # Ensure we're authenticated
-            if not self._ensure_authenticated():
-                raise ServiceException(
-                    detail="Failed to authenticate with Device API",
-                    code="auth_failed",
-                    context={'base_url': self.base_url}
-                )
-            
-            # Build full URL
-            url = f"{self.base_url}{endpoint}"
-            
-            # Get headers with auth token
-            headers = self._get_auth_headers()
-            
-            # Make request
-            self.log_info(f"{method} {url} - Params: {params}")
-            
-            if method.upper() == 'GET':
-                response = requests.get(
-                    url,
-                    params=params,
-                    headers=headers,
-                    timeout=(self.connect_timeout, self.read_timeout)
-                )
-            elif method.upper() == 'POST':
-                response = requests.post(
-                    url,
-                    params=params,
-                    json=data,
-                    headers=headers,
-                    timeout=(self.connect_timeout, self.read_timeout)
-                )
-            else:
-                raise ServiceException(
-                    detail=f"Unsupported HTTP method: {method}",
-                    code="invalid_method"
-                )
-            
-            # Handle 401 Unauthorized - token expired, retry with new token
-            if response.status_code == 401 and retry_auth and retry_count == 0:
-                self.log_warning("Got 401, re-authenticating and retrying...")
-                self.jwt_token = None  # Force re-login
-                return self._make_request(method, endpoint, params, data, retry_count + 1, retry_auth=False)
-            
-            # Handle server errors with retry
-            if response.status_code >= 500 and retry_count < self.max_retries:
-                self.log_warning(f"Server error {response.status_code}, retrying... (attempt {retry_count + 1}/{self.max_retries})")
-                return self._make_request(method, endpoint, params, data, retry_count + 1, retry_auth)
-            
-            # Parse response
+        if method.upper() not in ('GET', 'POST'):
+            raise ServiceException(
+                detail=f"Unsupported HTTP method: {method}",
+                code="invalid_method"
+            )
+        
+        url = f"{self.base_url}{endpoint}"
+        attempt = 0
+        
+        while True:
             try:
-                response_data = response.json()
-            except ValueError:
-                response_data = {'text': response.text}
-            
-            # Check if request was successful
-            if response.status_code == 200:
+                response = self._send(method, url, params, data)
+                
+                # Handle 401 Unauthorized - token expired, retry once with new token
+                if response.status_code == 401 and retry_auth:
+                    self.log_warning("Got 401, re-authenticating and retrying...")
+                    self._reauthenticate()
+                    retry_auth = False
+                    continue
+                
+                # Handle server errors with retry
+                if response.status_code >= 500 and idempotent and attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt)
+                    attempt += 1
+                    self.log_warning(
+                        f"Server error {response.status_code}, retrying in {delay:.2f}s "
+                        f"(attempt {attempt}/{self.max_retries})"
+                    )
+                    time.sleep(delay)
+                    continue
+                
+                return self._parse_response(response)
+                
+            except requests.exceptions.ConnectionError as e:
+                # Also raised when the connection drops after the request was
+                # sent (RemoteDisconnected, reset), so the API may have run it
+                if (idempotent or self._failed_to_connect(e)) and attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt)
+                    attempt += 1
+                    self.log_warning(
+                        f"Connection error, retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries}): {str(e)}"
+                    )
+                    time.sleep(delay)
+                    continue
+                self.log_error(f"Connection error: {str(e)}")
                 return {
-                    'success': True,
-                    'data': response_data,
-                    'message': 'ok',
-                    'code': 200
+                    'success': False,
+                    'data': None,
+                    'message': f'Cannot connect to Device API at {self.base_url}',
+                    'code': 503
                 }
-            else:
-                # Error response
-                error_message = response_data.get('message') or response_data.get('error') or response.text
+            except requests.exceptions.Timeout:
+                self.log_error(f"Request timeout after {self.read_timeout} seconds")
                 return {
                     'success': False,
                     'data': None,
-                    'message': error_message,
-                    'code': response.status_code
+                    'message': f'Request timeout after {self.read_timeout} seconds',
+                    'code': 408
                 }
-                
-        except requests.exceptions.Timeout:
-            self.log_error(f"Request timeout after {self.read_timeout} seconds")
-            return {
-                'success': False,
-                'data': None,
-                'message': f'Request timeout after {self.read_timeout} seconds',
-                'code': 408
-            }
-        except requests.exceptions.ConnectionError as e:
-            self.log_error(f"Connection error: {str(e)}")
-            return {
-                'success': False,
-                'data': None,
-                'message': f'Cannot connect to Device API at {self.base_url}',
-                'code': 503
-            }
-        except ServiceException:
-            raise
-        except Exception as e:
-            self.log_error(f"Unexpected error in _make_request: {str(e)}")
+            except ServiceException:
+                raise
+            except Exception as e:
+                self.log_error(f"Unexpected error in _make_request: {str(e)}")
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': str(e),
+                    'code': 500
+                }
+    
+    @staticmethod
+    def _failed_to_connect(error: requests.exceptions.ConnectionError) -> bool:
+        """True if the connection was never opened, so nothing was sent"""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        # requests wraps urllib3's MaxRetryError, which carries the cause
+        reason = getattr(reason, 'reason', reason)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    
+    def _send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        data: Optional[Dict[str, Any]]
+    ) -> requests.Response:
+        """Send one authenticated request over the pooled session"""
+        # Ensure we're authenticated
+        if not self._ensure_authenticated():
+            raise ServiceException(
+                detail="Failed to authenticate with Device API",
+                code="auth_failed",
+                context={'base_url': self.base_url}
+            )
+        
+        self.log_info(f"{method} {url} - Params: {params}")
+        
+        return self.session.request(
+            method.upper(),
+            url,
+            params=params,
+            json=data if method.upper() == 'POST' else None,
+            headers=self._get_auth_headers(),
+            timeout=(self.connect_timeout, self.read_timeout)
+        )
+    
+    @staticmethod
+    def _parse_response(response: requests.Response) -> Dict[str, Any]:
+        """Convert an API response to the standardized result dict"""
+        try:
+            response_data = response.json()
+        except ValueError:
+            response_data = {'text': response.text}
+        
+        # Check if request was successful
+        if response.status_code == 200:
             return {
-                'success': False,
-                'data': None,
-                'message': str(e),
-                'code': 500
+                'success': True,
+                'data': response_data,
+                'message': 'ok',
+                'code': 200
             }
+        
+        # Error response
+        error_message = response.text
+        if isinstance(response_data, dict):
+            error_message = response_data.get('message') or response_data.get('error') or response.text
+        return {
+            'success': False,
+            'data': None,
+            'message': error_message,
+            'code': response.status_code
+        }
     
     # ==========================================
     # PUBLIC API METHODS
@@ -325,7 +419,8 @@ class DeviceAPIService(BaseService):
                 params={
                     'deviceName': device_name,
                     'data': command
-                }
+                },
+                idempotent=False
             )
             
             if result['success']:
@@ -468,7 +563,8 @@ class DeviceAPIService(BaseService):
                 params={
                     'deviceName': device_name,
                     'minPower': min_power
-                }
+                },
+                idempotent=False
             )
             
             if result['success']:
@@ -520,7 +616,8 @@ class DeviceAPIService(BaseService):
             result = self._make_request(
                 method='POST',
                 endpoint='/device/create',
-                params=params
+                params=params,
+                idempotent=False
             )
             
             if result['success']:
@@ -535,6 +632,165 @@ class DeviceAPIService(BaseService):
         except Exception as e:
             self.handle_service_error(e, f"Failed to create device {device_name}")
 
+    
+    # ==========================================
+    # BULK OPERATIONS
+    # ==========================================
+    
+    def check_devices(
+        self,
+        device_names: Iterable[str],
+        max_workers: Optional[int] = None,
+        device_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Check many devices concurrently
+        
+        Args:
+            device_names: Device identifiers (e.g., ["CG001", "CG002"])
+            max_workers: Concurrent requests (default: BULK_MAX_WORKERS)
+            device_timeout: Seconds allowed per device (default: BULK_DEVICE_TIMEOUT)
+        
+        Returns:
+            Aggregated summary, see _fan_out
+        """
+        return self._fan_out(
+            'check_device',
+            lambda worker, device_name: worker.check_device(device_name),
+            device_names, max_workers, device_timeout
+        )
+    
+    def send_commands(
+        self,
+        device_names: Iterable[str],
+        command: str,
+        max_workers: Optional[int] = None,
+        device_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Send the same raw command to many devices concurrently
+        
+        Args:
+            device_names: Device identifiers
+            command: Raw command string to send to each device
+            max_workers: Concurrent requests (default: BULK_MAX_WORKERS)
+            device_timeout: Seconds allowed per device (default: BULK_DEVICE_TIMEOUT)
+        
+        Returns:
+            Aggregated summary, see _fan_out
+        """
+        return self._fan_out(
+            'send_command',
+            lambda worker, device_name: worker.send_command(device_name, command),
+            device_names, max_workers, device_timeout
+        )
+    
+    def _bulk_worker(self, device_timeout: float) -> 'DeviceAPIService':
+        """
+        Copy of this service for one bulk call: shares the pooled session but
+        has its own token slot, a per-device read timeout and no retries
+        (one slow device must not hold a worker for several timeouts)
+        """
+        worker = copy.copy(self)
+        worker.jwt_token = None
+        worker.read_timeout = device_timeout
+        worker.connect_timeout = min(self.connect_timeout, device_timeout)
+        worker.max_retries = 0
+        return worker
+    
+    def _fan_out(
+        self,
+        operation: str,
+        call: Callable[['DeviceAPIService', str], Dict[str, Any]],
+        device_names: Iterable[str],
+        max_workers: Optional[int],
+        device_timeout: Optional[float]
+    ) -> Dict[str, Any]:
+        """
+        Run call(worker, device_name) over a bounded thread pool
+        
+        Returns:
+            Dict with totals and per-device results:
+            {
+                'operation': str,
+                'total': int,
+                'succeeded': int,
+                'failed': int,
+                'duration_ms': int,
+                'errors': {code: count},
+                'results': {device_name: {'success', 'data', 'message', 'code'}}
+            }
+        """
+        device_names = list(dict.fromkeys(name for name in device_names if name))
+        if not device_names:
+            raise ServiceException(
+                detail="At least one device name is required",
+                code="invalid_params"
+            )
+        
+        device_timeout = device_timeout or self.bulk_device_timeout
+        workers = max(1, min(max_workers or self.bulk_max_workers, len(device_names)))
+        
+        # Authenticate once up front instead of in every thread
+        if not self._ensure_authenticated():
+            raise ServiceException(
+                detail="Failed to authenticate with Device API",
+                code="auth_failed",
+                context={'base_url': self.base_url}
+            )
+        
+        def run(device_name):
+            try:
+                return call(self._bulk_worker(device_timeout), device_name)
+            except ServiceException as e:
+                return {'success': False, 'data': None, 'message': str(e.detail), 'code': 400}
+            except Exception as e:
+                return {'success': False, 'data': None, 'message': str(e), 'code': 500}
+        
+        started = time.monotonic()
+        results: Dict[str, Dict[str, Any]] = {}
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='device-api-bulk')
+        try:
+            futures = {executor.submit(run, name): name for name in device_names}
+            
+            # Every device gets device_timeout once its turn comes; allow for queueing
+            rounds = -(-len(device_names) // workers)
+            done, not_done = wait(futures, timeout=device_timeout * rounds + self.connect_timeout)
+            
+            for future in done:
+                results[futures[future]] = future.result()
+            for future in not_done:
+                future.cancel()
+                results[futures[future]] = {
+                    'success': False,
+                    'data': None,
+                    'message': f'No response within {device_timeout} seconds',
+                    'code': 408
+                }
+        finally:
+            # Do not block on threads that are still stuck on a device
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        errors: Dict[str, int] = {}
+        for result in results.values():
+            if not result['success']:
+                errors[str(result['code'])] = errors.get(str(result['code']), 0) + 1
+        succeeded = len(results) - sum(errors.values())
+        
+        summary = {
+            'operation': operation,
+            'total': len(device_names),
+            'succeeded': succeeded,
+            'failed': len(device_names) - succeeded,
+            'duration_ms': int((time.monotonic() - started) * 1000),
+            'errors': errors,
+            'results': {name: results[name] for name in device_names},
+        }
+        self.log_info(
+            f"Bulk {operation}: {succeeded}/{len(device_names)} succeeded "
+            f"in {summary['duration_ms']}ms with {workers} workers"
+        )
+        return summary
 
 # ==========================================
 # SINGLETON INSTANCE
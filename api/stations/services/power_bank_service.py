@@ -9,11 +9,105 @@ Date: 2025-10-18 23:01:23
 """
 from __future__ import annotations
 
+from typing import Optional, Tuple
+
+from django.db import connection
+from django.utils import timezone
+
 from api.common.services.base import BaseService
+from api.stations.models import PowerBank, Station, StationSlot
 
 class PowerBankService(BaseService):
     """Service for power bank operations - handles assignments and returns for rentals"""
     
+    MIN_RENTAL_BATTERY = 20
+    CLAIM_ATTEMPTS = 5
+    
+    def claim_available_power_bank(self, station: Station) -> Optional[Tuple[PowerBank, StationSlot]]:
+        """
+        Claim the best charged power bank at a station together with its slot
+        
+        The power bank becomes RENTED (location cleared) and its slot OCCUPIED
+        in one statement. Rows locked by other in-flight rentals are skipped
+        instead of waited on, so concurrent renters at one station each get a
+        different power bank. Call inside the rental's transaction; link the
+        slot to the rental afterwards with link_slot_to_rental().
+        
+        Returns:
+            (power_bank, slot) or None if nothing is available
+        """
+        if connection.vendor == 'postgresql':
+            claimed = self._claim_skip_locked(station)
+        else:
+            claimed = self._claim_compare_and_set(station)
+        if not claimed:
+            return None
+        
+        power_bank_id, slot_id = claimed
+        power_bank = PowerBank.objects.get(id=power_bank_id)
+        slot = StationSlot.objects.get(id=slot_id)
+        return power_bank, slot
+    
+    def _claim_skip_locked(self, station: Station) -> Optional[Tuple[str, str]]:
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH candidate AS (
+                    SELECT pb.id AS power_bank_id, s.id AS slot_id
+                    FROM power_banks pb
+                    JOIN station_slots s ON s.id = pb.current_slot_id
+                    WHERE pb.current_station_id = %s
+                      AND pb.status = 'AVAILABLE'
+                      AND pb.battery_level >= %s
+                      AND s.status = 'AVAILABLE'
+                    ORDER BY pb.battery_level DESC
+                    LIMIT 1
+                    FOR UPDATE OF pb, s SKIP LOCKED
+                ), claimed_power_bank AS (
+                    UPDATE power_banks
+                    SET status = 'RENTED', current_station_id = NULL, current_slot_id = NULL,
+                        last_updated = %s, updated_at = %s
+                    FROM candidate WHERE power_banks.id = candidate.power_bank_id
+                    RETURNING power_banks.id
+                ), claimed_slot AS (
+                    UPDATE station_slots
+                    SET status = 'OCCUPIED', last_updated = %s, updated_at = %s
+                    FROM candidate WHERE station_slots.id = candidate.slot_id
+                    RETURNING station_slots.id
+                )
+                SELECT power_bank_id, slot_id FROM candidate
+                """,
+                [station.id, self.MIN_RENTAL_BATTERY, now, now, now, now]
+            )
+            row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def _claim_compare_and_set(self, station: Station) -> Optional[Tuple[str, str]]:
+        """Portable fallback: conditional UPDATEs, retried on a lost race"""
+        now = timezone.now()
+        candidates = PowerBank.objects.filter(
+            current_station=station,
+            current_slot__status='AVAILABLE',
+            status='AVAILABLE',
+            battery_level__gte=self.MIN_RENTAL_BATTERY
+        ).order_by('-battery_level').values_list('id', 'current_slot_id')
+        
+        for power_bank_id, slot_id in candidates[:self.CLAIM_ATTEMPTS]:
+            claimed = PowerBank.objects.filter(id=power_bank_id, status='AVAILABLE').update(
+                status='RENTED', current_station=None, current_slot=None, last_updated=now, updated_at=now
+            )
+            if not claimed:
+                continue
+            StationSlot.objects.filter(id=slot_id).update(status='OCCUPIED', last_updated=now, updated_at=now)
+            return power_bank_id, slot_id
+        return None
+    
+    def link_slot_to_rental(self, slot: StationSlot, rental) -> None:
+        """Point a claimed slot at the rental that took its power bank"""
+        StationSlot.objects.filter(id=slot.id).update(current_rental=rental)
+        slot.current_rental = rental
+    
     def assign_power_bank_to_rental(self, power_bank, rental):
         """Assign power bank to a rental (update status and references)"""
         try:
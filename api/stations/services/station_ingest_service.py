@@ -0,0 +1,222 @@
+"""
+Service for queued ingestion of IoT station data
+============================================================
+
+Lets StationDataInternalView acknowledge a signed device upload right away and
+apply it on a Celery worker. Payloads are partitioned by device serial onto
+dedicated queues so one device's reports are applied in order, deduplicated by
+device + type + timestamp, and stale reports are dropped.
+
+Each ingest queue must be consumed by a single worker process
+(--concurrency=1) to keep per-device ordering, e.g.:
+
+    celery -A tasks.app worker -Q iot_ingest_0 --concurrency=1
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.common.services.base import BaseService, ServiceException
+
+
+class StationIngestService(BaseService):
+    """Enqueue and apply IoT station payloads"""
+
+    DATA_TYPES = ('full', 'returned', 'status')
+
+    # Types that describe current state; an older report must not overwrite a newer one
+    STATE_TYPES = ('full', 'status')
+
+    QUEUE_PREFIX = 'iot_ingest'
+    IDEMPOTENCY_TTL = 24 * 60 * 60
+    LAST_APPLIED_TTL = 24 * 60 * 60
+
+    def __init__(self):
+        super().__init__()
+        self.partitions = max(1, getattr(settings, 'IOT_INGEST_PARTITIONS', 4))
+
+    # ==========================================
+    # KEYS AND PARTITIONING
+    # ==========================================
+
+    @staticmethod
+    def get_device_identifier(data: Dict[str, Any]) -> Optional[str]:
+        """Device serial number, falling back to IMEI for status payloads"""
+        device = data.get('device') or {}
+        return device.get('serial_number') or device.get('imei')
+
+    def get_partition(self, identifier: str) -> int:
+        """Stable partition for a device (crc32, identical across processes)"""
+        return zlib.crc32(identifier.encode('utf-8')) % self.partitions
+
+    def get_queue_name(self, identifier: str) -> str:
+        return f"{self.QUEUE_PREFIX}_{self.get_partition(identifier)}"
+
+    @staticmethod
+    def _idempotency_key(identifier: str, data_type: str, timestamp: Any) -> str:
+        return f"stations:ingest:seen:{identifier}:{data_type}:{timestamp}"
+
+    @staticmethod
+    def _last_applied_key(identifier: str, data_type: str) -> str:
+        return f"stations:ingest:last_applied:{identifier}:{data_type}"
+
+    # ==========================================
+    # ENQUEUE (HTTP SIDE)
+    # ==========================================
+
+    def validate_payload(self, data: Dict[str, Any]) -> str:
+        """
+        Validate the envelope needed for routing
+
+        Returns:
+            str: Device identifier
+        """
+        data_type = data.get('type')
+        if data_type not in self.DATA_TYPES:
+            raise ServiceException(
+                detail=f'Invalid data type: {data_type}. Must be "full", "returned", or "status"',
+                code="invalid_type"
+            )
+
+        identifier = self.get_device_identifier(data)
+        if not identifier:
+            raise ServiceException(
+                detail="Missing device serial_number or imei",
+                code="missing_device_identifier"
+            )
+
+        if not isinstance(data.get('timestamp'), int):
+            raise ServiceException(
+                detail="Missing or invalid payload timestamp",
+                code="invalid_timestamp"
+            )
+
+        return identifier
+
+    def enqueue(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a payload for asynchronous processing
+
+        Returns:
+            Dict with queue name, task id and whether it was a duplicate
+        """
+        from api.stations.tasks import process_station_data
+
+        identifier = self.validate_payload(data)
+        data_type = data['type']
+        timestamp = data['timestamp']
+        queue = self.get_queue_name(identifier)
+        idempotency_key = self._idempotency_key(identifier, data_type, timestamp)
+
+        # Device retries of an accepted upload are acknowledged without re-queuing
+        try:
+            is_new = cache.add(idempotency_key, 'queued', timeout=self.IDEMPOTENCY_TTL)
+        except Exception as e:
+            self.log_warning(f"Idempotency check unavailable, queuing anyway: {str(e)}")
+            is_new = True
+
+        if not is_new:
+            self.log_info(f"Duplicate IoT payload ignored: {identifier} {data_type} @ {timestamp}")
+            return {
+                'queued': False,
+                'duplicate': True,
+                'device': identifier,
+                'type': data_type,
+                'queue': queue,
+            }
+
+        try:
+            result = process_station_data.apply_async(args=[data], queue=queue)
+        except Exception:
+            # Let the device retry if the broker is unavailable
+            cache.delete(idempotency_key)
+            raise
+
+        self.log_info(f"IoT payload queued: {identifier} {data_type} @ {timestamp} -> {queue}")
+        return {
+            'queued': True,
+            'duplicate': False,
+            'device': identifier,
+            'type': data_type,
+            'queue': queue,
+            'task_id': result.id,
+        }
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """
+        Whether a failed apply may succeed on retry
+
+        StationSyncService routes every unexpected error (deadlock, dropped
+        connection, cache outage) through handle_service_error, which turns it
+        into ServiceException(code="internal_error"); only the other
+        ServiceException codes describe a payload that will never apply.
+        """
+        if not isinstance(error, ServiceException):
+            return True
+        return error.get_codes() == 'internal_error'
+
+    def release(self, data: Dict[str, Any]) -> None:
+        """Forget a payload so a device resend is accepted again (after a failed apply)"""
+        identifier = self.get_device_identifier(data)
+        if not identifier:
+            return
+        try:
+            cache.delete(self._idempotency_key(identifier, data.get('type'), data.get('timestamp')))
+        except Exception as e:
+            self.log_warning(f"Failed to release IoT payload for {identifier}: {str(e)}")
+
+    # ==========================================
+    # APPLY (WORKER SIDE)
+    # ==========================================
+
+    def _is_stale(self, identifier: str, data_type: str, timestamp: int) -> bool:
+        if data_type not in self.STATE_TYPES:
+            return False
+        try:
+            last_applied = cache.get(self._last_applied_key(identifier, data_type))
+        except Exception:
+            return False
+        return last_applied is not None and timestamp < last_applied
+
+    def _mark_applied(self, identifier: str, data_type: str, timestamp: int) -> None:
+        if data_type not in self.STATE_TYPES:
+            return
+        try:
+            cache.set(self._last_applied_key(identifier, data_type), timestamp, timeout=self.LAST_APPLIED_TTL)
+        except Exception as e:
+            self.log_warning(f"Failed to record applied IoT payload for {identifier}: {str(e)}")
+
+    def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply a payload with StationSyncService
+
+        Returns:
+            Sync result, or a skip marker for stale state reports
+        """
+        from api.stations.services.station_sync_service import StationSyncService
+
+        identifier = self.validate_payload(data)
+        data_type = data['type']
+        timestamp = data['timestamp']
+
+        if self._is_stale(identifier, data_type, timestamp):
+            self.log_warning(f"Stale IoT payload skipped: {identifier} {data_type} @ {timestamp}")
+            return {'skipped': True, 'reason': 'stale', 'device': identifier, 'type': data_type}
+
+        service = StationSyncService()
+        with transaction.atomic():
+            if data_type == 'full':
+                result = service.sync_station_data(data)
+            elif data_type == 'returned':
+                result = service.process_return_event(data)
+            else:
+                result = service.update_station_status(data)
+
+        self._mark_applied(identifier, data_type, timestamp)
+        return result
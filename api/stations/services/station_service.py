@@ -9,14 +9,18 @@ Date: 2025-10-18 23:01:23
 """
 from __future__ import annotations
 
+import math
 from typing import Dict, Any, List
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import ExpressionWrapper, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
 from api.common.services.base import CRUDService, ServiceException
-from api.common.utils.helpers import calculate_distance, paginate_queryset
+from api.common.utils.helpers import EARTH_RADIUS_KM, calculate_bounding_box, paginate_queryset
 from api.stations.models import (
     Station, StationSlot
 )
+from api.stations.services.utils.heartbeat_buffer import station_heartbeat_buffer
+from api.stations.services.utils.spatial_index import get_station_spatial_index
 
 class StationService(CRUDService):
     """Service for station operations"""
@@ -43,22 +47,15 @@ class StationService(CRUDService):
                             Q(landmark__icontains=search_term)
                         )
                 
-                # Location-based filtering (has priority over other filters)
+                # Location-based filtering (has priority over other filters):
+                # bounding box + SQL haversine so filter, order and page run in one query
                 if all(k in filters for k in ['lat', 'lng', 'radius']):
-                    nearby_stations = self._get_nearby_stations(
-                        filters['lat'], filters['lng'], filters['radius']
-                    )
-                    if nearby_stations:
-                        station_ids = [s['id'] for s in nearby_stations]
-                        queryset = queryset.filter(id__in=station_ids)
-                        # Order by distance when location filtering is applied
-                        queryset = queryset.extra(
-                            select={'distance_order': f"CASE WHEN id IN ({','.join(['%s'] * len(station_ids))}) THEN 1 ELSE 2 END"},
-                            select_params=station_ids
-                        ).order_by('distance_order', 'station_name')
-                    else:
-                        # No nearby stations found, return empty queryset
-                        queryset = queryset.none()
+                    queryset = self._filter_by_distance(
+                        queryset, filters['lat'], filters['lng'], filters['radius']
+                    ).filter(
+                        is_maintenance=False,
+                        status__in=['ONLINE', 'OFFLINE']
+                    ).order_by('distance', 'station_name')
             
             # Exclude maintenance stations for regular users
             if not (user and user.is_staff):
@@ -71,11 +68,54 @@ class StationService(CRUDService):
             page = filters.get('page', 1) if filters else 1
             page_size = min(filters.get('page_size', 20) if filters else 20, 50)  # Max 50 per page
             
-            return paginate_queryset(queryset, page, page_size)
+            result = paginate_queryset(queryset, page, page_size)
+            
+            # Show status pings that have not been flushed to the table yet
+            station_heartbeat_buffer.apply_pending(result['results'])
+            return result
             
         except Exception as e:
             self.handle_service_error(e, "Failed to get stations list")
     
+    def _filter_by_distance(self, queryset, lat: float, lng: float, radius: float):
+        """Restrict queryset to stations within radius (km), annotated with distance"""
+        if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+            raise ServiceException(
+                detail="Invalid coordinates",
+                code="invalid_coordinates"
+            )
+        
+        # Bounding box first so the (latitude, longitude) index narrows the scan
+        min_lat, max_lat, min_lng, max_lng = calculate_bounding_box(lat, lng, radius)
+        lng_filter = Q(longitude__gte=max(min_lng, -180.0), longitude__lte=min(max_lng, 180.0))
+        if min_lng < -180:
+            lng_filter |= Q(longitude__gte=min_lng + 360)
+        if max_lng > 180:
+            lng_filter |= Q(longitude__lte=max_lng - 360)
+        
+        queryset = queryset.filter(lng_filter, latitude__gte=min_lat, latitude__lte=max_lat)
+        return queryset.annotate(
+            distance=self._distance_expression(lat, lng)
+        ).filter(distance__lte=radius)
+    
+    @staticmethod
+    def _distance_expression(lat: float, lng: float):
+        """Haversine distance (km) from (lat, lng) as a database expression"""
+        station_lat = Radians(Cast('latitude', FloatField()))
+        station_lng = Radians(Cast('longitude', FloatField()))
+        origin_lat = Value(math.radians(lat), output_field=FloatField())
+        origin_lng = Value(math.radians(lng), output_field=FloatField())
+        
+        a = (
+            Power(Sin((station_lat - origin_lat) / 2), 2)
+            + Value(math.cos(math.radians(lat)), output_field=FloatField())
+            * Cos(station_lat) * Power(Sin((station_lng - origin_lng) / 2), 2)
+        )
+        return ExpressionWrapper(
+            2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(a, Value(1.0, output_field=FloatField())))),
+            output_field=FloatField()
+        )
+    
     def get_station_detail(self, station_sn: str, user=None) -> Station:
         """Get station detail by serial number"""
         try:
@@ -90,6 +130,7 @@ class StationService(CRUDService):
                     code="station_maintenance"
                 )
             
+            station_heartbeat_buffer.apply_pending([station])
             return station
             
         except Station.DoesNotExist:
@@ -117,31 +158,9 @@ class StationService(CRUDService):
                     code="invalid_coordinates"
                 )
             
-            # Get all active stations - exclude deleted
-            stations = Station.objects.filter(
-                status__in=['ONLINE', 'OFFLINE'],
-                is_maintenance=False,
-                is_deleted=False
-            ).values('id', 'station_name', 'latitude', 'longitude', 'address')
-            
-            nearby_stations = []
-            for station in stations:
-                try:
-                    distance = calculate_distance(
-                        lat, lng,
-                        float(station['latitude']), float(station['longitude'])
-                    )
-                    
-                    if distance <= radius:
-                        station['distance'] = round(distance, 2)
-                        nearby_stations.append(station)
-                except (ValueError, TypeError):
-                    # Skip stations with invalid coordinates
-                    continue
-            
-            # Sort by distance
-            nearby_stations.sort(key=lambda x: x['distance'])
-            return nearby_stations
+            # Radius query against the in-process grid index (only active,
+            # non-maintenance, non-deleted stations are indexed)
+            return get_station_spatial_index().query(lat, lng, radius)
             
         except ServiceException:
             raise
@@ -4,6 +4,7 @@ Handles station, slot, and powerbank updates following project patterns
 """
 from __future__ import annotations
 
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from django.db import transaction
@@ -14,6 +15,8 @@ from decimal import Decimal
 from api.common.services.base import CRUDService, ServiceException
 from api.common.utils.helpers import paginate_queryset
 from api.stations.models import Station, StationSlot, PowerBank
+from api.stations.services.utils.heartbeat_buffer import station_heartbeat_buffer
+from api.stations.services.utils.sync_fingerprint import DeviceFingerprintCache
 
 
 class StationSyncService(CRUDService):
@@ -44,6 +47,9 @@ class StationSyncService(CRUDService):
         'MAINTENANCE': 'MAINTENANCE'
     }
     
+    IDENTITY_CACHE_PREFIX = "stations:device_identity"
+    IDENTITY_CACHE_TIMEOUT = 3600
+    
     @transaction.atomic
     def sync_station_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -69,20 +75,42 @@ class StationSyncService(CRUDService):
             
             serial_number = device_data.get('serial_number')
             
+            # Identical to the last applied report: only refresh the heartbeat
+            fingerprint = DeviceFingerprintCache.compute('full', data)
+            cached = self._refresh_heartbeat_if_unchanged(
+                serial_number, 'full', fingerprint, self._parse_heartbeat(device_data)
+            )
+            if cached:
+                self.log_info(f"Station sync skipped for {serial_number}: payload unchanged")
+                return {
+                    'station_id': cached['station_id'],
+                    'station_serial': cached['serial_number'],
+                    'slots_updated': 0,
+                    'powerbanks_updated': 0,
+                    'unchanged': True,
+                    'timestamp': timezone.now().isoformat()
+                }
+            
             # Update or create Station
             station = self._sync_station(device_data, station_data)
             
+            # Prefetch the station's slots once for both slot and powerbank sync
+            slots_by_number = self._get_slots_by_number(station)
+            
             # Update StationSlots
-            slots_updated = self._sync_slots(station, slots_data)
+            slots_updated = self._sync_slots(station, slots_data, slots_by_number)
             
             # Update PowerBanks
-            powerbanks_updated = self._sync_powerbanks(station, powerbanks_data)
+            powerbanks_updated = self._sync_powerbanks(station, powerbanks_data, slots_by_number)
+            
+            transaction.on_commit(lambda: DeviceFingerprintCache.store(station, 'full', fingerprint))
             
             result = {
                 'station_id': str(station.id),
                 'station_serial': station.serial_number,
                 'slots_updated': slots_updated,
                 'powerbanks_updated': powerbanks_updated,
+                'unchanged': False,
                 'timestamp': timezone.now().isoformat()
             }
             
@@ -95,6 +123,33 @@ class StationSyncService(CRUDService):
         except Exception as e:
             self.handle_service_error(e, "Failed to sync station data")
     
+    def _parse_heartbeat(self, device_data: Dict) -> Optional[Any]:
+        """Parse device last_heartbeat, or None if missing/invalid"""
+        last_heartbeat_str = device_data.get('last_heartbeat')
+        if last_heartbeat_str:
+            try:
+                return parse_datetime(last_heartbeat_str)
+            except ValueError:
+                self.log_warning(f"Invalid heartbeat format: {last_heartbeat_str}")
+        return None
+    
+    def _refresh_heartbeat_if_unchanged(self, identifier: str, kind: str, fingerprint: str, heartbeat=None) -> Optional[Dict[str, Any]]:
+        """
+        If the device's last applied payload of this kind had the same
+        fingerprint, refresh last_heartbeat with a single UPDATE
+        
+        Returns:
+            Cached station identity if the payload was unchanged, else None
+        """
+        cached = DeviceFingerprintCache.get(identifier, kind, fingerprint)
+        if not cached:
+            return None
+        
+        updated = Station.objects.filter(id=cached['station_id']).update(
+            last_heartbeat=heartbeat or timezone.now()
+        )
+        return cached if updated else None
+    
     def _validate_sync_data(self, data: Dict[str, Any]) -> None:
         """Validate sync data structure"""
         if not isinstance(data, dict):
@@ -142,13 +197,7 @@ class StationSyncService(CRUDService):
             imei = device_data.get('imei', serial_number)
             
             # Parse last_heartbeat
-            last_heartbeat_str = device_data.get('last_heartbeat')
-            last_heartbeat = None
-            if last_heartbeat_str:
-                try:
-                    last_heartbeat = parse_datetime(last_heartbeat_str)
-                except ValueError:
-                    self.log_warning(f"Invalid heartbeat format: {last_heartbeat_str}")
+            last_heartbeat = self._parse_heartbeat(device_data)
             
             # Get or create station
             station, created = Station.objects.get_or_create(
@@ -205,56 +254,82 @@ class StationSyncService(CRUDService):
                 code="station_sync_error"
             )
     
-    def _sync_slots(self, station: Station, slots_data: list) -> int:
+    def _get_slots_by_number(self, station: Station) -> Dict[int, StationSlot]:
+        """Load all slots of a station in one query, keyed by slot number"""
+        return {slot.slot_number: slot for slot in StationSlot.objects.filter(station=station)}
+    
+    def _sync_slots(self, station: Station, slots_data: list, slots_by_number: Optional[Dict[int, StationSlot]] = None) -> int:
         """
         Update or create StationSlot records
         
+        Existing slots are diffed in memory and written with one bulk_create
+        and one bulk_update, so the query count does not grow with slot count.
+        
         Args:
             station: Station instance
             slots_data: List of slot data from IoT system
+            slots_by_number: Prefetched slots of the station; newly created
+                slots are added to it for the powerbank sync
             
         Returns:
             Number of slots updated
         """
         try:
+            if slots_by_number is None:
+                slots_by_number = self._get_slots_by_number(station)
+            
+            now = timezone.now()
             slots_updated = 0
+            to_create: Dict[int, StationSlot] = {}
+            to_update: Dict[int, StationSlot] = {}
             
             for slot_info in slots_data:
                 slot_number = slot_info.get('slot_number')
                 if not slot_number:
                     self.log_warning(f"Slot data missing slot_number: {slot_info}")
                     continue
+                slot_number = int(slot_number)
                 
-                slot_status = self.SLOT_STATUS_MAP.get(
-                    slot_info.get('status', 'AVAILABLE'),
-                    'AVAILABLE'
-                )
-                
-                battery_level = slot_info.get('battery_level', 0)
-                slot_metadata = slot_info.get('slot_metadata', {})
-                power_bank_serial = slot_info.get('power_bank_serial')
-                
-                # Get or create slot
-                slot, created = StationSlot.objects.get_or_create(
-                    station=station,
-                    slot_number=slot_number,
-                    defaults={
-                        'status': slot_status,
-                        'battery_level': battery_level,
-                        'slot_metadata': slot_metadata
-                    }
-                )
+                values = {
+                    'status': self.SLOT_STATUS_MAP.get(
+                        slot_info.get('status', 'AVAILABLE'),
+                        'AVAILABLE'
+                    ),
+                    'battery_level': slot_info.get('battery_level', 0),
+                    'slot_metadata': slot_info.get('slot_metadata', {}),
+                }
                 
-                if not created:
-                    # Update existing slot
-                    slot.status = slot_status
-                    slot.battery_level = battery_level
-                    slot.slot_metadata = slot_metadata
-                    slot.save()
+                slot = slots_by_number.get(slot_number)
+                if slot is None:
+                    slot = StationSlot(station=station, slot_number=slot_number, **values)
+                    slots_by_number[slot_number] = slot
+                    to_create[slot_number] = slot
+                elif slot_number in to_create:
+                    # Duplicate entry in the payload for a slot created above
+                    for field, value in values.items():
+                        setattr(slot, field, value)
+                elif any(getattr(slot, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(slot, field, value)
+                    # bulk_update() does not touch auto_now fields
+                    slot.last_updated = now
+                    slot.updated_at = now
+                    to_update[slot_number] = slot
                 
                 slots_updated += 1
             
-            self.log_info(f"Updated {slots_updated} slots for station {station.serial_number}")
+            if to_create:
+                StationSlot.objects.bulk_create(to_create.values())
+            if to_update:
+                StationSlot.objects.bulk_update(
+                    to_update.values(),
+                    ['status', 'battery_level', 'slot_metadata', 'last_updated', 'updated_at']
+                )
+            
+            self.log_info(
+                f"Updated {slots_updated} slots for station {station.serial_number} "
+                f"({len(to_create)} created, {len(to_update)} changed)"
+            )
             return slots_updated
             
         except Exception as e:
@@ -264,19 +339,36 @@ class StationSyncService(CRUDService):
                 code="slots_sync_error"
             )
     
-    def _sync_powerbanks(self, station: Station, powerbanks_data: list) -> int:
+    def _sync_powerbanks(self, station: Station, powerbanks_data: list, slots_by_number: Optional[Dict[int, StationSlot]] = None) -> int:
         """
         Update or create PowerBank records
         
+        Existing powerbanks are loaded by serial in one query, diffed in memory
+        and written with one bulk_create and one bulk_update.
+        
         Args:
             station: Station instance
             powerbanks_data: List of powerbank data from IoT system
+            slots_by_number: Prefetched slots of the station, used to resolve
+                current_slot without a query per powerbank
             
         Returns:
             Number of powerbanks updated
         """
         try:
+            if slots_by_number is None:
+                slots_by_number = self._get_slots_by_number(station)
+            
+            serials = [pb_info.get('serial_number') for pb_info in powerbanks_data if pb_info.get('serial_number')]
+            existing_powerbanks = {
+                pb.serial_number: pb
+                for pb in PowerBank.objects.filter(serial_number__in=serials)
+            } if serials else {}
+            
+            now = timezone.now()
             powerbanks_updated = 0
+            to_create: Dict[str, PowerBank] = {}
+            to_update: Dict[str, PowerBank] = {}
             
             for pb_info in powerbanks_data:
                 pb_serial = pb_info.get('serial_number')
@@ -284,52 +376,61 @@ class StationSyncService(CRUDService):
                     self.log_warning(f"PowerBank data missing serial_number: {pb_info}")
                     continue
                 
-                pb_status = self.POWERBANK_STATUS_MAP.get(
-                    pb_info.get('status', 'AVAILABLE'),
-                    'AVAILABLE'
-                )
-                
-                battery_level = pb_info.get('battery_level', 0)
-                current_slot_number = pb_info.get('current_slot')
-                hardware_info = pb_info.get('hardware_info', {})
-                
                 # Find current slot
                 current_slot = None
+                current_slot_number = pb_info.get('current_slot')
                 if current_slot_number:
-                    try:
-                        current_slot = StationSlot.objects.get(
-                            station=station,
-                            slot_number=current_slot_number
-                        )
-                    except StationSlot.DoesNotExist:
+                    current_slot = slots_by_number.get(int(current_slot_number))
+                    if current_slot is None:
                         self.log_warning(f"Slot {current_slot_number} not found for station {station.serial_number}")
                 
-                # Get or create powerbank
-                powerbank, created = PowerBank.objects.get_or_create(
-                    serial_number=pb_serial,
-                    defaults={
-                        'model': 'Standard',  # Will be set based on capacity mapping
-                        'capacity_mah': 10000,  # Default, should be mapped from SN
-                        'status': pb_status,
-                        'battery_level': battery_level,
-                        'hardware_info': hardware_info,
-                        'current_station': station,
-                        'current_slot': current_slot
-                    }
-                )
+                values = {
+                    'status': self.POWERBANK_STATUS_MAP.get(
+                        pb_info.get('status', 'AVAILABLE'),
+                        'AVAILABLE'
+                    ),
+                    'battery_level': pb_info.get('battery_level', 0),
+                    'hardware_info': pb_info.get('hardware_info', {}),
+                    'current_station': station,
+                    'current_slot': current_slot,
+                }
                 
-                if not created:
-                    # Update existing powerbank
-                    powerbank.status = pb_status
-                    powerbank.battery_level = battery_level
-                    powerbank.hardware_info = hardware_info
-                    powerbank.current_station = station
-                    powerbank.current_slot = current_slot
-                    powerbank.save()
+                powerbank = existing_powerbanks.get(pb_serial)
+                if powerbank is None:
+                    powerbank = PowerBank(
+                        serial_number=pb_serial,
+                        model='Standard',  # Will be set based on capacity mapping
+                        capacity_mah=10000,  # Default, should be mapped from SN
+                        **values
+                    )
+                    existing_powerbanks[pb_serial] = powerbank
+                    to_create[pb_serial] = powerbank
+                elif pb_serial in to_create:
+                    for field, value in values.items():
+                        setattr(powerbank, field, value)
+                elif self._powerbank_changed(powerbank, values):
+                    for field, value in values.items():
+                        setattr(powerbank, field, value)
+                    # bulk_update() does not touch auto_now fields
+                    powerbank.last_updated = now
+                    powerbank.updated_at = now
+                    to_update[pb_serial] = powerbank
                 
                 powerbanks_updated += 1
             
-            self.log_info(f"Updated {powerbanks_updated} powerbanks for station {station.serial_number}")
+            if to_create:
+                PowerBank.objects.bulk_create(to_create.values())
+            if to_update:
+                PowerBank.objects.bulk_update(
+                    to_update.values(),
+                    ['status', 'battery_level', 'hardware_info', 'current_station',
+                     'current_slot', 'last_updated', 'updated_at']
+                )
+            
+            self.log_info(
+                f"Updated {powerbanks_updated} powerbanks for station {station.serial_number} "
+                f"({len(to_create)} created, {len(to_update)} changed)"
+            )
             return powerbanks_updated
             
         except Exception as e:
@@ -339,6 +440,18 @@ class StationSyncService(CRUDService):
                 code="powerbanks_sync_error"
             )
     
+    @staticmethod
+    def _powerbank_changed(powerbank: PowerBank, values: Dict[str, Any]) -> bool:
+        """Compare reported values with a PowerBank without loading its relations"""
+        current_slot = values['current_slot']
+        return (
+            powerbank.status != values['status']
+            or powerbank.battery_level != values['battery_level']
+            or powerbank.hardware_info != values['hardware_info']
+            or powerbank.current_station_id != values['current_station'].id
+            or powerbank.current_slot_id != (current_slot.id if current_slot else None)
+        )
+    
     @transaction.atomic
     def process_return_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -392,6 +505,9 @@ class StationSyncService(CRUDService):
                     code="slot_not_found"
                 )
             
+            # Slot/powerbank state changes here, so the next full report must be applied
+            transaction.on_commit(lambda: DeviceFingerprintCache.invalidate(station))
+            
             # Find active rental for this powerbank
             from api.rentals.models import Rental
             active_rental = Rental.objects.filter(
@@ -521,6 +637,19 @@ class StationSyncService(CRUDService):
                     code="missing_device_identifier"
                 )
             
+            # Validate status value
+            if new_status not in self.STATION_STATUS_MAP:
+                raise ServiceException(
+                    detail=f"Invalid status '{new_status}'. Must be one of: {', '.join(self.STATION_STATUS_MAP.keys())}",
+                    code="invalid_status"
+                )
+            
+            fingerprint = DeviceFingerprintCache.compute('status', data)
+            
+            # Plain status pings go through the heartbeat buffer instead of a row save
+            if not device_data.get('hardware_info'):
+                return self._buffer_status(identifier, new_status, fingerprint)
+            
             # Check if identifier matches IMEI or serial_number field
             station = Station.objects.filter(
                 Q(imei=identifier) | Q(serial_number=identifier)
@@ -532,13 +661,6 @@ class StationSyncService(CRUDService):
                     code="station_not_found"
                 )
             
-            # Validate status value
-            if new_status not in self.STATION_STATUS_MAP:
-                raise ServiceException(
-                    detail=f"Invalid status '{new_status}'. Must be one of: {', '.join(self.STATION_STATUS_MAP.keys())}",
-                    code="invalid_status"
-                )
-            
             # Update station status and heartbeat
             station.status = self.STATION_STATUS_MAP.get(new_status, 'OFFLINE')
             station.last_heartbeat = timezone.now()
@@ -548,13 +670,15 @@ class StationSyncService(CRUDService):
                 station.hardware_info.update(device_data['hardware_info'])
             
             station.save(update_fields=['status', 'last_heartbeat', 'hardware_info'])
+            transaction.on_commit(lambda: DeviceFingerprintCache.store(station, 'status', fingerprint))
             
             result = {
                 'station_id': str(station.id),
                 'serial_number': station.serial_number,
                 'status': station.status,
                 'last_heartbeat': station.last_heartbeat.isoformat(),
-                'updated_at': timezone.now().isoformat()
+                'updated_at': timezone.now().isoformat(),
+                'unchanged': False
             }
             
             identifier = imei or serial_number
@@ -568,6 +692,56 @@ class StationSyncService(CRUDService):
             identifier = data.get('device', {}).get('imei') or data.get('device', {}).get('serial_number', 'unknown')
             self.handle_service_error(e, f"Failed to update station status for {identifier}")
     
+    def _get_station_identity(self, identifier: str) -> Dict[str, Any]:
+        """Station id/serial/imei for a device identifier, cached"""
+        cache_key = f"{self.IDENTITY_CACHE_PREFIX}:{identifier}"
+        identity = cache.get(cache_key)
+        if identity:
+            return identity
+        
+        identity = Station.objects.filter(
+            Q(imei=identifier) | Q(serial_number=identifier)
+        ).values('id', 'serial_number', 'imei').first()
+        if not identity:
+            raise ServiceException(
+                detail=f"Station with identifier {identifier} not found",
+                code="station_not_found"
+            )
+        
+        identity['id'] = str(identity['id'])
+        cache.set(cache_key, identity, timeout=self.IDENTITY_CACHE_TIMEOUT)
+        return identity
+    
+    def _buffer_status(self, identifier: str, new_status: str, fingerprint: str) -> Dict[str, Any]:
+        """
+        Record a status ping in the heartbeat buffer; flushed in bulk by
+        flush_station_heartbeats or by the first ping after the flush interval
+        """
+        identity = self._get_station_identity(identifier)
+        now = timezone.now()
+        status = self.STATION_STATUS_MAP[new_status]
+        
+        station_heartbeat_buffer.record(identity['id'], status, now)
+        
+        # A changed status report supersedes the cached full sync fingerprint
+        unchanged = DeviceFingerprintCache.get(identifier, 'status', fingerprint) is not None
+        if not unchanged:
+            station = Station(id=identity['id'], serial_number=identity['serial_number'], imei=identity['imei'])
+            transaction.on_commit(lambda: DeviceFingerprintCache.store(station, 'status', fingerprint))
+        
+        if station_heartbeat_buffer.flush_due():
+            transaction.on_commit(station_heartbeat_buffer.flush)
+        
+        return {
+            'station_id': identity['id'],
+            'serial_number': identity['serial_number'],
+            'status': status,
+            'last_heartbeat': now.isoformat(),
+            'updated_at': now.isoformat(),
+            'unchanged': unchanged,
+            'buffered': True
+        }
+    
     def _validate_status_data(self, data: Dict[str, Any]) -> None:
         """Validate status update data structure"""
         if not isinstance(data, dict):
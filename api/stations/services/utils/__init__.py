@@ -1,9 +1,18 @@
 """
 Utility modules for stations services
 """
+from .device_token_store import DeviceTokenStore, device_token_store
+from .heartbeat_buffer import StationHeartbeatBuffer, station_heartbeat_buffer
 from .sign_chargeghar_main import SignChargeGharMain, get_signature_util
+from .spatial_index import StationSpatialIndex, get_station_spatial_index
 
 __all__ = [
     'SignChargeGharMain',
     'get_signature_util',
+    'StationSpatialIndex',
+    'get_station_spatial_index',
+    'StationHeartbeatBuffer',
+    'station_heartbeat_buffer',
+    'DeviceTokenStore',
+    'device_token_store',
 ]
\ No newline at end of file
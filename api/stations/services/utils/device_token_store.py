@@ -0,0 +1,241 @@
+"""
+Cross-process JWT store for the Java Device API
+Every gunicorn worker and Celery process reads the same cached token; only
+one of them logs in when it is missing, expiring or rejected
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.common.utils.cache_counters import CacheCounters
+
+
+logger = logging.getLogger(__name__)
+
+# Login callable: returns {'token': str, 'expires_at': datetime} or None on failure
+LoginFunc = Callable[[], Optional[Dict[str, Any]]]
+
+
+class DeviceTokenStore:
+    """
+    Device API token shared through the cache, with single-flight refresh
+
+    Reads go to a process-local copy first and then to the cache. A refresh
+    takes a cache lock so concurrent processes wait for one login instead of
+    all logging in; waiters pick up the token the lock holder publishes.
+    renew_if_expiring() is run ahead of expiry by the
+    refresh_device_api_token task so requests rarely pay for a login.
+
+    Local hits are the hot path, so they are counted in process and added
+    to the shared counter in batches (every LOCAL_HITS_FLUSH_COUNT hits or
+    LOCAL_HITS_FLUSH_SECONDS, and whenever metrics are read).
+    """
+
+    CACHE_KEY = "device_api:jwt_token"
+    LOCK_KEY = "device_api:jwt_token:refresh_lock"
+    METRICS_KEY_PREFIX = "device_api:token_metrics"
+    METRIC_NAMES = (
+        'local_hits', 'shared_hits', 'refreshes', 'refresh_failures',
+        'lock_waits', 'proactive_renewals',
+    )
+
+    # Never hand out a token this close to expiry
+    EXPIRY_MARGIN = timedelta(minutes=5)
+    # Background renewal starts this long before expiry
+    RENEW_BEFORE = timedelta(hours=1)
+    LOCK_TIMEOUT = 30
+    WAIT_INTERVAL = 0.1
+    LOCAL_HITS_FLUSH_COUNT = 100
+    LOCAL_HITS_FLUSH_SECONDS = 60
+
+    def __init__(self):
+        self._local: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._local_hits = 0
+        self._local_hits_flushed_at = time.monotonic()
+        self.metrics = CacheCounters(self.METRICS_KEY_PREFIX, self.METRIC_NAMES)
+
+    # ==========================================
+    # METRICS
+    # ==========================================
+
+    def _count_local_hit(self) -> None:
+        with self._lock:
+            self._local_hits += 1
+            due = (
+                self._local_hits >= self.LOCAL_HITS_FLUSH_COUNT
+                or time.monotonic() - self._local_hits_flushed_at >= self.LOCAL_HITS_FLUSH_SECONDS
+            )
+        if due:
+            self.flush_local_hits()
+
+    def flush_local_hits(self) -> None:
+        """Add this process's pending local hits to the shared counter"""
+        with self._lock:
+            hits, self._local_hits = self._local_hits, 0
+            self._local_hits_flushed_at = time.monotonic()
+        if hits:
+            self.metrics.incr('local_hits', hits)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Token counters shared by all processes, plus the current expiry"""
+        self.flush_local_hits()
+        metrics = self.metrics.get_metrics()
+
+        entry = self._read_shared() or self._local
+        metrics['token_expires_at'] = entry['expires_at'].isoformat() if entry else None
+        return metrics
+
+    # ==========================================
+    # STORAGE
+    # ==========================================
+
+    def _usable(self, entry: Optional[Dict[str, Any]], min_remaining: timedelta) -> bool:
+        return bool(entry) and entry['expires_at'] - min_remaining > timezone.now()
+
+    def _read_shared(self) -> Optional[Dict[str, Any]]:
+        try:
+            return cache.get(self.CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Device API token cache read failed: {e}")
+            return None
+
+    def _publish(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local = entry
+        timeout = int((entry['expires_at'] - timezone.now()).total_seconds())
+        try:
+            cache.set(self.CACHE_KEY, entry, timeout=max(timeout, 1))
+        except Exception as e:
+            logger.warning(f"Device API token cache write failed: {e}")
+
+    def _adopt(self, entry: Dict[str, Any]) -> str:
+        with self._lock:
+            self._local = entry
+        return entry['token']
+
+    def _acquire_refresh_lock(self) -> bool:
+        try:
+            return cache.add(self.LOCK_KEY, 1, timeout=self.LOCK_TIMEOUT)
+        except Exception:
+            # No shared lock available: refresh locally
+            return True
+
+    def _release_refresh_lock(self) -> None:
+        try:
+            cache.delete(self.LOCK_KEY)
+        except Exception:
+            pass
+
+    # ==========================================
+    # PUBLIC API
+    # ==========================================
+
+    def get_token(self, login: LoginFunc) -> Optional[str]:
+        """
+        Get a usable token, logging in only if no process has one
+
+        Returns:
+            JWT string, or None if login failed
+        """
+        entry = self._local
+        if self._usable(entry, self.EXPIRY_MARGIN):
+            self._count_local_hit()
+            return entry['token']
+
+        entry = self._read_shared()
+        if self._usable(entry, self.EXPIRY_MARGIN):
+            self.metrics.incr('shared_hits')
+            return self._adopt(entry)
+
+        return self.refresh(login)
+
+    def refresh(
+        self,
+        login: LoginFunc,
+        rejected_token: Optional[str] = None,
+        min_remaining: timedelta = EXPIRY_MARGIN
+    ) -> Optional[str]:
+        """
+        Single-flight token refresh
+
+        Args:
+            login: Performs the actual login
+            rejected_token: Token the API answered 401 to; never reused
+            min_remaining: A cached token valid for at least this long is
+                considered fresh and returned without logging in
+
+        Returns:
+            JWT string, or None if login failed
+        """
+        def fresh(entry):
+            return self._usable(entry, min_remaining) and entry['token'] != rejected_token
+
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        waited = False
+        while time.monotonic() < deadline:
+            if self._acquire_refresh_lock():
+                try:
+                    # Another process may have refreshed while we waited
+                    entry = self._read_shared()
+                    if fresh(entry):
+                        return self._adopt(entry)
+                    return self._login(login)
+                finally:
+                    self._release_refresh_lock()
+
+            if not waited:
+                self.metrics.incr('lock_waits')
+                waited = True
+            time.sleep(self.WAIT_INTERVAL)
+
+            entry = self._read_shared()
+            if fresh(entry):
+                return self._adopt(entry)
+
+        # Lock holder is stuck; do not block requests any longer
+        logger.warning("Device API token refresh lock timed out, logging in directly")
+        return self._login(login)
+
+    def _login(self, login: LoginFunc) -> Optional[str]:
+        entry = login()
+        if not entry:
+            self.metrics.incr('refresh_failures')
+            return None
+        self._publish(entry)
+        self.metrics.incr('refreshes')
+        return entry['token']
+
+    def renew_if_expiring(self, login: LoginFunc) -> bool:
+        """
+        Renew the shared token if it expires within RENEW_BEFORE
+
+        Returns:
+            True if a new token was obtained
+        """
+        entry = self._read_shared() or self._local
+        if self._usable(entry, self.RENEW_BEFORE):
+            return False
+
+        current = entry['token'] if entry else None
+        token = self.refresh(login, min_remaining=self.RENEW_BEFORE)
+        renewed = bool(token) and token != current
+        if renewed:
+            self.metrics.incr('proactive_renewals')
+        return renewed
+
+    def clear_local(self) -> None:
+        """Forget the process-local copy and pending hits (e.g. after fork or in tests)"""
+        with self._lock:
+            self._local = None
+            self._local_hits = 0
+
+
+device_token_store = DeviceTokenStore()
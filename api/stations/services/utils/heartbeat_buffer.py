@@ -0,0 +1,169 @@
+"""
+Coalesced station heartbeat writes
+Status pings record last_heartbeat/status here instead of saving the Station
+row; pending entries are written with one bulk UPDATE at most every
+IOT_HEARTBEAT_FLUSH_SECONDS, by the flush task or by the first ping after the
+interval elapses
+"""
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, DateTimeField, F, Q, Value, When
+from django.utils.dateparse import parse_datetime
+
+from api.common.utils.shared_redis import REDIS_UNAVAILABLE, decode_redis_value, redis_call
+
+
+class StationHeartbeatBuffer:
+    """
+    Pending heartbeat/status per station, keyed by station id
+
+    Entries live in a Redis hash when the default cache is django-redis (shared
+    by every web and worker process), otherwise in a process-local dict. Only
+    the latest entry per station is kept. A flushed entry is applied only if
+    it is newer than the row's last_heartbeat, so a full sync written in the
+    meantime is never overwritten.
+    """
+
+    REDIS_KEY = "stations:heartbeat_buffer"
+    FLUSH_LOCK_KEY = "stations:heartbeat_buffer:flush_lock"
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self._local: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def flush_interval(self) -> int:
+        return max(1, getattr(settings, 'IOT_HEARTBEAT_FLUSH_SECONDS', 5))
+
+    # ==========================================
+    # WRITE SIDE
+    # ==========================================
+
+    def record(self, station_id: str, status: str, heartbeat: datetime) -> None:
+        """Buffer the latest status and heartbeat for a station"""
+        entry = json.dumps({'status': status, 'last_heartbeat': heartbeat.isoformat()})
+        stored = redis_call(
+            lambda redis: redis.hset(self.REDIS_KEY, str(station_id), entry),
+            "Heartbeat buffer write failed, using local buffer"
+        )
+        if stored is not REDIS_UNAVAILABLE:
+            return
+        with self._lock:
+            self._local[str(station_id)] = entry
+
+    def flush_due(self) -> bool:
+        """
+        Claim the flush for the current interval
+
+        Returns:
+            True if this caller should flush now
+        """
+        try:
+            return cache.add(self.FLUSH_LOCK_KEY, 1, timeout=self.flush_interval)
+        except Exception:
+            return True
+
+    def _drain(self) -> Dict[str, str]:
+        def drain(redis):
+            pipe = redis.pipeline(transaction=True)
+            pipe.hgetall(self.REDIS_KEY)
+            pipe.delete(self.REDIS_KEY)
+            return pipe.execute()[0]
+
+        entries: Dict[str, str] = {}
+        raw = redis_call(drain, "Heartbeat buffer drain failed")
+        if raw is not REDIS_UNAVAILABLE:
+            entries.update({decode_redis_value(key): decode_redis_value(value) for key, value in raw.items()})
+        with self._lock:
+            entries.update(self._local)
+            self._local.clear()
+        return entries
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Write every pending entry to Station with bulk UPDATEs
+
+        Returns:
+            Dict with pending entry count and rows updated
+        """
+        from api.stations.models import Station
+
+        entries = self._drain()
+        if not entries:
+            return {'pending': 0, 'updated': 0}
+
+        items = list(entries.items())
+        updated = 0
+        for start in range(0, len(items), self.BATCH_SIZE):
+            status_whens, heartbeat_whens, ids = [], [], []
+            for station_id, raw in items[start:start + self.BATCH_SIZE]:
+                entry = json.loads(raw)
+                heartbeat = parse_datetime(entry['last_heartbeat'])
+                newer = Q(id=station_id) & (
+                    Q(last_heartbeat__isnull=True) | Q(last_heartbeat__lte=heartbeat)
+                )
+                status_whens.append(When(newer, then=Value(entry['status'])))
+                heartbeat_whens.append(When(newer, then=Value(heartbeat)))
+                ids.append(station_id)
+
+            updated += Station.objects.filter(id__in=ids).update(
+                status=Case(*status_whens, default=F('status'), output_field=CharField()),
+                last_heartbeat=Case(*heartbeat_whens, default=F('last_heartbeat'), output_field=DateTimeField()),
+            )
+
+        return {'pending': len(items), 'updated': updated}
+
+    # ==========================================
+    # READ SIDE
+    # ==========================================
+
+    def get_pending(self, station_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get not yet flushed entries for stations
+
+        Returns:
+            Dict of station id -> {'status', 'last_heartbeat'}
+        """
+        keys = [str(station_id) for station_id in station_ids]
+        if not keys:
+            return {}
+
+        raw_entries: Dict[str, Optional[str]] = {}
+        values = redis_call(lambda redis: redis.hmget(self.REDIS_KEY, keys), "Heartbeat buffer read failed")
+        if values is not REDIS_UNAVAILABLE:
+            raw_entries.update(zip(keys, values))
+        with self._lock:
+            for key in keys:
+                if key in self._local:
+                    raw_entries[key] = self._local[key]
+
+        pending = {}
+        for key, raw in raw_entries.items():
+            if raw:
+                entry = json.loads(decode_redis_value(raw))
+                entry['last_heartbeat'] = parse_datetime(entry['last_heartbeat'])
+                pending[key] = entry
+        return pending
+
+    def apply_pending(self, stations: Iterable[Any]) -> None:
+        """Overlay pending status/heartbeat onto Station instances in place"""
+        stations = list(stations)
+        pending = self.get_pending(station.id for station in stations)
+        for station in stations:
+            entry = pending.get(str(station.id))
+            if not entry:
+                continue
+            if station.last_heartbeat is None or station.last_heartbeat <= entry['last_heartbeat']:
+                station.status = entry['status']
+                station.last_heartbeat = entry['last_heartbeat']
+
+
+station_heartbeat_buffer = StationHeartbeatBuffer()
@@ -0,0 +1,267 @@
+"""
+In-process spatial index for nearby-station search
+Buckets station coordinates into a fixed lat/lng grid so radius queries only
+visit the cells that can intersect the search circle
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from api.common.utils.helpers import calculate_distances
+
+
+# Cache key shared by all workers; bumped whenever an indexed Station changes
+STATION_INDEX_VERSION_KEY = "stations:spatial_index:version"
+
+# Kilometres per degree of latitude (mean earth radius 6371 km)
+KM_PER_DEGREE = 111.195
+
+
+class StationSpatialIndex:
+    """
+    Grid-bucket index of station coordinates
+
+    Each station is stored in exactly one cell keyed by
+    (floor(lat / cell_size), floor(lng / cell_size)). A radius query converts
+    the radius into a lat/lng window, runs the haversine only for stations in
+    the overlapping cells and returns them sorted by distance.
+    """
+
+    # ~5.5 km cells keep 5-20 km map queries to a handful of buckets
+    DEFAULT_CELL_SIZE = 0.05
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._lng_cells = int(math.ceil(360 / cell_size))
+        self._cells: Dict[Tuple[int, int], Dict[Any, Dict[str, Any]]] = {}
+        self._locations: Dict[Any, Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _cell_for(self, lat: float, lng: float) -> Tuple[int, int]:
+        row = math.floor(lat / self.cell_size)
+        col = math.floor((lng + 180) / self.cell_size) % self._lng_cells
+        return row, col
+
+    def upsert(self, station: Dict[str, Any]) -> bool:
+        """
+        Insert or move a station
+
+        Args:
+            station: Dict with at least id, latitude and longitude
+
+        Returns:
+            bool: False if the coordinates are invalid (station is dropped)
+        """
+        try:
+            lat = float(station['latitude'])
+            lng = float(station['longitude'])
+        except (KeyError, ValueError, TypeError):
+            self.remove(station.get('id'))
+            return False
+
+        if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+            self.remove(station.get('id'))
+            return False
+
+        entry = dict(station)
+        entry['_lat'] = lat
+        entry['_lng'] = lng
+        cell = self._cell_for(lat, lng)
+
+        with self._lock:
+            self.remove(station['id'])
+            self._cells.setdefault(cell, {})[station['id']] = entry
+            self._locations[station['id']] = cell
+        return True
+
+    def remove(self, station_id: Any) -> None:
+        """Remove a station if present"""
+        with self._lock:
+            cell = self._locations.pop(station_id, None)
+            if cell is None:
+                return
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop(station_id, None)
+                if not bucket:
+                    del self._cells[cell]
+
+    def rebuild(self, stations: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents"""
+        with self._lock:
+            self._cells = {}
+            self._locations = {}
+            for station in stations:
+                self.upsert(station)
+
+    def _candidate_cells(self, lat: float, lng: float, radius: float) -> Iterable[Tuple[int, int]]:
+        lat_delta = radius / KM_PER_DEGREE
+        min_row = math.floor((lat - lat_delta) / self.cell_size)
+        max_row = math.floor((lat + lat_delta) / self.cell_size)
+
+        # Longitude degrees shrink towards the poles; fall back to all columns
+        # once the window wraps the whole globe
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 90)))
+        if cos_lat <= 0 or radius / (KM_PER_DEGREE * cos_lat) >= 180:
+            columns: Iterable[int] = range(self._lng_cells)
+        else:
+            lng_delta = radius / (KM_PER_DEGREE * cos_lat)
+            min_col = math.floor((lng - lng_delta + 180) / self.cell_size)
+            max_col = math.floor((lng + lng_delta + 180) / self.cell_size)
+            if max_col - min_col + 1 >= self._lng_cells:
+                columns = range(self._lng_cells)
+            else:
+                columns = [col % self._lng_cells for col in range(min_col, max_col + 1)]
+
+        columns = list(columns)
+        for row in range(min_row, max_row + 1):
+            for col in columns:
+                yield row, col
+
+    def query(self, lat: float, lng: float, radius: float) -> List[Dict[str, Any]]:
+        """
+        Get stations within radius (km) sorted by distance
+
+        Returns:
+            List of station dicts (copies) with an added 'distance' key
+        """
+        candidates = []
+        with self._lock:
+            cells = self._cells
+            if len(cells) == 0:
+                return []
+
+            for cell in self._candidate_cells(lat, lng, radius):
+                bucket = cells.get(cell)
+                if bucket:
+                    candidates.extend(bucket.values())
+
+        distances = calculate_distances(lat, lng, [(entry['_lat'], entry['_lng']) for entry in candidates])
+
+        results = []
+        for entry, distance in zip(candidates, distances):
+            if distance <= radius:
+                station = {k: v for k, v in entry.items() if not k.startswith('_')}
+                station['distance'] = round(distance, 2)
+                results.append(station)
+
+        results.sort(key=lambda x: x['distance'])
+        return results
+
+
+class StationIndexRegistry:
+    """
+    Process-local StationSpatialIndex kept in sync with the Station table
+
+    The local process applies its own Station writes incrementally (see the
+    signal handlers in api/stations/models.py). Writes from other workers bump
+    a shared version key in the cache, which makes this process rebuild on its
+    next read. A max age bounds staleness for writes that bypass signals
+    (queryset.update(), raw SQL) or when the cache is unavailable.
+    """
+
+    FIELDS = ('id', 'station_name', 'latitude', 'longitude', 'address')
+    # Fields whose change can move, rename, add or remove an indexed station
+    TRACKED_FIELDS = frozenset(FIELDS + ('status', 'is_maintenance', 'is_deleted'))
+    MAX_AGE_SECONDS = 300
+
+    def __init__(self, cell_size: float = StationSpatialIndex.DEFAULT_CELL_SIZE):
+        self.index = StationSpatialIndex(cell_size=cell_size)
+        self._version: Optional[str] = None
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_indexable(station) -> bool:
+        """Only stations shown to regular users are indexed"""
+        return (
+            station.status in ('ONLINE', 'OFFLINE')
+            and not station.is_maintenance
+            and not station.is_deleted
+        )
+
+    @staticmethod
+    def _shared_version() -> Optional[str]:
+        try:
+            return cache.get(STATION_INDEX_VERSION_KEY)
+        except Exception:
+            return None
+
+    def _is_stale(self) -> bool:
+        if self._built_at is None:
+            return True
+        if time.monotonic() - self._built_at > self.MAX_AGE_SECONDS:
+            return True
+        shared = self._shared_version()
+        return shared is not None and shared != self._version
+
+    def rebuild(self) -> None:
+        """Reload every indexable station from the database"""
+        from api.stations.models import Station
+
+        with self._lock:
+            version = self._shared_version()
+            stations = Station.objects.filter(
+                status__in=['ONLINE', 'OFFLINE'],
+                is_maintenance=False,
+                is_deleted=False
+            ).values(*self.FIELDS)
+            self.index.rebuild(stations)
+            self._version = version
+            self._built_at = time.monotonic()
+
+    def get_index(self) -> StationSpatialIndex:
+        """Return the index, rebuilding it first if it is stale"""
+        if self._is_stale():
+            self.rebuild()
+        return self.index
+
+    def apply_station_change(self, station_id: Any, snapshot: Optional[Dict[str, Any]]) -> None:
+        """
+        Apply a committed Station write to the local index and publish a new
+        version so other processes rebuild
+
+        Args:
+            station_id: Station primary key
+            snapshot: Indexed field values, or None to remove the station
+        """
+        if snapshot is None:
+            self.index.remove(station_id)
+        else:
+            self.index.upsert(snapshot)
+
+        previous = self._shared_version()
+        new_version = uuid.uuid4().hex
+        try:
+            cache.set(STATION_INDEX_VERSION_KEY, new_version, timeout=None)
+        except Exception:
+            return
+
+        # Adopt the new version only if we were already current, otherwise
+        # keep the mismatch so the next read picks up the missed writes
+        if self._built_at is not None and previous == self._version:
+            self._version = new_version
+
+
+station_index_registry = StationIndexRegistry()
+
+
+def get_station_spatial_index() -> StationSpatialIndex:
+    """
+    Get the process-wide station spatial index
+
+    Usage:
+        from api.stations.services.utils.spatial_index import get_station_spatial_index
+
+        stations = get_station_spatial_index().query(27.7172, 85.3240, 5.0)
+    """
+    return station_index_registry.get_index()
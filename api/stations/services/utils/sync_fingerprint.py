@@ -0,0 +1,120 @@
+"""
+Per-device payload fingerprints for IoT change detection
+Lets StationSyncService recognise a report identical to the last one it
+applied and skip the station/slot/powerbank reconciliation
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceFingerprintCache:
+    """
+    Cache of the last applied payload fingerprint per device
+
+    One cache entry per device holds a fingerprint for each payload kind
+    ('full', 'status') plus the station identity needed to answer a skipped
+    request. Applying a changed payload of one kind drops the fingerprints of
+    the other kinds, since it changed state they also describe.
+    """
+
+    KEY_PREFIX = "stations:sync_fingerprint"
+    # Upper bound on how long identical payloads may skip a full reconcile
+    TTL_SECONDS = 600
+
+    # Device fields that only carry liveness, not state
+    VOLATILE_DEVICE_FIELDS = ('last_heartbeat',)
+
+    @classmethod
+    def _key(cls, identifier: str) -> str:
+        return f"{cls.KEY_PREFIX}:{identifier}"
+
+    @classmethod
+    def compute(cls, kind: str, data: Dict[str, Any]) -> str:
+        """
+        Hash the state-bearing part of a payload
+
+        Slots and powerbanks are sorted so reordering alone is not a change.
+        """
+        device = {
+            key: value for key, value in (data.get('device') or {}).items()
+            if key not in cls.VOLATILE_DEVICE_FIELDS
+        }
+
+        if kind == 'full':
+            state = {
+                'device': device,
+                'station': data.get('station') or {},
+                'slots': sorted(
+                    data.get('slots') or [],
+                    key=lambda slot: str(slot.get('slot_number'))
+                ),
+                'power_banks': sorted(
+                    data.get('power_banks') or [],
+                    key=lambda pb: str(pb.get('serial_number'))
+                ),
+            }
+        else:
+            state = {'device': device}
+
+        normalized = json.dumps(state, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.blake2b(f"{kind}:{normalized}".encode('utf-8'), digest_size=16).hexdigest()
+
+    @classmethod
+    def get(cls, identifier: str, kind: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached station identity if the device last applied this exact
+        fingerprint for this payload kind
+
+        Returns:
+            Dict with station_id and serial_number, or None on a miss
+        """
+        try:
+            entry = cache.get(cls._key(identifier))
+        except Exception as e:
+            logger.warning(f"Fingerprint cache read failed for {identifier}: {e}")
+            return None
+
+        if not entry or entry.get('fingerprints', {}).get(kind) != fingerprint:
+            return None
+        return entry
+
+    @staticmethod
+    def _identifiers(station) -> list:
+        # Devices may address a station by serial number or by IMEI
+        return list({station.serial_number, station.imei} - {None, ''})
+
+    @classmethod
+    def store(cls, station, kind: str, fingerprint: str) -> None:
+        """
+        Record the fingerprint of an applied payload, replacing fingerprints of
+        other kinds
+        """
+        entry = {
+            'station_id': str(station.id),
+            'serial_number': station.serial_number,
+            'fingerprints': {kind: fingerprint},
+        }
+        try:
+            cache.set_many(
+                {cls._key(identifier): entry for identifier in cls._identifiers(station)},
+                timeout=cls.TTL_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Fingerprint cache write failed for {station.serial_number}: {e}")
+
+    @classmethod
+    def invalidate(cls, station) -> None:
+        """Force the next payload of every kind to be fully applied"""
+        try:
+            cache.delete_many([cls._key(identifier) for identifier in cls._identifiers(station)])
+        except Exception as e:
+            logger.warning(f"Fingerprint cache invalidation failed for {station.serial_number}: {e}")
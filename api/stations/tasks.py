@@ -9,6 +9,7 @@ from django.utils import timezone
 
 from api.common.tasks.base import BaseTask
 from api.stations.models import PowerBank, Station, StationSlot
+from api.stations.services.utils.heartbeat_buffer import station_heartbeat_buffer
 
 User = get_user_model()
 
@@ -25,6 +26,9 @@ def check_offline_stations(self):
         dict: Number of stations marked offline
     """
     try:
+        # Buffered pings must land first or their stations look silent
+        station_heartbeat_buffer.flush()
+
         # Consider stations offline if no heartbeat for 10 minutes
         cutoff_time = timezone.now() - timezone.timedelta(minutes=10)
 
@@ -43,6 +47,98 @@ def check_offline_stations(self):
         raise
 
 
+@shared_task(base=BaseTask, bind=True)
+def flush_station_heartbeats(self):
+    """
+    Write buffered station status pings to the Station table.
+
+    SCHEDULED: Runs every IOT_HEARTBEAT_FLUSH_SECONDS via Celery Beat.
+    Status pings are coalesced by StationHeartbeatBuffer; this bounds how
+    stale last_heartbeat/status can get when pings are sparse.
+
+    Returns:
+        dict: Pending entries drained and rows updated
+    """
+    try:
+        result = station_heartbeat_buffer.flush()
+        if result["pending"]:
+            self.logger.info(
+                f"Flushed {result['pending']} station heartbeats ({result['updated']} rows updated)"
+            )
+        return result
+
+    except Exception as e:
+        self.logger.error(f"Failed to flush station heartbeats: {str(e)}")
+        raise
+
+
+@shared_task(base=BaseTask, bind=True)
+def refresh_device_api_token(self):
+    """
+    Renew the shared Device API token before it expires.
+
+    SCHEDULED: Runs every 15 minutes via Celery Beat.
+    Requests then almost never have to log in on the popup path.
+
+    Returns:
+        dict: Whether the token was renewed and current token metrics
+    """
+    from api.stations.services.device_api_service import get_device_api_service
+    from api.stations.services.utils.device_token_store import device_token_store
+
+    try:
+        renewed = get_device_api_service().renew_token_if_expiring()
+        if renewed:
+            self.logger.info("Device API token renewed ahead of expiry")
+        return {"renewed": renewed, "metrics": device_token_store.get_metrics()}
+
+    except Exception as e:
+        self.logger.error(f"Failed to renew Device API token: {str(e)}")
+        raise
+
+
+@shared_task(base=BaseTask, bind=True)
+def bulk_check_devices(self, device_names=None, command=None):
+    """
+    Check (or send a raw command to) many devices concurrently.
+
+    QUEUED: Enqueued by the admin bulk device endpoint; can also be run for
+    a fleet-wide health check with no arguments.
+
+    Args:
+        device_names: Device serial numbers; defaults to every online station
+        command: Raw command to send instead of a status check
+
+    Returns:
+        dict: Aggregated DeviceAPIService bulk summary
+    """
+    from api.stations.services.device_api_service import get_device_api_service
+
+    try:
+        if not device_names:
+            device_names = list(
+                Station.objects.filter(is_deleted=False, status="ONLINE")
+                .values_list("serial_number", flat=True)
+            )
+        if not device_names:
+            return {"total": 0, "succeeded": 0, "failed": 0, "results": {}}
+
+        service = get_device_api_service()
+        if command:
+            summary = service.send_commands(device_names, command)
+        else:
+            summary = service.check_devices(device_names)
+
+        self.logger.info(
+            f"Bulk {summary['operation']}: {summary['succeeded']}/{summary['total']} devices succeeded"
+        )
+        return summary
+
+    except Exception as e:
+        self.logger.error(f"Bulk device operation failed: {str(e)}")
+        raise
+
+
 @shared_task(base=BaseTask, bind=True)
 def optimize_power_bank_distribution(self):
     """
@@ -175,3 +271,34 @@ def update_station_popularity_score(self):
     except Exception as e:
         self.logger.error(f"Failed to update station popularity: {str(e)}")
         raise
+
+
+@shared_task(base=BaseTask, bind=True, max_retries=3)
+def process_station_data(self, data: Dict[str, Any]):
+    """
+    Apply a queued IoT station payload (type=full, returned or status).
+
+    QUEUED: Enqueued by StationDataInternalView when IOT_INGEST_ASYNC is on,
+    onto the iot_ingest_<n> queue for the device's partition.
+
+    Returns:
+        dict: StationSyncService result, or a skip marker for stale reports
+    """
+    from api.stations.services.station_ingest_service import StationIngestService
+
+    service = StationIngestService()
+    try:
+        return service.process(data)
+
+    except Exception as e:
+        if not service.is_retryable(e):
+            # Invalid payloads will not succeed on retry
+            self.logger.error(f"Rejected queued IoT payload: {str(e)}")
+            service.release(data)
+            raise
+        if self.request.retries < self.max_retries:
+            self.logger.warning(f"Queued IoT payload failed, retrying: {str(e)}")
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        self.logger.error(f"Queued IoT payload failed permanently: {str(e)}")
+        service.release(data)
+        raise
@@ -124,18 +124,19 @@ class NearbyStationsView(GenericAPIView, BaseAPIView):
                 radius=min(input_serializer.validated_data['radius'], 20.0)  # Max 20km
             )
             
-            # Get full station objects
-            station_ids = [station['id'] for station in nearby_stations]
-            stations = Station.objects.filter(id__in=station_ids).prefetch_related(
+            # Get full station objects, keeping the distance order from the search
+            station_distances = {station['id']: station['distance'] for station in nearby_stations}
+            stations = Station.objects.filter(id__in=list(station_distances)).prefetch_related(
                 'slots',
                 'media__media_upload'
             )
+            stations = sorted(stations, key=lambda station: station_distances[station.id])
             
-            # Serialize results
+            # Serialize results (distances already computed by the search are reused)
             serializer = serializers.StationListSerializer(
                 stations, 
                 many=True, 
-                context={'request': request}
+                context={'request': request, 'station_distances': station_distances}
             )
             
             return {
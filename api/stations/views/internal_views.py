@@ -9,6 +9,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from api.users.permissions import IsStaffPermission
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiParameter
@@ -17,6 +18,7 @@ from drf_spectacular.types import OpenApiTypes
 from api.common.mixins import BaseAPIView
 from api.common.decorators import log_api_call
 from api.stations.services.station_sync_service import StationSyncService
+from api.stations.services.station_ingest_service import StationIngestService
 from api.stations.services.utils.sign_chargeghar_main import get_signature_util
 from api.common.services.base import ServiceException
 
@@ -33,6 +35,9 @@ class StationDataInternalView(APIView, BaseAPIView):
     - type=full: Complete station synchronization (device upload)
     - type=returned: PowerBank return event notification
     - type=status: Device status change (online/offline)
+    
+    With IOT_INGEST_ASYNC enabled, signed payloads are queued per device and
+    acknowledged with 202 instead of being applied in the request.
     """
     
     permission_classes = [ IsStaffPermission ]
@@ -76,6 +81,24 @@ class StationDataInternalView(APIView, BaseAPIView):
             }
         },
         responses={
+            202: {
+                'type': 'object',
+                'properties': {
+                    'success': {'type': 'boolean'},
+                    'message': {'type': 'string'},
+                    'data': {
+                        'type': 'object',
+                        'properties': {
+                            'queued': {'type': 'boolean'},
+                            'duplicate': {'type': 'boolean'},
+                            'device': {'type': 'string'},
+                            'type': {'type': 'string'},
+                            'queue': {'type': 'string'},
+                            'task_id': {'type': 'string'}
+                        }
+                    }
+                }
+            },
             200: {
                 'type': 'object',
                 'properties': {
@@ -113,6 +136,9 @@ class StationDataInternalView(APIView, BaseAPIView):
     @log_api_call()
     def post(self, request):
         """Process incoming station data from IoT system"""
+        if getattr(settings, 'IOT_INGEST_ASYNC', False):
+            return self._enqueue(request)
+        
         def operation():
             # Validate signature first
             self._validate_request_signature(request)
@@ -141,6 +167,19 @@ class StationDataInternalView(APIView, BaseAPIView):
             error_message="Failed to process IoT data"
         )
     
+    def _enqueue(self, request):
+        """Validate signature and queue the payload for the ingest workers"""
+        def operation():
+            self._validate_request_signature(request)
+            return StationIngestService().enqueue(request.data)
+        
+        return self.handle_service_operation(
+            operation,
+            success_message="IoT data accepted for processing",
+            error_message="Failed to queue IoT data",
+            success_status=status.HTTP_202_ACCEPTED
+        )
+    
     def _validate_request_signature(self, request):
         """Validate HMAC signature from IoT system"""
     
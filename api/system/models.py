@@ -105,6 +105,7 @@ def clear_appconfig_cache_on_save(sender, instance, **kwargs):
     """
     cache_key = f"app_config_{instance.key}"
     cache.delete(cache_key)
+    _invalidate_appconfig_snapshot()
 
 
 @receiver(post_delete, sender=AppConfig)
@@ -114,3 +115,11 @@ def clear_appconfig_cache_on_delete(sender, instance, **kwargs):
     """
     cache_key = f"app_config_{instance.key}"
     cache.delete(cache_key)
+    _invalidate_appconfig_snapshot()
+
+
+def _invalidate_appconfig_snapshot():
+    """Reload the AppConfig snapshot after a config row is saved or deleted"""
+    from api.system.services.app_config_snapshot import app_config_snapshot
+    
+    app_config_snapshot.invalidate_on_commit()
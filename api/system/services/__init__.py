@@ -12,6 +12,7 @@ from __future__ import annotations
 
 from .country_service import CountryService
 from .app_config_service import AppConfigService
+from .app_config_snapshot import AppConfigSnapshot, app_config_snapshot
 from .app_version_service import AppVersionService
 from .app_update_service import AppUpdateService
 from .app_health_service import AppHealthService
@@ -19,6 +20,8 @@ from .app_health_service import AppHealthService
 # Backward compatibility - all services available at package level
 __all__ = [
     "AppConfigService",
+    "AppConfigSnapshot",
+    "app_config_snapshot",
     "AppHealthService",
     "AppUpdateService",
     "AppVersionService",
@@ -0,0 +1,65 @@
+"""
+In-process snapshot of active AppConfig rows
+============================================================
+
+Hot paths (rental start/return/cancel/extend) read configuration from memory
+instead of querying app_configs on every request. All active rows are loaded
+with one query; the snapshot is reloaded when the shared version key changes
+(bumped by the AppConfig post_save/post_delete receivers) or after MAX_AGE.
+"""
+from __future__ import annotations
+
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict
+
+from api.common.utils.versioned_snapshot import VersionedSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+class AppConfigSnapshot(VersionedSnapshot):
+    """Typed, process-local view of active AppConfig values"""
+
+    VERSION_KEY = "app_config_snapshot_version"
+    LABEL = "AppConfig"
+
+    def _build(self) -> Dict[str, str]:
+        from api.system.models import AppConfig
+
+        return dict(AppConfig.objects.filter(is_active=True).values_list('key', 'value'))
+
+    # ==========================================
+    # TYPED ACCESSORS
+    # ==========================================
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Raw string value, or default when missing/inactive/empty"""
+        value = self._data().get(key)
+        return value if value not in (None, '') else default
+
+    def get_int(self, key: str, default: int) -> int:
+        value = self.get(key)
+        try:
+            return int(value) if value is not None else default
+        except (TypeError, ValueError):
+            logger.warning(f"AppConfig {key}={value!r} is not an integer, using {default}")
+            return default
+
+    def get_decimal(self, key: str, default: Decimal) -> Decimal:
+        value = self.get(key)
+        try:
+            return Decimal(value) if value is not None else default
+        except (InvalidOperation, TypeError):
+            logger.warning(f"AppConfig {key}={value!r} is not a decimal, using {default}")
+            return default
+
+    def get_bool(self, key: str, default: bool) -> bool:
+        value = self.get(key)
+        if value is None:
+            return default
+        return str(value).strip().lower() in ('true', '1', 'yes', 'on')
+
+
+app_config_snapshot = AppConfigSnapshot()
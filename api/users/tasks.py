@@ -5,6 +5,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 from api.common.tasks.base import BaseTask, NotificationTask
+from api.common.tasks.retention import run_retention
 from api.users.models import UserAuditLog
 
 User = get_user_model()
@@ -23,12 +24,12 @@ def cleanup_expired_audit_logs(self):
     """
     try:
         cutoff_date = timezone.now() - timezone.timedelta(days=365)
-        deleted_count, _ = UserAuditLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()
+        result = run_retention(
+            "user_audit_logs", UserAuditLog.objects.filter(created_at__lt=cutoff_date)
+        )
 
-        self.logger.info(f"Cleaned up {deleted_count} expired audit logs")
-        return {"deleted_count": deleted_count}
+        self.logger.info(f"Cleaned up {result['deleted_count']} expired audit logs")
+        return result
 
     except Exception as e:
         self.logger.error(f"Failed to cleanup audit logs: {str(e)}")
@@ -10,6 +10,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.config.settings")
 import django
 django.setup()
 
+from django.conf import settings
+
 from api.config import celery as config
 
 app = Celery("main")
@@ -59,19 +61,31 @@ app.conf.task_routes = {
 # Configure periodic tasks
 app.conf.beat_schedule = {
     # Critical system tasks (every minute)
-    "check-overdue-rentals": {
-        "task": "api.rentals.tasks.check_overdue_rentals",
-        "schedule": 60.0,  # Every 1 minute (increased frequency for real-time updates)
+    "dispatch-rental-deadlines": {
+        "task": "api.rentals.tasks.dispatch_rental_deadlines",
+        "schedule": 30.0,  # Every 30 seconds (pops only due reminder/overdue/abandoned events)
     },
     "check-offline-stations": {
         "task": "api.stations.tasks.check_offline_stations",
         "schedule": 300.0,  # Every 5 minutes
     },
-    # Important tasks (every 15 minutes)
-    "send-rental-reminders": {
-        "task": "api.rentals.tasks.send_rental_reminders",
+    "refresh-device-api-token": {
+        "task": "api.stations.tasks.refresh_device_api_token",
         "schedule": 900.0,  # Every 15 minutes
     },
+    "flush-station-heartbeats": {
+        "task": "api.stations.tasks.flush_station_heartbeats",
+        "schedule": float(settings.IOT_HEARTBEAT_FLUSH_SECONDS),  # Every few seconds
+    },
+    "flush-rental-locations": {
+        "task": "api.rentals.tasks.flush_rental_locations",
+        "schedule": float(settings.RENTAL_LOCATION_FLUSH_SECONDS),  # Every few seconds
+    },
+    # Important tasks (every 15 minutes)
+    "sync-rental-deadlines": {
+        "task": "api.rentals.tasks.sync_rental_deadlines",
+        "schedule": 600.0,  # Every 10 minutes
+    },
     "expire-payment-intents": {
         "task": "api.payments.tasks.expire_payment_intents",
         "schedule": 900.0,  # Every 15 minutes
@@ -94,10 +108,6 @@ app.conf.beat_schedule = {
         "task": "api.users.tasks.cleanup_expired_audit_logs",
         "schedule": 86400.0,  # Daily
     },
-    "auto-complete-abandoned-rentals": {
-        "task": "api.rentals.tasks.auto_complete_abandoned_rentals",
-        "schedule": 86400.0,  # Daily
-    },
     "detect-rental-anomalies": {
         "task": "api.rentals.tasks.detect_rental_anomalies",
         "schedule": 86400.0,  # Daily
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: set-based overdue transition vs per-row saves
+
+Creates N past-due ACTIVE rentals and times RentalOverdueService.mark_overdue()
+against the previous check_overdue_rentals loop (one save() per rental). Also
+reports the query count for loading one notification batch. Fixtures are
+created inside a transaction that is rolled back after each run.
+
+Usage: python tests/load/benchmark_overdue_rentals.py [--rentals 50000] [--users 1000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.config.settings')
+
+import django
+django.setup()
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.rentals.models import Rental, RentalPackage
+from api.rentals.services import RentalOverdueService
+from api.stations.models import PowerBank, Station, StationSlot
+from api.users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_fixtures(rental_count, user_count):
+    now = timezone.now()
+    users = User.objects.bulk_create([
+        User(email=f'overdue-bench-{i}@example.com', username=f'overdue_bench_{i}')
+        for i in range(user_count)
+    ])
+    station = Station.objects.create(
+        station_name='Overdue Bench', serial_number='OVERDUE-BENCH', imei='OVERDUE-BENCH',
+        latitude=27.7, longitude=85.3, address='Benchmark', total_slots=1
+    )
+    slot = StationSlot.objects.create(station=station, slot_number=1)
+    package = RentalPackage.objects.create(
+        name='Bench', description='Benchmark', duration_minutes=60, price=50,
+        package_type='HOURLY', payment_model='PREPAID'
+    )
+    power_banks = PowerBank.objects.bulk_create([
+        PowerBank(serial_number=f'OB{i:07d}', model='Bench', capacity_mah=10000, status='RENTED')
+        for i in range(rental_count)
+    ], batch_size=5000)
+    Rental.objects.bulk_create([
+        Rental(
+            user=users[i % user_count], station=station, slot=slot, package=package,
+            power_bank=power_banks[i], rental_code=f'OB{i:08d}', status='ACTIVE',
+            started_at=now - timedelta(hours=3), due_at=now - timedelta(hours=2),
+        )
+        for i in range(rental_count)
+    ], batch_size=5000)
+
+
+def legacy_loop():
+    """Previous check_overdue_rentals transition (notifications excluded)"""
+    updated_count = 0
+    for rental in Rental.objects.filter(status='ACTIVE', due_at__lt=timezone.now()):
+        rental.status = 'OVERDUE'
+        rental.save(update_fields=['status', 'updated_at'])
+        updated_count += 1
+    return updated_count
+
+
+def set_based():
+    service = RentalOverdueService()
+    rental_ids = service.mark_overdue()
+    batches = service.batch_ids(rental_ids)
+
+    # Load one notification batch the way send_overdue_notifications does
+    with CaptureQueriesContext(connection) as context:
+        list(
+            Rental.objects.filter(id__in=batches[0] if batches else [])
+            .select_related('user', 'power_bank')
+        )
+    return len(rental_ids), len(batches), len(context.captured_queries)
+
+
+def run(label, func, args):
+    try:
+        with transaction.atomic():
+            create_fixtures(args.rentals, args.users)
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as context:
+                result = func()
+            elapsed = time.perf_counter() - started
+            raise Rollback((result, elapsed, len(context.captured_queries)))
+    except Rollback as done:
+        result, elapsed, queries = done.args[0]
+    print(f"{label:<12} {elapsed:>9.2f}s {queries:>9} queries  result={result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rentals', type=int, default=50_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only run the set-based transition')
+    args = parser.parse_args()
+
+    print(f"{args.rentals} past-due rentals across {args.users} users ({connection.vendor})\n")
+    if not args.skip_legacy:
+        run('per-row', legacy_loop, args)
+    # result = (transitioned, notification batches, queries to load one batch)
+    run('set-based', set_based, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: grid spatial index vs full scan for nearby-station search
+
+Compares StationSpatialIndex.query() with the previous implementation of
+StationService._get_nearby_stations (haversine over every station row) on
+synthetic stations spread around Nepal.
+
+Usage: python tests/load/benchmark_station_index.py [--queries 200] [--radius 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from decimal import Decimal
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.config.settings')
+
+import django
+django.setup()
+
+from api.common.utils.helpers import calculate_distance
+from api.stations.services.utils.spatial_index import StationSpatialIndex
+
+# Rough bounding box of Nepal
+LAT_RANGE = (26.35, 30.45)
+LNG_RANGE = (80.05, 88.20)
+STATION_COUNTS = (1_000, 10_000, 100_000)
+
+
+def make_stations(count, rng):
+    """Generate station rows shaped like Station.objects.values(...)"""
+    return [
+        {
+            'id': uuid.uuid4(),
+            'station_name': f'Station {i}',
+            'latitude': Decimal(f'{rng.uniform(*LAT_RANGE):.6f}'),
+            'longitude': Decimal(f'{rng.uniform(*LNG_RANGE):.6f}'),
+            'address': 'Benchmark',
+        }
+        for i in range(count)
+    ]
+
+
+def full_scan(stations, lat, lng, radius):
+    """Previous _get_nearby_stations loop"""
+    nearby_stations = []
+    for row in stations:
+        station = dict(row)
+        distance = calculate_distance(lat, lng, float(station['latitude']), float(station['longitude']))
+        if distance <= radius:
+            station['distance'] = round(distance, 2)
+            nearby_stations.append(station)
+    nearby_stations.sort(key=lambda x: x['distance'])
+    return nearby_stations
+
+
+def time_queries(func, points, radius):
+    started = time.perf_counter()
+    results = [func(lat, lng, radius) for lat, lng in points]
+    return (time.perf_counter() - started) / len(points), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+
+    print(f"Radius {args.radius} km, {args.queries} queries per run\n")
+    print(f"{'stations':>10} {'build ms':>10} {'scan ms/q':>11} {'index ms/q':>11} {'speedup':>9}")
+
+    for count in STATION_COUNTS:
+        stations = make_stations(count, rng)
+
+        index = StationSpatialIndex()
+        started = time.perf_counter()
+        index.rebuild(stations)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        scan_time, scan_results = time_queries(lambda a, b, r: full_scan(stations, a, b, r), points, args.radius)
+        index_time, index_results = time_queries(index.query, points, args.radius)
+
+        for expected, actual in zip(scan_results, index_results):
+            same_ids = {s['id'] for s in expected} == {s['id'] for s in actual}
+            same_order = [s['distance'] for s in expected] == [s['distance'] for s in actual]
+            if not (same_ids and same_order):
+                print(f"❌ Result mismatch at {count} stations")
+                return 1
+
+        print(
+            f"{count:>10,} {build_ms:>10.1f} {scan_time * 1000:>11.3f} "
+            f"{index_time * 1000:>11.3f} {scan_time / index_time:>8.1f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
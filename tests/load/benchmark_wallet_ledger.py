@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: atomic wallet ledger vs read-modify-write balance updates
+
+T threads each apply N alternating top-ups and deductions to the SAME wallet
+(the worst case: a top-up callback racing rental payments). Compares:
+
+  unlocked   previous add_balance/deduct_balance (read balance, save())
+  locked     the same with select_for_update (correct, serialized per request)
+  ledger     WalletService.add_balance/deduct_balance (conditional UPDATE)
+  batched    WalletService.apply_ledger_entries, --batch entries per call
+
+and reports operations per second and balance drift (expected minus actual
+final balance; non-zero means lost updates). Run against PostgreSQL: SQLite
+serializes writers, so its numbers say nothing about row contention. Fixtures
+are committed (threads need to see them) and deleted afterwards.
+
+Usage: python tests/load/benchmark_wallet_ledger.py [--threads 16] [--ops 200] [--batch 20]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.config.settings')
+
+import django
+django.setup()
+
+from django.db import connection, connections, transaction
+
+from api.payments.models import Wallet, WalletTransaction
+from api.payments.services import WalletService
+from api.users.models import User
+
+AMOUNT = Decimal('1.00')
+OPENING_BALANCE = Decimal('1000000.00')
+
+
+def legacy_apply(user, transaction_type, lock):
+    """Previous WalletService.add_balance/deduct_balance body"""
+    with transaction.atomic():
+        wallets = Wallet.objects.select_for_update() if lock else Wallet.objects
+        wallet = wallets.get(user=user)
+        balance_before = wallet.balance
+        if transaction_type == 'CREDIT':
+            wallet.balance += AMOUNT
+        else:
+            if wallet.balance < AMOUNT:
+                raise ValueError("Insufficient wallet balance")
+            wallet.balance -= AMOUNT
+        wallet.save(update_fields=['balance', 'updated_at'])
+        WalletTransaction.objects.create(
+            wallet=wallet, transaction_type=transaction_type, amount=AMOUNT,
+            balance_before=balance_before, balance_after=wallet.balance, description='benchmark'
+        )
+
+
+def worker(mode, user, wallet_id, ops, batch, barrier, errors):
+    service = WalletService()
+    try:
+        barrier.wait()
+        if mode == 'batched':
+            for start in range(0, ops, batch):
+                service.apply_ledger_entries([
+                    {
+                        'wallet_id': wallet_id, 'amount': AMOUNT, 'description': 'benchmark',
+                        'transaction_type': 'CREDIT' if i % 2 else 'DEBIT',
+                    }
+                    for i in range(start, min(start + batch, ops))
+                ])
+            return
+        for i in range(ops):
+            transaction_type = 'CREDIT' if i % 2 else 'DEBIT'
+            if mode == 'ledger':
+                if transaction_type == 'CREDIT':
+                    service.add_balance(user, AMOUNT, 'benchmark')
+                else:
+                    service.deduct_balance(user, AMOUNT, 'benchmark')
+            else:
+                legacy_apply(user, transaction_type, lock=(mode == 'locked'))
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        connections.close_all()
+
+
+def run(mode, args):
+    user = User.objects.create_user(email=f'ledger-bench-{mode}@example.com', username=f'ledger_bench_{mode}')
+    wallet = Wallet.objects.create(user=user, balance=OPENING_BALANCE)
+    try:
+        barrier = threading.Barrier(args.threads)
+        errors = []
+        threads = [
+            threading.Thread(target=worker, args=(mode, user, wallet.id, args.ops, args.batch, barrier, errors))
+            for _ in range(args.threads)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        total_ops = args.threads * args.ops
+        credits = args.threads * (args.ops // 2)
+        expected = OPENING_BALANCE + credits * AMOUNT - (total_ops - credits) * AMOUNT
+        actual = Wallet.objects.values_list('balance', flat=True).get(id=wallet.id)
+        print(
+            f"{mode:<10} {elapsed:>8.2f}s {total_ops / elapsed:>10.0f} ops/s  "
+            f"drift={expected - actual}  errors={len(errors)}"
+        )
+    finally:
+        user.delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=200, help='Operations per thread')
+    parser.add_argument('--batch', type=int, default=20, help='Entries per apply_ledger_entries call')
+    parser.add_argument('--modes', default='unlocked,locked,ledger,batched')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.ops} ops on one wallet ({connection.vendor})\n")
+    for mode in args.modes.split(','):
+        run(mode, args)
+
+
+if __name__ == '__main__':
+    main()
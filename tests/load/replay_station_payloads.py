@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Load driver: replay IoT station payloads against the internal data endpoint
+
+Reads recorded payloads (one JSON object per line, as posted by the IoT
+system) or generates synthetic type=full/status payloads, signs each one the
+way the Java system does (HMAC-SHA256 over body + timestamp) and POSTs them
+concurrently. Reports throughput, latency percentiles and status codes.
+
+Run the API with IOT_INGEST_ASYNC=true to measure queued ingestion, or
+without it to measure inline processing.
+
+Usage:
+    python tests/load/replay_station_payloads.py --token <staff JWT> --file payloads.jsonl
+    python tests/load/replay_station_payloads.py --token <staff JWT> --generate 2000 --devices 50
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_URL = 'http://localhost:8010/api/internal/stations/data'
+DEFAULT_SECRET = os.environ.get('IOT_SYSTEM_SIGNATURE_SECRET', 'ChargeGhar-SystemSecret-TrustKey2025!')
+
+
+def sign(secret, body, timestamp):
+    """Base64 HMAC-SHA256 of body + timestamp (matches SignChargeGharMain)"""
+    digest = hmac.new(secret.encode('utf-8'), f"{body}{timestamp}".encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8')
+
+
+def load_payloads(path):
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def generate_payloads(count, devices, slots, rng):
+    """Synthetic full syncs and status changes for a fixed set of devices"""
+    base_ts = int(time.time())
+    payloads = []
+    for i in range(count):
+        serial = f'LOADTEST{rng.randrange(devices):05d}'
+        if rng.random() < 0.8:
+            payloads.append({
+                'type': 'full',
+                'timestamp': base_ts + i,
+                'device': {'serial_number': serial, 'imei': serial, 'status': 'ONLINE'},
+                'station': {'total_slots': slots},
+                'slots': [
+                    {
+                        'slot_number': n,
+                        'status': 'OCCUPIED',
+                        'battery_level': rng.randint(10, 100),
+                        'power_bank_serial': f'{serial}-PB{n}',
+                    }
+                    for n in range(1, slots + 1)
+                ],
+                'power_banks': [
+                    {
+                        'serial_number': f'{serial}-PB{n}',
+                        'status': 'AVAILABLE',
+                        'battery_level': rng.randint(10, 100),
+                        'current_slot': n,
+                    }
+                    for n in range(1, slots + 1)
+                ],
+            })
+        else:
+            payloads.append({
+                'type': 'status',
+                'timestamp': base_ts + i,
+                'device': {'serial_number': serial, 'status': rng.choice(['ONLINE', 'OFFLINE'])},
+            })
+    return payloads
+
+
+def post_payload(session, url, token, secret, payload):
+    body = json.dumps(payload, separators=(',', ':'))
+    timestamp = int(time.time())
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {token}',
+        'X-Signature': sign(secret, body, timestamp),
+        'X-Timestamp': str(timestamp),
+    }
+    start = time.perf_counter()
+    try:
+        response = session.post(url, data=body, headers=headers, timeout=30)
+        code = response.status_code
+    except requests.RequestException as e:
+        code = type(e).__name__
+    return code, (time.perf_counter() - start) * 1000
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--token', required=True, help='Staff access token')
+    parser.add_argument('--secret', default=DEFAULT_SECRET)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--file', help='JSONL file of recorded payloads')
+    source.add_argument('--generate', type=int, help='Number of synthetic payloads')
+    parser.add_argument('--devices', type=int, default=50)
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.file:
+        payloads = load_payloads(args.file)
+    else:
+        payloads = generate_payloads(args.generate, args.devices, args.slots, random.Random(args.seed))
+
+    if not payloads:
+        print('No payloads to replay')
+        return 1
+
+    print(f"Replaying {len(payloads)} payloads against {args.url} with {args.concurrency} workers")
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda payload: post_payload(session, args.url, args.token, args.secret, payload),
+            payloads
+        ))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(code for code, _ in results)
+    latencies = sorted(latency for _, latency in results)
+
+    print(f"\nCompleted in {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s)")
+    print(f"Latency ms: mean={statistics.mean(latencies):.1f} "
+          f"p50={percentile(latencies, 50):.1f} "
+          f"p95={percentile(latencies, 95):.1f} "
+          f"p99={percentile(latencies, 99):.1f} "
+          f"max={latencies[-1]:.1f}")
+    print('Status codes:')
+    for code, count in sorted(statuses.items(), key=lambda item: str(item[0])):
+        print(f"  {code}: {count}")
+
+    return 0 if all(code in (200, 202) for code in statuses) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Tests for admin bulk device checks and commands
+"""
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import TestCase
+
+from api.admin.serializers import BulkDeviceOperationSerializer
+from api.admin.services.admin_station_service import AdminStationService
+from api.common.services.base import ServiceException
+from tests.unit.fixtures import create_station, create_user
+
+
+@mock.patch('api.stations.tasks.bulk_check_devices.delay', return_value=mock.Mock(id='task-1'))
+@mock.patch('api.stations.services.device_api_service.get_device_api_service')
+class BulkDeviceOperationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('bulk-admin')
+        create_station('Bulk', serial_number='BULK01', imei='BULK01', status='ONLINE')
+
+    def setUp(self):
+        self.service = AdminStationService()
+
+    def test_command_requires_explicit_devices(self, get_service, delay):
+        with self.assertRaises(ServiceException) as raised:
+            self.service.run_bulk_device_operation([], 'popup', False, self.admin)
+
+        self.assertEqual(raised.exception.get_codes(), 'device_names_required')
+        get_service.return_value.send_commands.assert_not_called()
+        delay.assert_not_called()
+        self.assertFalse(BulkDeviceOperationSerializer(data={'command': 'reboot'}).is_valid())
+
+    def test_empty_device_list_checks_online_stations(self, get_service, delay):
+        get_service.return_value.bulk_max_workers = 16
+        self.service.run_bulk_device_operation([], '', False, self.admin)
+        get_service.return_value.check_devices.assert_called_once_with(['BULK01'])
+
+    def test_more_than_one_round_is_queued(self, get_service, delay):
+        get_service.return_value.bulk_max_workers = 2
+        devices = ['CG001', 'CG002', 'CG003']
+
+        result = self.service.run_bulk_device_operation(devices, 'check', False, self.admin)
+
+        self.assertTrue(result['queued'])
+        delay.assert_called_once_with(device_names=devices, command='check')
+        get_service.return_value.send_commands.assert_not_called()
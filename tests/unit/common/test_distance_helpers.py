@@ -0,0 +1,44 @@
+"""
+Tests for the haversine distance helpers
+"""
+from __future__ import annotations
+
+import random
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from api.common.utils.helpers import calculate_distance, calculate_distances
+
+
+class CalculateDistancesTestCase(SimpleTestCase):
+    """calculate_distances must agree with calculate_distance point for point"""
+
+    ORIGIN = (27.7172, 85.3240)  # Kathmandu
+
+    def test_matches_calculate_distance(self):
+        rng = random.Random(42)
+        points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(500)]
+        points += [
+            self.ORIGIN,                                   # zero distance
+            (-27.7172, -94.6760),                          # antipode
+            (90.0, 0.0), (-90.0, 0.0),                     # poles
+            (27.7172, -179.9999), (27.7172, 179.9999),     # antimeridian
+        ]
+
+        distances = calculate_distances(*self.ORIGIN, points)
+
+        self.assertEqual(len(distances), len(points))
+        for (lat, lng), distance in zip(points, distances):
+            self.assertAlmostEqual(distance, calculate_distance(*self.ORIGIN, lat, lng), places=9)
+
+    def test_accepts_decimal_coordinates(self):
+        points = [(Decimal('27.718000'), Decimal('85.325000')), (Decimal('28.209500'), Decimal('83.985600'))]
+
+        self.assertEqual(
+            calculate_distances(*self.ORIGIN, points),
+            [calculate_distance(*self.ORIGIN, float(lat), float(lng)) for lat, lng in points]
+        )
+
+    def test_empty(self):
+        self.assertEqual(calculate_distances(*self.ORIGIN, []), [])
@@ -0,0 +1,58 @@
+"""
+Tests for the chunked retention engine
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.common.tasks.retention import ChunkedRetention
+from api.notifications.models import Notification
+from api.users.models import User
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ChunkedRetentionTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email='retention@example.com', username='retention')
+        Notification.objects.bulk_create([
+            Notification(
+                user=user, title=f'N{i}', message='m', notification_type='system',
+                channel='in_app', is_read=i % 5 != 0
+            )
+            for i in range(25)
+        ])
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=120))
+
+    def setUp(self):
+        cache.clear()
+        self.old_read = Notification.objects.filter(
+            is_read=True, created_at__lt=timezone.now() - timedelta(days=90)
+        )
+
+    def test_deletes_matching_rows_in_batches(self):
+        result = ChunkedRetention('test_notifications', self.old_read, batch_size=6, pause=0).run()
+
+        self.assertEqual(result['deleted_count'], 20)
+        self.assertEqual(result['batches'], 4)
+        self.assertTrue(result['completed'])
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertFalse(Notification.objects.filter(is_read=True).exists())
+        self.assertIsNone(cache.get('retention:checkpoint:test_notifications'))
+
+    def test_stopped_run_resumes_from_checkpoint(self):
+        sixth_pk = list(self.old_read.order_by('pk').values_list('pk', flat=True))[5]
+        first = ChunkedRetention('test_notifications', self.old_read, batch_size=6, pause=0, max_seconds=0).run()
+
+        self.assertEqual((first['deleted_count'], first['batches'], first['completed']), (6, 1, False))
+        self.assertEqual(cache.get('retention:checkpoint:test_notifications'), str(sixth_pk))
+
+        second = ChunkedRetention('test_notifications', self.old_read, batch_size=6, pause=0).run()
+        self.assertEqual(second['deleted_count'], 14)
+        self.assertTrue(second['completed'])
+        self.assertEqual(Notification.objects.count(), 5)
@@ -0,0 +1,90 @@
+"""
+Shared model fixtures for the unit tests
+Users, stations, packages and rentals filled with the field values every
+test needs but no test is about
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Optional
+
+from api.rentals.models import Rental, RentalPackage
+from api.stations.models import PowerBank, Station, StationSlot
+from api.users.models import User
+
+
+def create_user(name: str, **extra: Any) -> User:
+    return User.objects.create_user(email=f'{name}@example.com', username=name, **extra)
+
+
+def create_station(name: str, **extra: Any) -> Station:
+    """Station in Kathmandu with serial number and IMEI derived from name"""
+    code = name.upper().replace(' ', '')
+    fields = {
+        'serial_number': code, 'imei': code, 'latitude': 27.7, 'longitude': 85.3,
+        'address': 'Kathmandu', 'total_slots': 4,
+    }
+    fields.update(extra)
+    return Station.objects.create(station_name=name, **fields)
+
+
+def create_package(
+    name: str = '1 Hour',
+    duration_minutes: int = 60,
+    price: Decimal = Decimal('50'),
+    payment_model: str = 'PREPAID'
+) -> RentalPackage:
+    return RentalPackage.objects.create(
+        name=name, description=name, duration_minutes=duration_minutes, price=price,
+        package_type='HOURLY', payment_model=payment_model
+    )
+
+
+def create_power_bank(serial_number: str, **extra: Any) -> PowerBank:
+    return PowerBank.objects.create(serial_number=serial_number, model='Test', capacity_mah=10000, **extra)
+
+
+def create_rental(
+    user: User,
+    slot: StationSlot,
+    package: RentalPackage,
+    code: str,
+    due_at: datetime,
+    status: str = 'ACTIVE',
+    started_at: Optional[datetime] = None,
+    **extra: Any
+) -> Rental:
+    """Rental from slot's station with its own power bank (PB-<code>)"""
+    return Rental.objects.create(
+        user=user, station=slot.station, slot=slot, package=package,
+        power_bank=create_power_bank(f'PB-{code}'), rental_code=code, status=status,
+        started_at=started_at or due_at - timedelta(minutes=package.duration_minutes),
+        due_at=due_at, **extra
+    )
+
+
+class RentalFixtureMixin:
+    """
+    One user, station, slot and package per test case, plus _rental()
+
+    Mix in before TestCase, set FIXTURE_NAME (user, station and serial
+    numbers) and set self.now in setUp(); _rental() due times are relative
+    to it.
+    """
+
+    FIXTURE_NAME = 'rentals'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = create_user(cls.FIXTURE_NAME)
+        cls.station = create_station(cls.FIXTURE_NAME)
+        cls.slot = StationSlot.objects.create(station=cls.station, slot_number=1)
+        cls.package = create_package()
+
+    def _rental(self, code: str, due_in: timedelta, status: str = 'ACTIVE') -> Rental:
+        return create_rental(
+            self.user, self.slot, self.package, code, self.now + due_in,
+            status=status, started_at=self.now - timedelta(hours=1)
+        )
@@ -0,0 +1,139 @@
+"""
+Tests for idempotent, single-flight gateway verification of top-ups
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.common.services.base import ServiceException
+from api.payments.models import PaymentIntent, Transaction, Wallet
+from api.payments.services import PaymentIntentService
+from api.payments.services.utils import GatewayVerificationCache, gateway_verification_cache
+from api.users.models import User
+
+
+class StubGateway:
+    """Stands in for NepalGatewayService; counts remote verifications"""
+
+    def __init__(self, success=True, error=None, status='Completed'):
+        self.success = success
+        self.error = error
+        self.status = status
+        self.calls = 0
+
+    def verify_khalti_payment(self, callback_data):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {
+            'success': self.success, 'transaction_id': callback_data['txnId'], 'order_id': 'TOPUP1',
+            'amount': 250.0, 'gateway_response': {'status': self.status},
+        }
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class GatewayVerificationTestCase(TestCase):
+
+    CALLBACK = {'pidx': 'PIDX1', 'status': 'Completed', 'txnId': 'TXN1'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='verify@example.com', username='verify')
+        Wallet.objects.create(user=cls.user, balance=Decimal('0'))
+
+    def setUp(self):
+        cache.clear()
+        # Reward points and notifications are queued on Celery
+        for target in ('api.points.services.award_points', 'api.notifications.services.notify'):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.service = PaymentIntentService()
+        self.intent = PaymentIntent.objects.create(
+            user=self.user, intent_id='TOPUP1', intent_type='WALLET_TOPUP', amount=Decimal('250'),
+            intent_metadata={'gateway': 'khalti'}, expires_at=timezone.now() + timedelta(minutes=30)
+        )
+
+    def _balance(self):
+        return Wallet.objects.values_list('balance', flat=True).get(user=self.user)
+
+    def test_duplicate_callbacks_verify_and_credit_once(self):
+        gateway = StubGateway()
+        first = self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+        second = self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+
+        self.assertEqual(gateway.calls, 1)
+        self.assertEqual(first['new_balance'], Decimal('250'))
+        self.assertEqual(second['message'], 'Payment already verified')
+        self.assertEqual(self._balance(), Decimal('250'))
+        self.assertEqual(Transaction.objects.filter(transaction_type='TOPUP').count(), 1)
+
+    def test_recorded_outcome_is_reused_without_remote_call(self):
+        gateway = StubGateway()
+        reference = gateway_verification_cache.reference(self.CALLBACK)
+        gateway_verification_cache.verify_once(
+            'TOPUP1', reference, lambda: self.service._verification_outcome(gateway.verify_khalti_payment(self.CALLBACK))
+        )
+
+        # Recorded by an earlier callback that did not get to credit the wallet
+        self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+        self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+
+        self.assertEqual(gateway.calls, 1)
+        self.assertEqual(self._balance(), Decimal('250'))
+
+    def test_concurrent_callback_waits_for_in_flight_verification(self):
+        gateway = StubGateway()
+        cache.add(f"{GatewayVerificationCache.LOCK_PREFIX}:TOPUP1", 'other-worker')
+
+        with mock.patch.object(GatewayVerificationCache, 'WAIT_SECONDS', 0.3):
+            with self.assertRaises(ServiceException) as raised:
+                self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+
+        self.assertEqual(raised.exception.get_codes(), 'verification_in_progress')
+        self.assertEqual(gateway.calls, 0)
+        self.assertEqual(PaymentIntent.objects.get(id=self.intent.id).status, 'PENDING')
+
+    def test_gateway_errors_are_not_recorded(self):
+        failing = StubGateway(error=ServiceException(detail='timeout', code='khalti_verification_error'))
+        with self.assertRaises(ServiceException):
+            self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=failing)
+
+        gateway = StubGateway()
+        self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+        self.assertEqual(gateway.calls, 1)
+        self.assertEqual(self._balance(), Decimal('250'))
+
+    def test_rejected_payment_marks_intent_failed(self):
+        with self.assertRaises(ServiceException) as raised:
+            self.service.verify_topup_payment(
+                'TOPUP1', self.CALLBACK, gateway_service=StubGateway(success=False, status='User canceled')
+            )
+        self.assertEqual(raised.exception.get_codes(), 'payment_verification_failed')
+        self.assertEqual(PaymentIntent.objects.get(id=self.intent.id).status, 'FAILED')
+
+    def test_pending_payment_is_not_recorded(self):
+        pending = StubGateway(success=False, status='Pending')
+        with self.assertRaises(ServiceException) as raised:
+            self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=pending)
+        self.assertEqual(raised.exception.get_codes(), 'payment_verification_pending')
+        self.assertEqual(PaymentIntent.objects.get(id=self.intent.id).status, 'PENDING')
+
+        # The retry after the payment completes verifies again and credits
+        gateway = StubGateway()
+        self.service.verify_topup_payment('TOPUP1', self.CALLBACK, gateway_service=gateway)
+        self.assertEqual(gateway.calls, 1)
+        self.assertEqual(self._balance(), Decimal('250'))
+
+    def test_esewa_reference_comes_from_encoded_payload(self):
+        data = base64.b64encode(json.dumps({'transaction_code': '000AB12', 'status': 'COMPLETE'}).encode()).decode()
+        self.assertEqual(gateway_verification_cache.reference({'data': data}), '000AB12')
+        self.assertEqual(gateway_verification_cache.reference(self.CALLBACK), 'PIDX1')
@@ -0,0 +1,80 @@
+"""
+Tests for keyset (cursor) pagination of transaction history
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from api.common.utils.helpers import paginate_queryset_by_cursor
+from api.payments.models import Wallet, WalletTransaction
+from api.payments.services import WalletService
+from api.users.models import User
+
+
+class HistoryPaginationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='history@example.com', username='history')
+        cls.wallet = Wallet.objects.create(user=cls.user, balance=Decimal('0'))
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(
+                wallet=cls.wallet, transaction_type='CREDIT', amount=Decimal('1'),
+                balance_before=Decimal(i), balance_after=Decimal(i + 1), description=f'#{i}'
+            )
+            for i in range(25)
+        ])
+        # Several rows share a timestamp so the id tie-break matters
+        base = timezone.now() - timedelta(days=1)
+        for i, row in enumerate(WalletTransaction.objects.order_by('balance_before')):
+            WalletTransaction.objects.filter(id=row.id).update(created_at=base + timedelta(minutes=i // 4))
+
+    def setUp(self):
+        self.queryset = WalletService().get_wallet_transactions_queryset(self.user)
+
+    def test_pages_chain_without_gaps_or_repeats(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page = paginate_queryset_by_cursor(self.queryset, cursor=cursor, page_size=7)
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+            self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+            self.assertIsNone(page['pagination']['total_count'])
+
+            seen.extend(row.id for row in page['results'])
+            pages += 1
+            cursor = page['pagination']['next_cursor']
+            if not page['pagination']['has_next']:
+                self.assertIsNone(cursor)
+                break
+
+        expected = list(self.queryset.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 4)
+
+    def test_count_only_when_requested(self):
+        page = paginate_queryset_by_cursor(self.queryset, page_size=10, include_count=True)
+        self.assertEqual(page['pagination']['total_count'], 25)
+
+    def test_invalid_cursor_is_rejected(self):
+        tampered = [
+            ["2024-01-01T00:00:00+00:00", 5],
+            [20240101, "00000000-0000-0000-0000-000000000000"],
+            ["2024-01-01T00:00:00", "00000000-0000-0000-0000-000000000000"],
+        ]
+        cursors = ['not-a-cursor', 'WyIxIiwiMiJd'] + [
+            base64.urlsafe_b64encode(json.dumps(value).encode()).decode() for value in tampered
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(ValidationError):
+                paginate_queryset_by_cursor(self.queryset, cursor=cursor)
@@ -0,0 +1,82 @@
+"""
+Tests for chunked payment intent expiry
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.notifications.models import Notification, NotificationTemplate
+from api.payments.models import PaymentIntent
+from api.payments.services import PaymentIntentService
+from api.payments.services.utils import intent_expiry_metrics
+from api.payments.tasks import expire_payment_intents
+from api.users.models import User
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PaymentIntentExpiryTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        NotificationTemplate.objects.create(
+            name='Payment Status', slug='payment_status', notification_type='payment',
+            title_template='Payment {{ status|title }}', message_template='Your payment of Rs. {{ amount }} has been {{ status }}.'
+        )
+        cls.users = [User.objects.create_user(email=f'expiry{i}@example.com', username=f'expiry{i}') for i in range(2)]
+        now = timezone.now()
+
+        def intent(code, user, status='PENDING', expires_in=timedelta(minutes=-5)):
+            return PaymentIntent.objects.create(
+                user=user, intent_id=code, intent_type='WALLET_TOPUP', amount=Decimal('100'), status=status,
+                intent_metadata={'gateway': 'khalti'}, expires_at=now + expires_in
+            )
+
+        cls.stale = [intent(f'STALE{i}', cls.users[i % 2]) for i in range(5)]
+        cls.live = intent('LIVE', cls.users[0], expires_in=timedelta(minutes=10))
+        cls.completed = intent('DONE', cls.users[1], status='COMPLETED')
+
+    def setUp(self):
+        intent_expiry_metrics.reset()
+
+    def test_stale_intents_expire_in_chunks(self):
+        # 5 stale intents in chunks of 2
+        result = PaymentIntentService().expire_stale_intents(batch_size=2)
+
+        self.assertEqual((result['expired_count'], result['chunks']), (5, 3))
+        self.assertEqual(result['notified'], 0)
+        self.assertEqual(
+            set(PaymentIntent.objects.filter(status='CANCELLED').values_list('intent_id', flat=True)),
+            {f'STALE{i}' for i in range(5)}
+        )
+        stale = PaymentIntent.objects.get(intent_id='STALE0')
+        self.assertEqual(stale.intent_metadata, {'gateway': 'khalti', 'expiry_reason': 'Expired due to timeout'})
+        self.assertEqual(PaymentIntent.objects.get(intent_id='LIVE').status, 'PENDING')
+        self.assertEqual(PaymentIntent.objects.get(intent_id='DONE').status, 'COMPLETED')
+        self.assertFalse(Notification.objects.exists())
+
+    @override_settings(PAYMENT_INTENT_EXPIRY_NOTIFY=True)
+    def test_owners_notified_per_chunk_when_enabled(self):
+        def send_many(template_slug, recipients):
+            return {'success_count': len(recipients), 'failure_count': 0, 'total': len(recipients)}
+
+        with mock.patch('api.notifications.services.notify.NotifyService.send_many', side_effect=send_many) as send_many:
+            result = PaymentIntentService().expire_stale_intents(batch_size=2)
+
+        # One fan-out per chunk, never one call per intent
+        self.assertEqual(send_many.call_count, 3)
+        self.assertEqual(sum(len(call.args[1]) for call in send_many.call_args_list), 5)
+        self.assertEqual(result['notified'], 5)
+
+    def test_task_records_run_counters(self):
+        result = expire_payment_intents.apply().get()
+        expire_payment_intents.apply().get()
+
+        self.assertEqual(result['expired_count'], 5)
+        metrics = intent_expiry_metrics.get_metrics()
+        self.assertEqual((metrics['runs'], metrics['intents_expired'], metrics['last_run_expired']), (2, 5, 0))
+        self.assertEqual(metrics['notifications_sent'], 0)
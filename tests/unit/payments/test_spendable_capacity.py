@@ -0,0 +1,82 @@
+"""
+Tests for the per-user spendable capacity snapshot
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.payments.models import SpendableCapacity
+from api.payments.services import PaymentCalculationService, SpendableCapacityService, WalletService
+from api.points.services.points_service import PointsService
+from tests.unit.fixtures import create_package, create_user
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SpendableCapacityTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('capacity')
+        cls.package = create_package()
+
+    def setUp(self):
+        cache.clear()
+        self.service = SpendableCapacityService()
+
+    def test_balance_changes_update_the_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService().add_balance(self.user, Decimal('30'), 'Top up')
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsService().adjust_points(self.user, 125, 'ADD', 'Bonus')
+
+        snapshot = SpendableCapacity.objects.get(user=self.user)
+        self.assertEqual(
+            (snapshot.points, snapshot.points_value, snapshot.wallet_balance),
+            (125, Decimal('12.50'), Decimal('30.00'))
+        )
+        version = snapshot.version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService().deduct_balance(self.user, Decimal('10'), 'Rental')
+        capacity = self.service.get_capacity(self.user)
+        self.assertEqual(capacity['wallet_balance'], Decimal('20.00'))
+        self.assertEqual(capacity['version'], version + 1)
+
+    def test_payment_options_read_snapshot_from_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService().add_balance(self.user, Decimal('45'), 'Top up')
+            PointsService().adjust_points(self.user, 80, 'ADD', 'Bonus')
+        self.service.get_capacity(self.user)
+
+        # Only the package is loaded
+        with self.assertNumQueries(1):
+            options = PaymentCalculationService().calculate_payment_options(
+                self.user, 'pre_payment', package_id=self.package.id
+            )
+
+        self.assertTrue(options['is_sufficient'])
+        self.assertEqual(options['user_balances']['points'], 80)
+        self.assertEqual(options['payment_breakdown']['points_amount'], Decimal('8.00'))
+        self.assertEqual(options['payment_breakdown']['wallet_used'], Decimal('42.00'))
+
+    def test_missing_snapshot_is_rebuilt(self):
+        capacity = self.service.get_capacity(self.user)
+        self.assertEqual((capacity['points'], capacity['wallet_balance'], capacity['version']), (0, Decimal('0'), 1))
+
+    def test_stale_read_cannot_overwrite_committed_top_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService().add_balance(self.user, Decimal('10'), 'Top up')
+        cache.clear()
+        stale = SpendableCapacity.objects.filter(user=self.user).values(*self.service.FIELDS).get()
+
+        # The top-up commits between the reader's query and its cache write
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService().add_balance(self.user, Decimal('90'), 'Top up')
+        self.service._remember(self.user.id, stale)
+
+        capacity = self.service.get_capacity(self.user)
+        self.assertEqual(capacity['wallet_balance'], Decimal('100.00'))
+        self.assertEqual(capacity['version'], stale['version'] + 1)
@@ -0,0 +1,67 @@
+"""
+Tests for atomic wallet ledger entries
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.test import TestCase
+
+from api.common.services.base import ServiceException
+from api.payments.models import Wallet, WalletTransaction
+from api.payments.services import WalletService
+from api.users.models import User
+
+
+class WalletLedgerTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='ledger@example.com', username='ledger')
+        cls.other = User.objects.create_user(email='ledger-other@example.com', username='ledger-other')
+        cls.wallet = Wallet.objects.create(user=cls.user, balance=Decimal('100'))
+        cls.other_wallet = Wallet.objects.create(user=cls.other, balance=Decimal('10'))
+
+    def setUp(self):
+        self.service = WalletService()
+
+    def _balance(self, wallet):
+        return Wallet.objects.values_list('balance', flat=True).get(id=wallet.id)
+
+    def test_add_and_deduct_record_running_balances(self):
+        credit = self.service.add_balance(self.user, Decimal('50'), 'Top up')
+        debit = self.service.deduct_balance(self.user, Decimal('120'), 'Rental')
+
+        self.assertEqual((credit.balance_before, credit.balance_after), (Decimal('100'), Decimal('150')))
+        self.assertEqual((debit.balance_before, debit.balance_after), (Decimal('150'), Decimal('30')))
+        self.assertEqual(self._balance(self.wallet), Decimal('30'))
+        stored = WalletTransaction.objects.get(id=debit.id)
+        self.assertEqual((stored.transaction_type, stored.balance_after), ('DEBIT', Decimal('30')))
+
+    def test_insufficient_balance_applies_nothing(self):
+        with self.assertRaises(ServiceException) as raised:
+            self.service.deduct_balance(self.user, Decimal('100.01'), 'Too much')
+
+        self.assertEqual(raised.exception.get_codes(), 'insufficient_balance')
+        self.assertEqual(self._balance(self.wallet), Decimal('100'))
+        self.assertFalse(WalletTransaction.objects.exists())
+
+    def test_batch_is_applied_in_order_per_wallet(self):
+        entries = [
+            {'wallet_id': self.other_wallet.id, 'transaction_type': 'CREDIT', 'amount': Decimal('40'), 'description': 'Refund'},
+            {'wallet_id': self.wallet.id, 'transaction_type': 'DEBIT', 'amount': Decimal('30'), 'description': 'Fee'},
+            {'wallet_id': self.other_wallet.id, 'transaction_type': 'DEBIT', 'amount': Decimal('45'), 'description': 'Rental'},
+        ]
+        written = self.service.apply_ledger_entries(entries)
+
+        self.assertEqual([w.balance_after for w in written], [Decimal('50'), Decimal('70'), Decimal('5')])
+        self.assertEqual(self._balance(self.wallet), Decimal('70'))
+        self.assertEqual(self._balance(self.other_wallet), Decimal('5'))
+        self.assertEqual(WalletTransaction.objects.count(), 3)
+
+        # The debit comes before the credit that would cover it: whole batch rejected
+        with self.assertRaises(ServiceException):
+            self.service.apply_ledger_entries(list(reversed(entries)))
+        self.assertEqual(self._balance(self.other_wallet), Decimal('5'))
+        self.assertEqual(self._balance(self.wallet), Decimal('70'))
+        self.assertEqual(WalletTransaction.objects.count(), 3)
@@ -0,0 +1,77 @@
+"""
+Tests for the precomputed late-fee rate table
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.common.models import LateFeeConfiguration
+from api.rentals.models import Rental
+from api.rentals.serializers import RentalDetailSerializer
+from api.rentals.services.utils import late_fee_rate_table
+from api.stations.models import StationSlot
+from tests.unit.fixtures import create_package, create_rental, create_station, create_user
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LateFeeRateTableTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('latefee')
+        slot = StationSlot.objects.create(station=create_station('Late Fee'), slot_number=1)
+        cls.package = create_package(price=Decimal('60.00'), payment_model='POSTPAID')
+        cls.config = LateFeeConfiguration.objects.create(
+            name='Compound', fee_type='COMPOUND', multiplier=Decimal('1.5'),
+            flat_rate_per_hour=Decimal('10'), grace_period_minutes=15, is_active=True
+        )
+        now = timezone.now()
+        for i in range(20):
+            create_rental(
+                cls.user, slot, cls.package, f'LF{i:03d}', now - timedelta(minutes=30 + i * 7),
+                status='OVERDUE', started_at=now - timedelta(hours=3)
+            )
+
+    def setUp(self):
+        cache.clear()
+        late_fee_rate_table.invalidate()
+
+    def _page(self):
+        return list(
+            Rental.objects.select_related('station', 'return_station', 'package', 'power_bank')
+            .order_by('rental_code')
+        )
+
+    def test_live_amounts_match_configuration(self):
+        for rental in self._page():
+            expected = self.config.calculate_late_fee(Decimal('1'), rental.minutes_overdue)
+            self.assertEqual(rental.current_overdue_amount, expected)
+
+    def test_page_is_serialized_without_queries(self):
+        rentals = self._page()
+        late_fee_rate_table.rate_per_minute(self.package.id)
+
+        with self.assertNumQueries(0):
+            data = RentalDetailSerializer(rentals, many=True).data
+
+        self.assertEqual(len(data), 20)
+        self.assertGreater(Decimal(data[0]['current_overdue_amount']), 0)
+
+    def test_configuration_change_rebuilds_table(self):
+        rental = self._page()[0]
+        before = rental.current_overdue_amount
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.is_active = False
+            self.config.save()
+
+        self.assertEqual(
+            rental.current_overdue_amount,
+            Decimal('1') * Decimal('2') * Decimal(str(rental.minutes_overdue))
+        )
+        self.assertNotEqual(rental.current_overdue_amount, before)
@@ -0,0 +1,107 @@
+"""
+Concurrency stress test for power bank allocation in start_rental
+"""
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connections
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+
+from api.common.services.base import ServiceException
+from api.payments.models import Wallet
+from api.rentals.models import Rental
+from api.rentals.services import RentalService
+from api.stations.models import PowerBank, StationSlot
+from api.system.models import AppConfig
+from api.users.models import User, UserKYC, UserProfile
+from tests.unit.fixtures import create_package, create_power_bank, create_station, create_user
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RentalAllocationStressTestCase(TransactionTestCase):
+    """N parallel renters at one station with fewer power banks than renters"""
+
+    RENTERS = 12
+    POWER_BANKS = 8
+
+    def setUp(self):
+        AppConfig.objects.create(key='NEED_RENTALS_KYC_VERIFIED', value='false')
+        self.station = create_station('Busy', total_slots=self.POWER_BANKS + 2, status='ONLINE')
+        for number in range(1, self.POWER_BANKS + 3):
+            slot = StationSlot.objects.create(station=self.station, slot_number=number)
+            if number <= self.POWER_BANKS:
+                create_power_bank(
+                    f'BUSY-PB{number:02d}', battery_level=50 + number, current_station=self.station, current_slot=slot
+                )
+            elif number == self.POWER_BANKS + 1:
+                # Too low to rent out
+                create_power_bank('BUSY-LOW', battery_level=5, current_station=self.station, current_slot=slot)
+        self.package = create_package(payment_model='POSTPAID')
+        self.users = []
+        for i in range(self.RENTERS):
+            user = create_user(f'renter{i}')
+            UserProfile.objects.create(user=user, is_profile_complete=True)
+            UserKYC.objects.create(user=user, status='APPROVED')
+            Wallet.objects.create(user=user, balance=Decimal('500'))
+            self.users.append(user)
+
+    def _start_all(self):
+        barrier = threading.Barrier(self.RENTERS)
+        outcomes = []
+
+        def renter(user):
+            try:
+                barrier.wait()
+                RentalService().start_rental(user, self.station.serial_number, str(self.package.id))
+                outcomes.append('started')
+            except ServiceException as e:
+                outcomes.append(e.get_codes())
+            except Exception as e:
+                outcomes.append(f'error: {e}')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=renter, args=(User.objects.get(id=u.id),)) for u in self.users]
+        with mock.patch('api.notifications.services.notify'):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return Counter(outcomes)
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_parallel_rentals_get_distinct_power_banks(self):
+        outcomes = self._start_all()
+
+        self.assertEqual(outcomes['started'], self.POWER_BANKS, outcomes)
+        self.assertEqual(sum(outcomes.values()), self.RENTERS)
+
+        rentals = Rental.objects.filter(station=self.station)
+        self.assertEqual(rentals.count(), self.POWER_BANKS)
+        self.assertEqual(len(set(rentals.values_list('power_bank_id', flat=True))), self.POWER_BANKS)
+        self.assertEqual(len(set(rentals.values_list('slot_id', flat=True))), self.POWER_BANKS)
+        self.assertEqual(PowerBank.objects.filter(status='RENTED').count(), self.POWER_BANKS)
+        self.assertEqual(
+            StationSlot.objects.filter(station=self.station, status='OCCUPIED', current_rental__isnull=False).count(),
+            self.POWER_BANKS
+        )
+        self.assertEqual(PowerBank.objects.get(serial_number='BUSY-LOW').status, 'AVAILABLE')
+
+    def test_sequential_rentals_exhaust_station(self):
+        service = RentalService()
+        with mock.patch('api.notifications.services.notify'):
+            for user in self.users[:self.POWER_BANKS]:
+                rental = service.start_rental(user, self.station.serial_number, str(self.package.id))
+                self.assertEqual(rental.status, 'ACTIVE')
+                self.assertIsNone(rental.power_bank.current_slot_id)
+
+            with self.assertRaises(ServiceException):
+                service.start_rental(self.users[-1], self.station.serial_number, str(self.package.id))
+
+        # Highest battery first
+        first = Rental.objects.order_by('created_at').first()
+        self.assertEqual(first.power_bank.serial_number, f'BUSY-PB{self.POWER_BANKS:02d}')
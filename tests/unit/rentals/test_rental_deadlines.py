@@ -0,0 +1,155 @@
+"""
+Tests for the rental deadline scheduler and its event handlers
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.notifications.models import Notification, NotificationRule, NotificationTemplate
+from api.rentals.services import RentalDeadlineService
+from api.rentals.services.utils import RentalDeadlineScheduler, reminder_dispatch_metrics
+from tests.unit.fixtures import RentalFixtureMixin
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RentalDeadlineTestCase(RentalFixtureMixin, TestCase):
+
+    FIXTURE_NAME = 'deadlines'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        NotificationTemplate.objects.create(
+            name='Rental Reminder', slug='rental_reminder', notification_type='rental',
+            title_template='Rental due soon', message_template='Rental {{ rental_code }} is due at {{ due_time }}'
+        )
+
+    def setUp(self):
+        reminder_dispatch_metrics.reset()
+        self.scheduler = RentalDeadlineScheduler()
+        self.service = RentalDeadlineService(scheduler=self.scheduler)
+        self.now = timezone.now()
+
+    def _rental(self, code, due_in, status='ACTIVE'):
+        rental = super()._rental(code, due_in, status)
+        self.scheduler.schedule(rental.id, rental.due_at)
+        return rental
+
+    def test_pop_returns_only_due_rentals_once(self):
+        due = self._rental('DUE1', timedelta(minutes=-1))
+        later = self._rental('LATER1', timedelta(hours=2))
+
+        self.assertEqual(self.scheduler.pop_due('overdue', self.now), [str(due.id)])
+        self.assertEqual(self.scheduler.pop_due('overdue', self.now), [])
+
+        # Extending reschedules instead of adding a second entry
+        self.scheduler.schedule(later.id, self.now - timedelta(minutes=1))
+        self.assertEqual(self.scheduler.pop_due('overdue', self.now), [str(later.id)])
+        self.assertEqual(self.scheduler.pending_count('overdue'), 0)
+
+    def test_unschedule_drops_all_events(self):
+        rental = self._rental('RET1', timedelta(minutes=-1))
+        self.scheduler.unschedule(rental.id)
+
+        self.assertEqual(self.service.pop_due_batches(self.now), {'reminder': [], 'overdue': [], 'abandoned': []})
+
+    def test_failed_handler_puts_events_back(self):
+        rental = self._rental('FAIL1', timedelta(minutes=-1))
+        batch = self.scheduler.pop_due('overdue', self.now)
+        self.assertEqual(self.scheduler.processing_count('overdue'), 1)
+
+        with mock.patch.object(self.service, 'mark_overdue', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                self.service.handle('overdue', batch)
+
+        self.assertEqual(self.scheduler.processing_count('overdue'), 0)
+        self.assertEqual(self.scheduler.pop_due('overdue', self.now), [])
+        retry_at = timezone.now() + RentalDeadlineScheduler.RETRY_DELAY
+        self.assertEqual(self.scheduler.pop_due('overdue', retry_at), [str(rental.id)])
+
+    def test_unacknowledged_events_are_due_again_after_lease(self):
+        rental = self._rental('LEASE1', timedelta(minutes=-1))
+        # Popped, but the task never ran (worker died)
+        self.assertEqual(self.service.pop_due_batches(self.now)['overdue'], [[str(rental.id)]])
+        self.assertEqual(self.service.pop_due_batches(self.now)['overdue'], [])
+
+        expired = self.now + RentalDeadlineScheduler.PROCESSING_LEASE
+        batch = self.service.pop_due_batches(expired)['overdue']
+        self.assertEqual(batch, [[str(rental.id)]])
+
+        self.service.handle('overdue', batch[0])
+        self.assertEqual(self.scheduler.processing_count('overdue'), 0)
+        self.assertEqual(self.service.pop_due_batches(expired + timedelta(hours=1))['overdue'], [])
+
+    @mock.patch('api.notifications.services.notify')
+    def test_due_events_are_handled_in_batches(self, notify):
+        reminder = self._rental('REMIND1', timedelta(minutes=10))
+        overdue = self._rental('OVER1', timedelta(minutes=-5))
+        abandoned = self._rental('LOST1', timedelta(hours=-25), status='OVERDUE')
+        self._rental('LATER2', timedelta(hours=3))
+
+        batches = self.service.pop_due_batches(self.now)
+        # Reminders of already past-due rentals are popped (one minute bucket each) but skipped by the handler
+        self.assertEqual(sum(len(batch) for batch in batches['reminder']), 3)
+        self.assertEqual(sorted(batches['overdue'][0]), sorted([str(overdue.id), str(abandoned.id)]))
+        self.assertEqual(batches['abandoned'], [[str(abandoned.id)]])
+
+        results = {
+            event: [self.service.handle(event, batch) for batch in event_batches]
+            for event, event_batches in batches.items()
+        }
+        self.assertEqual(sum(result['reminder_count'] for result in results['reminder']), 1)
+        self.assertEqual(results['overdue'][0]['updated_count'], 1)
+        self.assertEqual(results['abandoned'][0]['completed_count'], 1)
+
+        reminder.refresh_from_db()
+        overdue.refresh_from_db()
+        abandoned.refresh_from_db()
+        self.assertTrue(reminder.rental_metadata['reminder_sent'])
+        self.assertEqual(overdue.status, 'OVERDUE')
+        self.assertEqual(abandoned.status, 'COMPLETED')
+        self.assertEqual(sum(self.scheduler.processing_count(event) for event in batches), 0)
+        self.assertEqual(Notification.objects.filter(template__slug='rental_reminder').count(), 1)
+
+        # Re-handling a batch (e.g. after a sync) does not remind twice
+        self.service.handle('reminder', [str(reminder.id)])
+        self.assertEqual(Notification.objects.filter(template__slug='rental_reminder').count(), 1)
+
+    def test_reminders_are_batched_per_minute_bucket(self):
+        base = self.now.replace(second=0, microsecond=0) + timedelta(minutes=10)
+        same_minute = [self._rental(f'B{i}', base - self.now + timedelta(seconds=5 * i)) for i in range(5)]
+        next_minute = self._rental('B9', base - self.now + timedelta(minutes=1, seconds=1))
+
+        batches = self.service.pop_due_batches(self.now)['reminder']
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(sorted(batches[0]), sorted(str(rental.id) for rental in same_minute))
+        self.assertEqual(batches[1], [str(next_minute.id)])
+
+        # Rentals with users, template, rule, one bulk insert, one bulk update
+        with self.assertNumQueries(5):
+            result = self.service.send_reminders(batches[0])
+
+        self.assertEqual(result, {'reminder_count': 5, 'failed_count': 0})
+        metrics = reminder_dispatch_metrics.get_metrics()
+        self.assertEqual(metrics['batches'], 1)
+        self.assertEqual(metrics['reminders_sent'], 5)
+        self.assertEqual(metrics['last_batch_size'], 5)
+        self.assertGreater(metrics['max_lag_ms'], 0)
+
+    def test_failed_channel_sends_are_counted(self):
+        NotificationRule.objects.create(notification_type='rental', send_push=True)
+        rentals = [self._rental(f'PUSH{i}', timedelta(minutes=10)) for i in range(2)]
+        delivered = {'status': 'sent', 'sent_count': 1, 'failed_count': 0}
+
+        with mock.patch(
+            'api.notifications.services.fcm.FCMService.send_push_notification',
+            side_effect=[ConnectionError('fcm down'), delivered]
+        ):
+            result = self.service.send_reminders([str(rental.id) for rental in rentals])
+
+        self.assertEqual(result, {'reminder_count': 1, 'failed_count': 1})
+        self.assertEqual(reminder_dispatch_metrics.get_metrics()['reminders_failed'], 1)
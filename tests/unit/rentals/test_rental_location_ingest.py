@@ -0,0 +1,113 @@
+"""
+Tests for batched, downsampled rental GPS ingest
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.rentals.models import RentalLocation
+from api.rentals.services import RentalLocationService
+from api.rentals.services.utils import rental_location_buffer
+from api.stations.models import StationSlot
+from tests.unit.fixtures import create_package, create_rental, create_station, create_user
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RentalLocationIngestTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('gps')
+        other = create_user('gps-other')
+        slot = StationSlot.objects.create(station=create_station('GPS'), slot_number=1)
+        package = create_package()
+        due_at = timezone.now() + timedelta(minutes=50)
+
+        def rental(code, user, status='ACTIVE'):
+            return create_rental(user, slot, package, code, due_at, status=status)
+
+        cls.parked = rental('GPS1', cls.user)
+        cls.moving = rental('GPS2', cls.user)
+        cls.foreign = rental('GPS3', other)
+        cls.finished = rental('GPS4', cls.user, status='COMPLETED')
+
+    def setUp(self):
+        cache.clear()
+        rental_location_buffer.flush()
+        self.start = timezone.now() - timedelta(minutes=5)
+        patcher = mock.patch('api.rentals.tasks.flush_rental_locations.delay')
+        self.queue_flush = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _points(self, rental, count, step_degrees=0.0, every=timedelta(seconds=5)):
+        return [
+            {
+                'rental_id': rental.id, 'latitude': 27.7 + i * step_degrees, 'longitude': 85.3,
+                'accuracy': 5.0, 'recorded_at': self.start + i * every,
+            }
+            for i in range(count)
+        ]
+
+    def test_batch_is_downsampled_and_bulk_written(self):
+        points = (
+            self._points(self.parked, 25)  # 2 minutes in one place
+            + self._points(self.moving, 10, step_degrees=0.0005)  # ~55 m per fix
+            + self._points(self.foreign, 3)
+            + self._points(self.finished, 3)
+        )
+
+        result = RentalLocationService().ingest_locations(points, user=self.user)
+        rental_location_buffer.flush()
+
+        # Parked rental keeps one point a minute: 0s, 60s, 120s
+        self.assertEqual(result, {'accepted': 13, 'dropped': 22, 'rejected': 6})
+        self.assertEqual(RentalLocation.objects.filter(rental=self.parked).count(), 3)
+        self.assertEqual(RentalLocation.objects.filter(rental=self.moving).count(), 10)
+        self.assertEqual(
+            RentalLocation.objects.filter(rental=self.moving).order_by('recorded_at').first().recorded_at,
+            self.start
+        )
+
+    def test_later_batches_continue_from_last_kept_point(self):
+        service = RentalLocationService()
+        service.ingest_locations(self._points(self.parked, 2), user=self.user)
+
+        # Replayed and still-stationary points are dropped
+        result = service.ingest_locations(self._points(self.parked, 4), user=self.user)
+        self.assertEqual(result['accepted'], 0)
+
+    def test_ingest_queues_flush_instead_of_writing(self):
+        """The upload request only queues points; the flush task writes them"""
+        service = RentalLocationService()
+        service.ingest_locations(self._points(self.moving, 3, step_degrees=0.0005), user=self.user)
+        service.ingest_locations(self._points(self.parked, 1), user=self.user)
+
+        self.assertEqual(RentalLocation.objects.count(), 0)
+        # Once per flush interval
+        self.assertEqual(self.queue_flush.call_count, 1)
+        self.assertEqual(rental_location_buffer.pending_count(), 4)
+
+    def test_failed_insert_requeues_points(self):
+        RentalLocationService().ingest_locations(self._points(self.moving, 3, step_degrees=0.0005), user=self.user)
+
+        with mock.patch('api.rentals.models.RentalLocation.objects.bulk_create', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                rental_location_buffer.flush()
+        self.assertEqual(rental_location_buffer.pending_count(), 3)
+
+        self.assertEqual(rental_location_buffer.flush(), {'pending': 3, 'written': 3})
+        self.assertEqual(
+            list(RentalLocation.objects.order_by('recorded_at').values_list('recorded_at', flat=True)),
+            [self.start + i * timedelta(seconds=5) for i in range(3)]
+        )
+
+    def test_track_read_uses_rental_time_index(self):
+        plan = RentalLocation.objects.filter(
+            rental=self.moving, recorded_at__gte=self.start
+        ).order_by('recorded_at').explain()
+        self.assertIn('rental_location_time_idx', plan)
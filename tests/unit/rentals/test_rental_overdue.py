@@ -0,0 +1,68 @@
+"""
+Tests for the set-based ACTIVE -> OVERDUE transition and its notifications
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.rentals.models import Rental
+from api.rentals.services import RentalOverdueService
+from api.rentals.tasks import check_overdue_rentals, send_overdue_notifications
+from tests.unit.fixtures import RentalFixtureMixin
+
+
+class RentalOverdueTestCase(RentalFixtureMixin, TestCase):
+
+    FIXTURE_NAME = 'overdue'
+
+    def setUp(self):
+        self.service = RentalOverdueService()
+        self.now = timezone.now()
+        self.due = [self._rental(f'DUE{i}', timedelta(minutes=-5 - i)) for i in range(5)]
+        self.later = self._rental('LATER', timedelta(hours=1))
+        self.returned = self._rental('RETURNED', timedelta(minutes=-5), status='COMPLETED')
+
+    def test_transitions_in_chunks(self):
+        """Every past-due ACTIVE rental is moved, chunk by chunk, and nothing else"""
+        with mock.patch.object(self.service, '_update_chunk', wraps=self.service._update_chunk) as update_chunk:
+            transitioned = self.service.mark_overdue(now=self.now, chunk_size=2)
+
+        self.assertEqual(update_chunk.call_count, 3)
+        self.assertEqual(sorted(transitioned), sorted(str(rental.id) for rental in self.due))
+        self.assertEqual(Rental.objects.filter(status='OVERDUE').count(), 5)
+        self.later.refresh_from_db()
+        self.returned.refresh_from_db()
+        self.assertEqual(self.later.status, 'ACTIVE')
+        self.assertEqual(self.returned.status, 'COMPLETED')
+
+        # A second run finds nothing left
+        self.assertEqual(self.service.mark_overdue(now=self.now, chunk_size=2), [])
+
+    def test_restricted_to_given_rentals(self):
+        """Scheduler batches only transition their own rentals"""
+        batch = [str(self.due[0].id), str(self.later.id), str(self.returned.id)]
+
+        self.assertEqual(self.service.mark_overdue(now=self.now, rental_ids=batch), [str(self.due[0].id)])
+        self.assertEqual(Rental.objects.filter(status='OVERDUE').count(), 1)
+
+    @mock.patch.object(RentalOverdueService, 'NOTIFICATION_BATCH_SIZE', 2)
+    @mock.patch.object(send_overdue_notifications, 'delay')
+    def test_notifications_fan_out_in_batches(self, delay):
+        """One notification task per batch, one notification per rental"""
+        result = check_overdue_rentals.apply().get()
+
+        self.assertEqual(result, {'updated_count': 5, 'notification_batches': 3})
+        batches = [call.args[0] for call in delay.call_args_list]
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(sorted(sum(batches, [])), sorted(str(rental.id) for rental in self.due))
+
+        with mock.patch('api.notifications.services.notify') as notify:
+            sent = [send_overdue_notifications.apply(args=[batch]).get() for batch in batches]
+
+        self.assertEqual(sum(result['sent'] for result in sent), 5)
+        self.assertEqual(notify.call_count, 5)
+        self.assertEqual({call.args[1] for call in notify.call_args_list}, {'rental_overdue'})
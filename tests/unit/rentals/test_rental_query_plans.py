@@ -0,0 +1,109 @@
+"""
+Query-plan regression tests for Rental hot queries
+"""
+from __future__ import annotations
+
+import random
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from api.rentals.models import Rental
+from api.stations.models import PowerBank, Station, StationSlot
+from api.users.models import User
+from tests.unit.fixtures import create_package
+
+
+INDEX_SCAN = re.compile(r'SEARCH \S+ USING (COVERING )?INDEX|Index (Only )?Scan|Bitmap Index Scan')
+
+
+class RentalQueryPlanTestCase(TestCase):
+    """Hot Rental queries must use index scans on a realistically sized table"""
+
+    RENTALS = 20_000
+    USERS = 1_000
+    STATIONS = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        now = timezone.now()
+
+        cls.users = User.objects.bulk_create([
+            User(email=f'plan-{i}@example.com', username=f'plan_{i}') for i in range(cls.USERS)
+        ])
+        cls.stations = Station.objects.bulk_create([
+            Station(
+                station_name=f'Plan {i}', serial_number=f'PLAN{i:04d}', imei=f'PLAN{i:04d}',
+                latitude=27.7, longitude=85.3, address='Kathmandu', total_slots=8
+            )
+            for i in range(cls.STATIONS)
+        ])
+        slots = StationSlot.objects.bulk_create([
+            StationSlot(station=station, slot_number=1) for station in cls.stations
+        ])
+        package = create_package()
+        cls.power_banks = PowerBank.objects.bulk_create([
+            PowerBank(serial_number=f'PLANPB{i:05d}', model='Plan', capacity_mah=10000)
+            for i in range(cls.RENTALS // 10)
+        ])
+
+        # Mostly finished history with a small open tail, as in production
+        statuses = ['COMPLETED'] * 90 + ['CANCELLED'] * 5 + ['ACTIVE'] * 3 + ['OVERDUE'] * 1 + ['PENDING'] * 1
+        rentals = []
+        for i in range(cls.RENTALS):
+            station_index = rng.randrange(cls.STATIONS)
+            started_at = now - timedelta(minutes=rng.randrange(60 * 24 * 180))
+            rentals.append(Rental(
+                user=cls.users[rng.randrange(cls.USERS)],
+                station=cls.stations[station_index],
+                slot=slots[station_index],
+                package=package,
+                power_bank=cls.power_banks[rng.randrange(len(cls.power_banks))],
+                rental_code=f'P{i:07d}',
+                status=rng.choice(statuses),
+                started_at=started_at,
+                due_at=started_at + timedelta(hours=1),
+            ))
+        Rental.objects.bulk_create(rentals, batch_size=5000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexScan(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertRegex(plan, INDEX_SCAN, f"Expected an index scan, got:\n{plan}")
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_active_rental_check(self):
+        self.assertIndexScan(
+            Rental.objects.filter(user=self.users[0], status__in=['PENDING', 'ACTIVE']),
+            'rental_user_status_idx'
+        )
+
+    def test_overdue_scan(self):
+        now = timezone.now()
+        self.assertIndexScan(
+            Rental.objects.filter(status='ACTIVE', due_at__lt=now), 'rental_active_due_idx'
+        )
+        self.assertIndexScan(
+            Rental.objects.filter(status='OVERDUE', due_at__lt=now - timedelta(hours=24)),
+            'rental_overdue_due_idx'
+        )
+
+    def test_return_event_lookup(self):
+        self.assertIndexScan(
+            Rental.objects.filter(power_bank=self.power_banks[0], status='ACTIVE'),
+            'rental_active_powerbank_idx'
+        )
+
+    def test_station_analytics_range(self):
+        now = timezone.now()
+        self.assertIndexScan(
+            Rental.objects.filter(station=self.stations[0], created_at__range=(now - timedelta(days=30), now)),
+            'rental_station_created_idx'
+        )
@@ -0,0 +1,94 @@
+"""
+Tests for the incrementally maintained user rental stats row
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.rentals.models import Rental, UserRentalStats
+from api.rentals.services import RentalStatsService
+from api.stations.models import StationSlot
+from tests.unit.fixtures import create_package, create_rental, create_station, create_user
+
+
+class UserRentalStatsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('stats')
+        cls.stations = [create_station(name) for name in ('Thamel', 'Patan')]
+        cls.slots = [StationSlot.objects.create(station=station, slot_number=1) for station in cls.stations]
+        cls.packages = [
+            create_package(name, minutes, Decimal(price))
+            for name, minutes, price in (('1 Hour', 60, '50'), ('4 Hours', 240, '150'))
+        ]
+
+    def setUp(self):
+        self.service = RentalStatsService()
+        self.now = timezone.now()
+
+    def _start(self, code, station=0, package=0):
+        return create_rental(
+            self.user, self.slots[station], self.packages[package], code, self.now - timedelta(minutes=30),
+            started_at=self.now - timedelta(minutes=90), amount_paid=self.packages[package].price,
+            payment_status='PAID'
+        )
+
+    def _complete(self, rental, on_time):
+        rental = Rental.objects.get(id=rental.id)
+        rental.status = 'COMPLETED'
+        rental.ended_at = rental.due_at - timedelta(minutes=5) if on_time else self.now
+        rental.is_returned_on_time = on_time
+        rental.save(update_fields=['status', 'ended_at', 'is_returned_on_time'])
+
+    def test_row_tracks_rental_lifecycle(self):
+        on_time = self._start('S1')
+        late = self._start('S2', station=1)
+        cancelled = self._start('S3', package=1)
+        self._start('S4')
+
+        self._complete(on_time, on_time=True)
+        self._complete(late, on_time=False)
+        cancelled.status = 'CANCELLED'
+        cancelled.payment_status = 'REFUNDED'
+        cancelled.save(update_fields=['status', 'payment_status'])
+        # Saves that do not touch tracked fields leave the row alone
+        with self.assertNumQueries(1):
+            late.rental_metadata['note'] = 'x'
+            late.save(update_fields=['rental_metadata'])
+
+        stats = self.service.get_stats(self.user)
+        self.assertEqual(stats['total_rentals'], 4)
+        self.assertEqual(stats['completed_rentals'], 2)
+        self.assertEqual(stats['cancelled_rentals'], 1)
+        self.assertEqual(stats['active_rentals'], 1)
+        self.assertEqual(stats['total_spent'], Decimal('150'))
+        self.assertEqual(stats['total_time_used'], 55 + 90)
+        self.assertEqual(stats['timely_returns'], 1)
+        self.assertEqual(stats['late_returns'], 1)
+        self.assertEqual(stats['favorite_station'], 'Thamel')
+        self.assertEqual(stats['favorite_package'], '1 Hour')
+
+        # Incremental row matches a full single-pass recompute
+        row = UserRentalStats.objects.get(user=self.user)
+        for field, value in self.service.compute(self.user.id).items():
+            self.assertEqual(getattr(row, field), value, field)
+
+    def test_stats_read_is_one_query(self):
+        self._complete(self._start('R1'), on_time=True)
+
+        with self.assertNumQueries(1):
+            stats = self.service.get_stats(self.user)
+        self.assertEqual(stats['completed_rentals'], 1)
+
+    def test_missing_row_is_rebuilt(self):
+        self._start('M1')
+        UserRentalStats.objects.filter(user=self.user).delete()
+
+        stats = self.service.get_stats(self.user)
+        self.assertEqual(stats['total_rentals'], 1)
+        self.assertEqual(stats['first_rental_date'], Rental.objects.get(rental_code='M1').created_at)
@@ -0,0 +1,262 @@
+"""
+Tests for DeviceAPIService against a local stub of the Java Device API
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from api.stations.services.device_api_service import DeviceAPIService
+from api.stations.services.utils.device_token_store import device_token_store
+
+
+class StubDeviceAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.server.login_delay:
+            time.sleep(self.server.login_delay)
+        self.server.logins += 1
+        self._reply(200, {'token': f'token-{self.server.logins}'})
+
+    def do_GET(self):
+        server = self.server
+        server.client_ports.add(self.client_address[1])
+        query = parse_qs(urlparse(self.path).query)
+        device = query.get('deviceName', [''])[0]
+
+        if server.drops_left > 0:
+            # Request received, connection dropped before any response
+            server.drops_left -= 1
+            server.dropped += 1
+            self.close_connection = True
+            return
+        if device in server.slow_devices:
+            time.sleep(server.slow_delay)
+        if device in server.broken_devices:
+            return self._reply(500, {'message': 'device error'})
+        if server.failures_left > 0:
+            server.failures_left -= 1
+            return self._reply(503, {'message': 'busy'})
+        if self.headers.get('Authorization') == f'Bearer {server.rejected_token}':
+            return self._reply(401, {'message': 'expired'})
+        self._reply(200, [{'index': 1, 'device': device, 'power': 80}])
+
+
+class StubDeviceAPI:
+    """Threaded HTTP server standing in for the Java Device API"""
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubDeviceAPIHandler)
+        self.server.logins = 0
+        self.server.login_delay = 0
+        self.server.failures_left = 0
+        self.server.drops_left = 0
+        self.server.dropped = 0
+        self.server.rejected_token = None
+        self.server.client_ports = set()
+        self.server.slow_devices = set()
+        self.server.slow_delay = 0
+        self.server.broken_devices = set()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        return self.server
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DeviceAPIServiceTestCase(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        device_token_store.clear_local()
+        self.stub = StubDeviceAPI()
+        self.server = self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        settings_patch = override_settings(DEVICE_API={
+            'BASE_URL': self.stub.base_url,
+            'MAX_RETRIES': 2,
+            'RETRY_BACKOFF_BASE': 0,
+            'AUTH_ENABLED': True,
+        })
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+
+    def test_connections_are_reused(self):
+        service = DeviceAPIService()
+        for _ in range(5):
+            self.assertTrue(service.check_device('CG001')['success'])
+
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        self.server.failures_left = 2
+        service = DeviceAPIService()
+
+        with mock.patch('api.stations.services.device_api_service.time.sleep') as sleep:
+            result = service.check_device('CG001')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_dropped_popup_is_not_retried(self):
+        """A popup the API may have run is reported, not sent again"""
+        self.server.drops_left = 1
+        service = DeviceAPIService()
+
+        with mock.patch('api.stations.services.device_api_service.time.sleep'):
+            result = service.popup_powerbank('CG001')
+            check = service.check_device('CG001')
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['code'], 503)
+        self.assertEqual(self.server.dropped, 1)
+        self.assertTrue(check['success'])
+
+    def test_dropped_check_is_retried(self):
+        self.server.drops_left = 1
+
+        with mock.patch('api.stations.services.device_api_service.time.sleep'):
+            result = DeviceAPIService().check_device('CG001')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.server.dropped, 1)
+
+    def test_popup_retried_when_connection_not_opened(self):
+        service = DeviceAPIService()
+        send = service._send
+        refused = requests.exceptions.ConnectionError(
+            MaxRetryError(None, '/popup_random', NewConnectionError(None, 'Connection refused'))
+        )
+        calls = []
+
+        def refuse_first(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise refused
+            return send(*args)
+
+        with mock.patch.object(service, '_send', side_effect=refuse_first), \
+                mock.patch('api.stations.services.device_api_service.time.sleep'):
+            result = service.popup_powerbank('CG001')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(len(calls), 2)
+
+    def test_token_is_shared_through_cache(self):
+        DeviceAPIService().check_device('CG001')
+        DeviceAPIService().check_device('CG002')
+
+        self.assertEqual(self.server.logins, 1)
+
+    def test_local_hits_are_counted_in_process(self):
+        """Local token hits reach the shared counter in batches, not per call"""
+        service = DeviceAPIService()
+        for _ in range(3):
+            service.check_device('CG001')
+
+        self.assertIsNone(cache.get(f"{device_token_store.METRICS_KEY_PREFIX}:local_hits"))
+        self.assertEqual(device_token_store.get_metrics()['local_hits'], 2)
+
+        with mock.patch.object(device_token_store, 'LOCAL_HITS_FLUSH_COUNT', 2):
+            service.check_device('CG001')
+            service.check_device('CG001')
+        self.assertEqual(cache.get(f"{device_token_store.METRICS_KEY_PREFIX}:local_hits"), 4)
+
+    def test_rejected_token_is_refreshed_once(self):
+        DeviceAPIService().check_device('CG001')
+        self.server.rejected_token = 'token-1'
+
+        result = DeviceAPIService().check_device('CG001')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.server.logins, 2)
+
+    def test_concurrent_processes_log_in_once(self):
+        """Callers without a local token wait for a single login"""
+        self.server.login_delay = 0.3
+        results = []
+
+        def worker():
+            device_token_store.clear_local()
+            results.append(DeviceAPIService().check_device('CG001')['success'])
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(self.server.logins, 1)
+        metrics = device_token_store.get_metrics()
+        self.assertEqual(metrics['refreshes'], 1)
+        self.assertGreaterEqual(metrics['lock_waits'], 1)
+
+    def test_token_is_renewed_before_expiry(self):
+        service = DeviceAPIService()
+        service.check_device('CG001')
+        self.assertFalse(service.renew_token_if_expiring())
+
+        entry = cache.get(device_token_store.CACHE_KEY)
+        entry['expires_at'] = timezone.now() + timedelta(minutes=30)
+        cache.set(device_token_store.CACHE_KEY, entry)
+
+        self.assertTrue(service.renew_token_if_expiring())
+        self.assertEqual(self.server.logins, 2)
+        self.assertEqual(device_token_store.get_metrics()['proactive_renewals'], 1)
+
+    def test_bulk_check_runs_concurrently(self):
+        self.server.slow_devices = {f'CG{i:03d}' for i in range(20)}
+        self.server.slow_delay = 0.2
+        self.server.broken_devices = {'CG005'}
+
+        started = time.monotonic()
+        summary = DeviceAPIService().check_devices(
+            [f'CG{i:03d}' for i in range(20)], max_workers=10
+        )
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(summary['total'], 20)
+        self.assertEqual(summary['succeeded'], 19)
+        self.assertEqual(summary['errors'], {'500': 1})
+        self.assertEqual(summary['results']['CG001']['data'][0]['device'], 'CG001')
+        # 20 devices x 0.2s sequentially is 4s
+        self.assertLess(elapsed, 2.0)
+
+    def test_bulk_check_applies_device_timeout(self):
+        self.server.slow_devices = {'SLOW1'}
+        self.server.slow_delay = 1.5
+
+        summary = DeviceAPIService().check_devices(['CG001', 'SLOW1'], device_timeout=0.3)
+
+        self.assertTrue(summary['results']['CG001']['success'])
+        self.assertFalse(summary['results']['SLOW1']['success'])
+        self.assertEqual(summary['results']['SLOW1']['code'], 408)
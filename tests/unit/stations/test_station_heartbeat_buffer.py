@@ -0,0 +1,74 @@
+"""
+Tests for coalesced station status pings (StationHeartbeatBuffer)
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.stations.models import Station
+from api.stations.services import StationService, StationSyncService
+from api.stations.services.utils.heartbeat_buffer import station_heartbeat_buffer
+from tests.unit.fixtures import create_station
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StationHeartbeatBufferTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        station_heartbeat_buffer.flush()
+        self.service = StationSyncService()
+        self.stations = [
+            create_station(f'Buffered {i}', serial_number=f'BUF{i:04d}', imei=f'IMEI{i:04d}', status='ONLINE')
+            for i in range(5)
+        ]
+        # Hold the flush for this interval so pings stay buffered
+        self.assertTrue(station_heartbeat_buffer.flush_due())
+
+    def _ping(self, serial_number, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.service.update_station_status(
+                {'device': {'serial_number': serial_number, 'status': status}}
+            )
+
+    def test_pings_are_flushed_in_one_update(self):
+        for station in self.stations:
+            self._ping(station.serial_number, 'ONLINE')
+
+        with CaptureQueriesContext(connection) as context:
+            for station in self.stations:
+                self._ping(station.serial_number, 'OFFLINE')
+        writes = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(writes, [])
+
+        with CaptureQueriesContext(connection) as context:
+            result = station_heartbeat_buffer.flush()
+        self.assertEqual(result, {'pending': 5, 'updated': 5})
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(Station.objects.filter(status='OFFLINE', last_heartbeat__isnull=False).count(), 5)
+
+    def test_readers_see_pending_status(self):
+        self._ping('BUF0000', 'OFFLINE')
+
+        station = StationService().get_station_detail('BUF0000')
+
+        self.assertEqual(station.status, 'OFFLINE')
+        self.assertIsNotNone(station.last_heartbeat)
+        self.assertEqual(Station.objects.get(serial_number='BUF0000').status, 'ONLINE')
+
+    def test_flush_keeps_newer_row_heartbeat(self):
+        self._ping('BUF0001', 'OFFLINE')
+        newer = timezone.now() + timedelta(minutes=1)
+        Station.objects.filter(serial_number='BUF0001').update(status='ONLINE', last_heartbeat=newer)
+
+        station_heartbeat_buffer.flush()
+
+        station = Station.objects.get(serial_number='BUF0001')
+        self.assertEqual(station.status, 'ONLINE')
+        self.assertEqual(station.last_heartbeat, newer)
@@ -0,0 +1,96 @@
+"""
+Tests for queued IoT ingestion: partitioning, idempotency and ordering
+"""
+from __future__ import annotations
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.common.services.base import ServiceException
+from api.stations.models import Station
+from api.stations.services import StationIngestService
+from api.stations.tasks import process_station_data
+from tests.unit.fixtures import create_station
+
+
+def build_status_payload(serial_number, status, timestamp):
+    return {
+        'type': 'status',
+        'timestamp': timestamp,
+        'device': {'serial_number': serial_number, 'status': status},
+    }
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    IOT_INGEST_PARTITIONS=4,
+)
+class StationIngestServiceTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.service = StationIngestService()
+
+    def test_same_device_maps_to_same_queue(self):
+        queues = {self.service.get_queue_name('DEVICE0001') for _ in range(5)}
+        self.assertEqual(len(queues), 1)
+        self.assertRegex(queues.pop(), r'^iot_ingest_[0-3]$')
+
+    @mock.patch('api.stations.tasks.process_station_data.apply_async')
+    def test_duplicate_upload_is_queued_once(self, apply_async):
+        apply_async.return_value = mock.Mock(id='task-1')
+        payload = build_status_payload('DEVICE0001', 'ONLINE', 1700000000)
+
+        first = self.service.enqueue(payload)
+        second = self.service.enqueue(payload)
+
+        self.assertTrue(first['queued'])
+        self.assertTrue(second['duplicate'])
+        apply_async.assert_called_once_with(args=[payload], queue=first['queue'])
+
+    @mock.patch('api.stations.tasks.process_station_data.apply_async')
+    def test_broker_failure_allows_resend(self, apply_async):
+        apply_async.side_effect = [ConnectionError('broker down'), mock.Mock(id='task-2')]
+        payload = build_status_payload('DEVICE0001', 'ONLINE', 1700000000)
+
+        with self.assertRaises(ConnectionError):
+            self.service.enqueue(payload)
+        self.assertTrue(self.service.enqueue(payload)['queued'])
+
+    def test_stale_status_is_not_applied(self):
+        create_station('Ingest Station', serial_number='DEVICE0002', imei='DEVICE0002', status='ONLINE')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.process(build_status_payload('DEVICE0002', 'OFFLINE', 1700000100))
+            result = self.service.process(build_status_payload('DEVICE0002', 'ONLINE', 1700000050))
+
+        self.assertTrue(result['skipped'])
+        self.assertEqual(Station.objects.get(serial_number='DEVICE0002').status, 'OFFLINE')
+
+    def test_internal_errors_are_retried_before_release(self):
+        payload = build_status_payload('DEVICE0003', 'ONLINE', 1700000000)
+        cache.add(
+            StationIngestService._idempotency_key('DEVICE0003', 'status', 1700000000), 'queued'
+        )
+        internal = ServiceException(detail="Internal service error", code="internal_error")
+
+        with mock.patch.object(StationIngestService, 'process', side_effect=internal) as process:
+            result = process_station_data.apply(args=[payload])
+
+        # First run plus max_retries retries, then the payload is released
+        self.assertEqual(process.call_count, process_station_data.max_retries + 1)
+        self.assertTrue(result.failed())
+        self.assertIsNone(cache.get(StationIngestService._idempotency_key('DEVICE0003', 'status', 1700000000)))
+
+    def test_invalid_payload_is_released_without_retry(self):
+        payload = build_status_payload('DEVICE0004', 'ONLINE', 1700000000)
+        rejected = ServiceException(detail="Station not found", code="station_not_found")
+
+        with mock.patch.object(StationIngestService, 'process', side_effect=rejected) as process:
+            process_station_data.apply(args=[payload])
+
+        self.assertEqual(process.call_count, 1)
+        self.assertTrue(StationIngestService.is_retryable(ServiceException(code="internal_error")))
+        self.assertFalse(StationIngestService.is_retryable(rejected))
@@ -0,0 +1,66 @@
+"""
+Tests for database-side distance filtering in StationService.get_stations_list
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from django.test import TestCase
+
+from api.common.services.base import ServiceException
+from api.common.utils.helpers import calculate_distance
+from api.stations.services import StationService
+from tests.unit.fixtures import create_station
+
+
+class StationLocationQueryTestCase(TestCase):
+    """Test bounding box + SQL haversine filtering and ordering"""
+
+    ORIGIN = (27.7172, 85.3240)  # Kathmandu
+
+    def setUp(self):
+        self.service = StationService()
+        self.near = self._create_station('Near', '27.718000', '85.325000')
+        self.mid = self._create_station('Mid', '27.740000', '85.330000')
+        self.far = self._create_station('Far', '28.209500', '83.985600')  # Pokhara, ~140 km
+        self.maintenance = self._create_station('Maint', '27.717500', '85.324500', is_maintenance=True)
+
+    def _create_station(self, name, lat, lng, **extra):
+        return create_station(name, latitude=Decimal(lat), longitude=Decimal(lng), status='ONLINE', **extra)
+
+    def _list(self, radius=10.0, **filters):
+        lat, lng = self.ORIGIN
+        return self.service.get_stations_list({'lat': lat, 'lng': lng, 'radius': radius, **filters})
+
+    def test_filters_and_orders_by_distance(self):
+        """Only active stations inside the radius are returned, nearest first"""
+        result = self._list()
+
+        self.assertEqual([s.id for s in result['results']], [self.near.id, self.mid.id])
+        self.assertEqual(result['pagination']['total_count'], 2)
+
+    def test_annotated_distance_matches_haversine(self):
+        """SQL distance expression agrees with calculate_distance"""
+        result = self._list()
+
+        for station in result['results']:
+            expected = calculate_distance(
+                *self.ORIGIN, float(station.latitude), float(station.longitude)
+            )
+            self.assertAlmostEqual(station.distance, expected, places=6)
+
+    def test_pagination_keeps_distance_order(self):
+        """Pages are sliced from the distance-ordered query"""
+        first = self._list(radius=200.0, page_size=1)
+        second = self.service.get_stations_list({
+            'lat': self.ORIGIN[0], 'lng': self.ORIGIN[1], 'radius': 200.0,
+            'page': 3, 'page_size': 1
+        })
+
+        self.assertEqual(first['results'][0].id, self.near.id)
+        self.assertEqual(second['results'][0].id, self.far.id)
+        self.assertEqual(first['pagination']['total_count'], 3)
+
+    def test_invalid_coordinates(self):
+        """Out of range coordinates are rejected"""
+        with self.assertRaises(ServiceException):
+            self.service.get_stations_list({'lat': 95.0, 'lng': 85.0, 'radius': 5.0})
@@ -0,0 +1,133 @@
+"""
+Tests for the nearby-station spatial index and its registry
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.common.utils.helpers import calculate_distance
+from api.stations.models import Station
+from api.stations.services.utils.spatial_index import (
+    STATION_INDEX_VERSION_KEY, StationIndexRegistry, StationSpatialIndex
+)
+from tests.unit.fixtures import create_station
+
+
+class StationSpatialIndexTestCase(SimpleTestCase):
+    """Test radius queries against the grid buckets"""
+
+    ORIGIN = (27.7172, 85.3240)  # Kathmandu
+
+    def setUp(self):
+        self.index = StationSpatialIndex()
+
+    def _add(self, station_id, lat, lng):
+        return self.index.upsert({'id': station_id, 'station_name': station_id, 'latitude': lat, 'longitude': lng})
+
+    def test_radius_edge_is_inclusive(self):
+        """A station exactly on the radius is returned, one just beyond it is not"""
+        self._add('edge', 27.7600, 85.3240)
+        distance = calculate_distance(*self.ORIGIN, 27.7600, 85.3240)
+
+        self.assertEqual([s['id'] for s in self.index.query(*self.ORIGIN, distance)], ['edge'])
+        self.assertEqual(self.index.query(*self.ORIGIN, distance - 0.001), [])
+
+    def test_matches_full_scan_across_cells(self):
+        """Stations in neighbouring cells are found and sorted by distance"""
+        points = {
+            'a': (27.7180, 85.3250),
+            'b': (27.7490, 85.3010),  # different cell, ~4.2 km
+            'c': (27.6810, 85.3600),  # different cell, ~5.4 km
+            'd': (27.8500, 85.3240),  # ~14.8 km
+        }
+        for station_id, (lat, lng) in points.items():
+            self._add(station_id, lat, lng)
+
+        expected = sorted(
+            (calculate_distance(*self.ORIGIN, lat, lng), station_id)
+            for station_id, (lat, lng) in points.items()
+            if calculate_distance(*self.ORIGIN, lat, lng) <= 10
+        )
+        results = self.index.query(*self.ORIGIN, 10)
+
+        self.assertEqual([s['id'] for s in results], [station_id for _, station_id in expected])
+        for station, (distance, _) in zip(results, expected):
+            self.assertEqual(station['distance'], round(distance, 2))
+
+    def test_antimeridian(self):
+        """Queries near +/-180 longitude see stations on the other side"""
+        self._add('east', 0.0, 179.99)
+        self._add('west', 0.0, -179.99)
+
+        self.assertEqual([s['id'] for s in self.index.query(0.0, 179.995, 5)], ['east', 'west'])
+        self.assertEqual([s['id'] for s in self.index.query(0.0, -179.995, 5)], ['west', 'east'])
+
+    def test_invalid_coordinates_dropped(self):
+        """Out of range or missing coordinates remove the station"""
+        self._add('ok', 27.7180, 85.3250)
+
+        self.assertFalse(self._add('ok', 95.0, 85.0))
+        self.assertFalse(self._add('bad', None, 85.0))
+        self.assertEqual(len(self.index), 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StationIndexRegistryTestCase(TestCase):
+    """Test registry rebuilds and which Station saves publish a new version"""
+
+    ORIGIN = (27.7172, 85.3240)
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.station = create_station(
+                'Near', latitude=Decimal('27.718000'), longitude=Decimal('85.325000'), status='ONLINE'
+            )
+
+    def _save(self, station, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            station.save(**kwargs)
+        return cache.get(STATION_INDEX_VERSION_KEY)
+
+    def test_rebuilds_on_version_change(self):
+        """Writes that bypass signals show up once another worker bumps the version"""
+        registry = StationIndexRegistry()
+        self.assertEqual(len(registry.get_index().query(*self.ORIGIN, 5)), 1)
+
+        Station.objects.filter(id=self.station.id).update(is_maintenance=True)
+        self.assertEqual(len(registry.get_index().query(*self.ORIGIN, 5)), 1)
+
+        cache.set(STATION_INDEX_VERSION_KEY, 'other-worker')
+        self.assertEqual(registry.get_index().query(*self.ORIGIN, 5), [])
+
+    def test_heartbeat_save_keeps_version(self):
+        """Status and heartbeat syncs on a still-listed station do not publish"""
+        version = cache.get(STATION_INDEX_VERSION_KEY)
+        station = Station.objects.get(id=self.station.id)
+
+        station.status = 'OFFLINE'
+        station.hardware_info = {'signal_strength': 28}
+        self.assertEqual(self._save(station), version)
+        self.assertEqual(self._save(station, update_fields=['status', 'last_heartbeat']), version)
+
+    def test_indexed_changes_publish(self):
+        """Moving or hiding a station publishes a new version"""
+        version = cache.get(STATION_INDEX_VERSION_KEY)
+        station = Station.objects.get(id=self.station.id)
+
+        station.latitude = Decimal('27.720000')
+        moved = self._save(station)
+        self.assertNotEqual(moved, version)
+
+        station.is_maintenance = True
+        self.assertNotEqual(self._save(station, update_fields=['is_maintenance']), moved)
+
+    def test_deferred_load_publishes(self):
+        """A station loaded without its indexed fields cannot be compared"""
+        version = cache.get(STATION_INDEX_VERSION_KEY)
+        station = Station.objects.only('id', 'status').get(id=self.station.id)
+
+        station.status = 'OFFLINE'
+        self.assertNotEqual(self._save(station), version)
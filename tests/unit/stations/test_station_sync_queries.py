@@ -0,0 +1,151 @@
+"""
+Tests for StationSyncService full sync: query counts and change detection
+"""
+from __future__ import annotations
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.stations.models import PowerBank, Station, StationSlot
+from api.stations.services import StationSyncService
+
+
+def build_full_payload(serial_number, slot_count, battery_level=80):
+    """Build a type=full payload with one powerbank per slot"""
+    return {
+        'type': 'full',
+        'device': {
+            'serial_number': serial_number,
+            'imei': serial_number,
+            'status': 'ONLINE',
+            'hardware_info': {'firmware_version': '2.1.5'},
+        },
+        'station': {'total_slots': slot_count},
+        'slots': [
+            {
+                'slot_number': number,
+                'status': 'OCCUPIED',
+                'battery_level': battery_level,
+                'power_bank_serial': f'{serial_number}-PB{number}',
+                'slot_metadata': {},
+            }
+            for number in range(1, slot_count + 1)
+        ],
+        'power_banks': [
+            {
+                'serial_number': f'{serial_number}-PB{number}',
+                'status': 'AVAILABLE',
+                'battery_level': battery_level,
+                'current_slot': number,
+                'hardware_info': {},
+            }
+            for number in range(1, slot_count + 1)
+        ],
+    }
+
+
+class StationFullSyncQueryCountTestCase(TestCase):
+    """Full sync must cost a constant number of queries regardless of slot count"""
+
+    MAX_QUERIES = 10
+
+    def setUp(self):
+        self.service = StationSyncService()
+
+    def _count_queries(self, payload):
+        with CaptureQueriesContext(connection) as context:
+            self.service.sync_station_data(payload)
+        return len(context.captured_queries)
+
+    def test_initial_sync_is_constant(self):
+        """Creating 4 or 20 slots/powerbanks costs the same queries"""
+        small = self._count_queries(build_full_payload('SMALL0001', 4))
+        large = self._count_queries(build_full_payload('LARGE0001', 20))
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.MAX_QUERIES)
+        self.assertEqual(StationSlot.objects.filter(station__serial_number='LARGE0001').count(), 20)
+        self.assertEqual(PowerBank.objects.filter(current_station__serial_number='LARGE0001').count(), 20)
+
+    def test_update_sync_is_constant(self):
+        """Updating every slot/powerbank of a 4 or 20 slot station costs the same queries"""
+        self.service.sync_station_data(build_full_payload('SMALL0002', 4))
+        self.service.sync_station_data(build_full_payload('LARGE0002', 20))
+
+        small = self._count_queries(build_full_payload('SMALL0002', 4, battery_level=55))
+        large = self._count_queries(build_full_payload('LARGE0002', 20, battery_level=55))
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.MAX_QUERIES)
+
+        slot = StationSlot.objects.get(station__serial_number='LARGE0002', slot_number=20)
+        powerbank = PowerBank.objects.get(serial_number='LARGE0002-PB20')
+        self.assertEqual(slot.battery_level, 55)
+        self.assertEqual(powerbank.battery_level, 55)
+        self.assertEqual(powerbank.current_slot_id, slot.id)
+
+    def test_powerbank_moves_between_stations(self):
+        """A powerbank reported by another station is re-homed in the same bulk update"""
+        self.service.sync_station_data(build_full_payload('MOVE0001', 2))
+        payload = build_full_payload('MOVE0002', 1)
+        payload['power_banks'][0]['serial_number'] = 'MOVE0001-PB1'
+
+        self.service.sync_station_data(payload)
+
+        powerbank = PowerBank.objects.get(serial_number='MOVE0001-PB1')
+        self.assertEqual(powerbank.current_station.serial_number, 'MOVE0002')
+        self.assertEqual(powerbank.current_slot.slot_number, 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StationSyncChangeDetectionTestCase(TestCase):
+    """Unchanged payloads only refresh last_heartbeat"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.service = StationSyncService()
+
+    def _sync(self, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                result = self.service.sync_station_data(payload)
+        return result, context.captured_queries
+
+    def test_unchanged_full_payload_skips_reconciliation(self):
+        """A repeated full payload is a single heartbeat UPDATE"""
+        payload = build_full_payload('SAME0001', 20)
+        first, _ = self._sync(payload)
+
+        payload['device']['last_heartbeat'] = '2030-01-01T00:00:00Z'
+        second, queries = self._sync(payload)
+
+        self.assertFalse(first['unchanged'])
+        self.assertTrue(second['unchanged'])
+        self.assertEqual(second['slots_updated'], 0)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('last_heartbeat', writes[0])
+        self.assertEqual(Station.objects.get(serial_number='SAME0001').last_heartbeat.year, 2030)
+
+    def test_changed_payload_is_applied(self):
+        """Any slot or powerbank change goes through the full sync"""
+        self._sync(build_full_payload('DIFF0001', 4))
+
+        result, _ = self._sync(build_full_payload('DIFF0001', 4, battery_level=40))
+
+        self.assertFalse(result['unchanged'])
+        self.assertEqual(StationSlot.objects.get(station__serial_number='DIFF0001', slot_number=1).battery_level, 40)
+
+    def test_status_change_invalidates_full_fingerprint(self):
+        """A status report that changes the station forces the next full sync"""
+        payload = build_full_payload('STAT0001', 2)
+        self._sync(payload)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.update_station_status({'device': {'serial_number': 'STAT0001', 'status': 'OFFLINE'}})
+        result, _ = self._sync(payload)
+
+        self.assertFalse(result['unchanged'])
+        self.assertEqual(Station.objects.get(serial_number='STAT0001').status, 'ONLINE')
@@ -0,0 +1,51 @@
+"""
+Tests for the in-process AppConfig snapshot
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.system.models import AppConfig
+from api.system.services.app_config_snapshot import AppConfigSnapshot, app_config_snapshot
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AppConfigSnapshotTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        AppConfig.objects.create(key='MAX_RENTAL_EXTENSIONS', value='4')
+        AppConfig.objects.create(key='POSTPAID_MINIMUM_BALANCE', value='75.50')
+        AppConfig.objects.create(key='POINTS_TIMELY_RETURN', value='', is_active=True)
+        AppConfig.objects.create(key='POINTS_RENTAL_COMPLETE', value='9', is_active=False)
+
+    def test_reads_are_served_from_memory(self):
+        app_config_snapshot.get('MAX_RENTAL_EXTENSIONS')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(app_config_snapshot.get_int('MAX_RENTAL_EXTENSIONS', 3), 4)
+            self.assertEqual(app_config_snapshot.get_decimal('POSTPAID_MINIMUM_BALANCE', Decimal('50')), Decimal('75.50'))
+            self.assertEqual(app_config_snapshot.get_int('POINTS_TIMELY_RETURN', 50), 50)
+            self.assertEqual(app_config_snapshot.get_int('POINTS_RENTAL_COMPLETE', 5), 5)
+
+    def test_save_invalidates_local_snapshot(self):
+        self.assertEqual(app_config_snapshot.get_int('MAX_RENTAL_EXTENSIONS', 3), 4)
+
+        AppConfig.objects.filter(key='MAX_RENTAL_EXTENSIONS').get().delete()
+
+        self.assertEqual(app_config_snapshot.get_int('MAX_RENTAL_EXTENSIONS', 3), 3)
+
+    def test_other_workers_reload_on_version_bump(self):
+        other_worker = AppConfigSnapshot()
+        other_worker.VERSION_CHECK_INTERVAL = 0
+        self.assertEqual(other_worker.get_int('MAX_RENTAL_EXTENSIONS', 3), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            config = AppConfig.objects.get(key='MAX_RENTAL_EXTENSIONS')
+            config.value = '6'
+            config.save()
+
+        self.assertEqual(other_worker.get_int('MAX_RENTAL_EXTENSIONS', 3), 6)